@@ -0,0 +1,119 @@
+"""
+Compare PaddleOCR model precisions (fp32 / int8_dynamic / int8_static, see
+`src/infrastructure/models/paddleocr/quantization.py`) on a local image set: latency,
+peak memory and character error rate (CER).
+
+CER is measured against `<image name>.txt` ground truth files next to the images when
+present, otherwise against the output of the first precision listed.
+Precisions are `<det>/<rec>` pairs, or one precision for both models. Each runs in its
+own process, so peak memory is measured in isolation.
+
+    python -m benchmarks.paddleocr_precisions --images images/ --precisions fp32 int8_dynamic fp32/int8_static
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance between two strings."""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def character_error_rate(predictions: Sequence[str], references: Sequence[str]) -> float:
+    errors = sum(edit_distance(p, r) for p, r in zip(predictions, references))
+    return errors / max(1, sum(len(r) for r in references))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run(precision: str, images: List[str], warmup: int, repeat: int) -> Dict[str, object]:
+    """Load the adapter at `precision` in this (fresh) process, OCR each image, report texts and metrics."""
+    from src.domain.models import OcrImageInput
+    from src.infrastructure.models.paddleocr.adapter import PaddleOCRAdapter
+    from src.infrastructure.models.paddleocr.config import paddle_ocr_settings
+
+    det_precision, _, rec_precision = precision.partition("/")
+    paddle_ocr_settings.det_precision = det_precision
+    paddle_ocr_settings.rec_precision = rec_precision or det_precision
+
+    baseline_mb = _peak_rss_mb()
+    adapter = PaddleOCRAdapter()
+    loaded_mb = _peak_rss_mb()
+
+    texts, latencies = [], []
+    for image in images:
+        data = OcrImageInput(content=Path(image).read_bytes())
+        for _ in range(warmup):
+            adapter.predict_columnar(data)
+        for _ in range(repeat):
+            st = time.perf_counter()
+            output = adapter.predict_columnar(data)
+            latencies.append((time.perf_counter() - st) * 1000)
+        # Reading order: top to bottom, then left to right
+        order = sorted(range(len(output.texts)), key=lambda i: (output.boxes[i][1], output.boxes[i][0]))
+        texts.append("\n".join(output.texts[i] for i in order))
+
+    return {
+        "texts": texts,
+        "latencies_ms": latencies,
+        "model_mb": loaded_mb - baseline_mb,
+        "peak_mb": _peak_rss_mb(),
+    }
+
+
+def _run_isolated(precision: str, images: List[str], warmup: int, repeat: int) -> Dict[str, object]:
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_run, (precision, images, warmup, repeat))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Directory of images (and optional .txt ground truths)")
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "int8_dynamic", "int8_static"])
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not images:
+        parser.error(f"No images in {args.images}")
+    ground_truths: Optional[List[str]] = None
+    if all(p.with_suffix(".txt").exists() for p in images):
+        ground_truths = [p.with_suffix(".txt").read_text(encoding="utf8").strip() for p in images]
+
+    results: List[Tuple[str, Dict[str, object]]] = []
+    for precision in args.precisions:
+        results.append((precision, _run_isolated(precision, [str(p) for p in images], args.warmup, args.repeat)))
+
+    references = ground_truths if ground_truths is not None else results[0][1]["texts"]
+    reference_name = "ground truth" if ground_truths is not None else args.precisions[0]
+    print(f"{len(images)} images, CER against {reference_name}")
+    print(f"{'precision':<28}{'mean ms':>10}{'p95 ms':>10}{'model MB':>10}{'peak MB':>10}{'CER':>9}")
+    for precision, result in results:
+        latencies = np.array(result["latencies_ms"])
+        cer = character_error_rate(result["texts"], references)
+        print(
+            f"{precision:<28}{latencies.mean():>10.1f}{np.percentile(latencies, 95):>10.1f}"
+            f"{result['model_mb']:>10.1f}{result['peak_mb']:>10.1f}{cer:>9.2%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
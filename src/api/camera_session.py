@@ -0,0 +1,103 @@
+import asyncio
+from typing import Callable, Optional, Tuple
+from fastapi import WebSocket
+
+from src.api.schemas import FrameResult
+from src.domain.models import OcrImageInput, OcrOptions
+from src.infrastructure.imaging.frame_hash import difference_hash, hamming_distance
+from src.infrastructure.scheduling.inference_executor import InferenceExecutor, InferenceQueueFullError
+from src.infrastructure.scheduling.rate_limiter import InferenceClient, RateLimitExceededError
+
+
+class CameraSession:
+    """
+    OCR over a stream of camera frames (binary messages) received on one WebSocket.
+
+    Frames are received and processed concurrently: only the newest frame is kept,
+    so when the camera is faster than inference, stale frames are dropped.
+    Frames whose perceptual hash is within `change_threshold` bits of the last
+    processed frame are not processed again. Each processed frame takes a rate limit
+    token of the key (`acquire`), frames over the key's rate are answered "busy".
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        executor: InferenceExecutor,
+        options: OcrOptions,
+        acquire: Callable[[], InferenceClient],
+        change_threshold: int,
+    ):
+        self._websocket = websocket
+        self._executor = executor
+        self._options = options
+        self._acquire = acquire
+        self._change_threshold = change_threshold
+
+        self._latest: Optional[Tuple[int, bytes]] = None
+        self._dropped = 0
+        self._frame_available = asyncio.Event()
+        self._last_processed_hash: Optional[int] = None
+
+    async def run(self) -> None:
+        """Serve the session until the client disconnects."""
+        receiver = asyncio.create_task(self._receive_frames())
+        processor = asyncio.create_task(self._process_frames())
+        try:
+            # The receiver returns on disconnect, the processor only ends on failure
+            done, _ = await asyncio.wait({receiver, processor}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (receiver, processor):
+                task.cancel()
+            await asyncio.gather(receiver, processor, return_exceptions=True)
+        for task in done:
+            task.result()
+
+    async def _receive_frames(self) -> None:
+        frame_id = 0
+        while True:
+            message = await self._websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            content = message.get("bytes")
+            if not content:
+                continue  # Text messages are ignored
+            if self._latest is not None:
+                self._dropped += 1
+            self._latest = (frame_id, content)
+            frame_id += 1
+            self._frame_available.set()
+
+    async def _process_frames(self) -> None:
+        while True:
+            await self._frame_available.wait()
+            self._frame_available.clear()
+            assert self._latest is not None
+            (frame_id, content), self._latest = self._latest, None
+            dropped, self._dropped = self._dropped, 0
+            await self._send(await self._process(frame_id, content, dropped))
+
+    async def _process(self, frame_id: int, content: bytes, dropped: int) -> FrameResult:
+        frame_hash = await asyncio.to_thread(difference_hash, content)
+        if (
+            frame_hash is not None
+            and self._last_processed_hash is not None
+            and hamming_distance(frame_hash, self._last_processed_hash) <= self._change_threshold
+        ):
+            return FrameResult(frame=frame_id, status="unchanged", dropped=dropped)
+
+        try:
+            output = await self._executor.execute(
+                OcrImageInput(content=content, options=self._options),
+                client=self._acquire(),
+            )
+        except (InferenceQueueFullError, RateLimitExceededError):
+            return FrameResult(frame=frame_id, status="busy", dropped=dropped)
+        except Exception as e:
+            return FrameResult(frame=frame_id, status="error", dropped=dropped, detail=str(e))
+
+        self._last_processed_hash = frame_hash
+        return FrameResult(frame=frame_id, status="processed", dropped=dropped, output=output)
+
+    async def _send(self, result: FrameResult) -> None:
+        await self._websocket.send_text(result.model_dump_json(exclude_none=True))
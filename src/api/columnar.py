@@ -0,0 +1,24 @@
+import msgpack
+import orjson
+from fastapi.responses import Response
+
+from src.domain.models import OcrColumnarOutput
+
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.ocr.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+def columnar_response(output: OcrColumnarOutput, media_type: str) -> Response:
+    """
+    Serialize columnar OCR output as JSON (orjson) or MessagePack:
+    {"texts": [...], "confidences": [...], "boxes": [[left, top, right, bottom], ...], "description": ...}
+    """
+    content = {
+        "texts": output.texts,
+        "confidences": output.confidences,
+        "boxes": output.boxes,
+        "description": output.description,
+    }
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return Response(msgpack.packb(content), media_type=MSGPACK_MEDIA_TYPE)
+    return Response(orjson.dumps(content), media_type=COLUMNAR_JSON_MEDIA_TYPE)
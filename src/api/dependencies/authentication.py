@@ -1,16 +1,29 @@
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, WebSocket, WebSocketException, status
 from fastapi.security import APIKeyHeader
-from httpx import head
+from starlette.requests import HTTPConnection
 
-from src.core.config import CONFIG
 from src.domain.authentication.api_key import ApiKey
-from src.infrastructure.authentication.api_key_repositories.registry import get_api_key_repository
+from src.domain.authentication.api_key_repository import ApiKeyRepository
+from src.infrastructure.authentication.usage_aggregator import ApiKeyUsageAggregator
+
+API_KEY_HEADER_NAME = "X-API-Key"
+API_KEY_QUERY_PARAM = "api_key"
 
-_api_key_repository = get_api_key_repository(CONFIG.api_key_repository)()
 api_key_header = APIKeyHeader(
-    name="X-API-Key",
+    name=API_KEY_HEADER_NAME,
     auto_error=False,
 )
+def get_authentication_repository(connection: HTTPConnection) -> ApiKeyRepository:
+    """
+    FastAPI dependency returning the app's API key repository, owned by the lifespan
+    (revoking through it also invalidates its cache).
+    """
+    return connection.app.state.api_key_repository
+
+def get_usage_aggregator(connection: HTTPConnection) -> ApiKeyUsageAggregator:
+    return connection.app.state.api_key_usage
+
 def get_unauthorized_error (detail: str) -> HTTPException:
     return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -18,18 +31,37 @@ def get_unauthorized_error (detail: str) -> HTTPException:
         headers={"WWW-Authenticate": "API key"}
     )
 
-async def authenticate_api_key(api_key: str = Depends(api_key_header)) -> ApiKey:
+async def _authenticate(connection: HTTPConnection, api_key: Optional[str]) -> ApiKey:
     """
-    FastAPI dependency to authenticate via X-API-Key header.
+    Validate a plain-text API key and record its usage (persisted in the background).
+    Raises a 401 HTTPException if missing or invalid.
     """
     if not api_key:
         raise get_unauthorized_error("Missing API Key")
     
-    matching = await _api_key_repository.get_by_key(api_key)
+    matching = await get_authentication_repository(connection).get_by_key(api_key)
 
     if not matching:
         raise get_unauthorized_error("Invalid API Key")
     
-    await _api_key_repository.update_usage(matching)
+    get_usage_aggregator(connection).record(matching)
 
     return matching
+
+async def authenticate_api_key(request: Request, api_key: str = Depends(api_key_header)) -> ApiKey:
+    """
+    FastAPI dependency to authenticate via X-API-Key header.
+    """
+    return await _authenticate(request, api_key)
+
+async def authenticate_websocket(websocket: WebSocket) -> ApiKey:
+    """
+    FastAPI dependency to authenticate a WebSocket session once, at handshake.
+    Browsers can't set headers on WebSocket handshakes, so the key may also be
+    sent as `api_key` query parameter.
+    """
+    api_key = websocket.headers.get(API_KEY_HEADER_NAME) or websocket.query_params.get(API_KEY_QUERY_PARAM)
+    try:
+        return await _authenticate(websocket, api_key)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
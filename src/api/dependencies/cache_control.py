@@ -0,0 +1,14 @@
+from typing import Optional
+from fastapi import Header
+
+BYPASS_DIRECTIVES = ("no-cache", "no-store")
+
+def use_result_cache(cache_control: Optional[str] = Header(None)) -> bool:
+    """
+    FastAPI dependency telling whether cached OCR results may be used for this request.
+    Clients bypass the cache with `Cache-Control: no-cache` (or `no-store`).
+    """
+    if cache_control is None:
+        return True
+    directives = {directive.strip().lower() for directive in cache_control.split(",")}
+    return not directives.intersection(BYPASS_DIRECTIVES)
@@ -0,0 +1,116 @@
+from typing import Any, Dict, Optional
+from fastapi import Depends, Header, HTTPException, Query, Request, status
+from starlette.datastructures import UploadFile
+from starlette.types import Message, Receive
+
+from src.core.config import CONFIG
+from src.domain.models import OcrImageInput, OcrLang, OcrOptions
+
+MULTIPART_CONTENT_TYPE = "multipart/form-data"
+BINARY_CONTENT_TYPES = ("application/octet-stream", "image/")
+UPLOAD_FIELD_NAME = "file"
+
+# Request body documentation for endpoints reading the body through `read_image_input`
+# (FastAPI cannot infer it, since the body is read from the raw request).
+IMAGE_REQUEST_BODY: Dict[str, Any] = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/octet-stream": {
+                "schema": {"type": "string", "format": "binary"},
+            },
+            MULTIPART_CONTENT_TYPE: {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        UPLOAD_FIELD_NAME: {"type": "string", "format": "binary"},
+                    },
+                    "required": [UPLOAD_FIELD_NAME],
+                },
+            },
+        },
+    }
+}
+
+def get_ocr_options(
+    lang: Optional[str] = Query(None, description="Language code (e.g., 'en', 'ar')"),
+    x_ocr_lang: Optional[str] = Header(None),
+    profile: Optional[str] = Query(None, description="Adapter profile (e.g., 'fast', 'accurate')"),
+    x_ocr_profile: Optional[str] = Header(None),
+) -> OcrOptions:
+    """
+    Build OcrOptions for binary uploads from the query string, or the X-OCR-Lang /
+    X-OCR-Profile headers.
+    """
+    options = OcrOptions(profile=profile or x_ocr_profile)
+    selected_lang = lang or x_ocr_lang
+    if selected_lang is not None:
+        options.lang = OcrLang(lang=selected_lang)
+    return options
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Request body exceeds {max_bytes} bytes",
+    )
+
+def _capped_request(request: Request, max_bytes: int) -> Request:
+    """
+    `request` with a body limit: 413 as soon as more than `max_bytes` are received, so
+    a chunked (or lying) upload is never buffered past the limit.
+    """
+    received = 0
+    receive: Receive = request.receive
+
+    async def capped_receive() -> Message:
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise _too_large(max_bytes)
+        return message
+
+    return Request(request.scope, capped_receive)
+
+async def read_image_input(
+    request: Request,
+    options: OcrOptions = Depends(get_ocr_options),
+) -> OcrImageInput:
+    """
+    FastAPI dependency reading an image sent as multipart/form-data (`file` field)
+    or as a raw application/octet-stream body.
+    The received buffer is handed to the use case as-is. Bodies larger than
+    `max_upload_bytes` are rejected with 413, from Content-Length before reading any.
+    """
+    content_type = request.headers.get("content-type", "")
+    max_bytes = CONFIG.max_upload_bytes
+    if max_bytes > 0:
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            raise _too_large(max_bytes)
+        request = _capped_request(request, max_bytes)
+
+    if content_type.startswith(MULTIPART_CONTENT_TYPE):
+        async with request.form() as form:
+            upload = form.get(UPLOAD_FIELD_NAME)
+            if not isinstance(upload, UploadFile):
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Missing '{UPLOAD_FIELD_NAME}' field in multipart body",
+                )
+            content = await upload.read()
+    elif content_type.startswith(BINARY_CONTENT_TYPES):
+        content = await request.body()
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected multipart/form-data or application/octet-stream body",
+        )
+
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Empty image body",
+        )
+    return OcrImageInput(content=content, options=options)
@@ -0,0 +1,39 @@
+from functools import partial
+from typing import Callable
+
+from fastapi import Depends, WebSocket, WebSocketException, status
+from starlette.requests import HTTPConnection
+
+from src.api.dependencies.authentication import authenticate_api_key, authenticate_websocket
+from src.domain.authentication.api_key import ApiKey
+from src.infrastructure.scheduling.rate_limiter import InferenceClient, RateLimiter, RateLimitExceededError
+
+
+def get_rate_limiter(connection: HTTPConnection) -> RateLimiter:
+    return connection.app.state.rate_limiter
+
+async def rate_limit_api_key(
+    api_key: ApiKey = Depends(authenticate_api_key),
+    rate_limiter: RateLimiter = Depends(get_rate_limiter),
+) -> InferenceClient:
+    """
+    FastAPI dependency authenticating the request, then taking a token of its key.
+    Raises RateLimitExceededError (answered with 429) if the key is over its rate.
+    """
+    return rate_limiter.acquire(api_key)
+
+async def rate_limit_websocket(
+    websocket: WebSocket,
+    api_key: ApiKey = Depends(authenticate_websocket),
+) -> Callable[[], InferenceClient]:
+    """
+    FastAPI dependency taking a token of the key at handshake, then returning the
+    function taking a token per processed frame (RateLimitExceededError once the key
+    is over its rate).
+    """
+    rate_limiter = get_rate_limiter(websocket)
+    try:
+        rate_limiter.acquire(api_key)
+    except RateLimitExceededError as e:
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason=str(e))
+    return partial(rate_limiter.acquire, api_key)
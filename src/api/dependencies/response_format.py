@@ -0,0 +1,45 @@
+from typing import Optional
+from fastapi import Header, HTTPException, Query, status
+
+from src.api.columnar import COLUMNAR_JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE
+
+# `format` query parameter values (`json` is the regular schema)
+FORMAT_MEDIA_TYPES = {
+    "json": None,
+    "columnar": COLUMNAR_JSON_MEDIA_TYPE,
+    "msgpack": MSGPACK_MEDIA_TYPE,
+}
+# Accept header media types
+ACCEPT_MEDIA_TYPES = {
+    COLUMNAR_JSON_MEDIA_TYPE: COLUMNAR_JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE: MSGPACK_MEDIA_TYPE,
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+def get_columnar_media_type(
+    response_format: Optional[str] = Query(
+        None,
+        alias="format",
+        description="`columnar` (JSON) or `msgpack` for the compact columnar response, `json` (default) otherwise.",
+    ),
+    accept: Optional[str] = Header(None),
+) -> Optional[str]:
+    """
+    FastAPI dependency selecting the compact columnar response format, if requested
+    (`format` query parameter first, then the Accept header).
+    Returns its media type, or None for the regular OcrOutput response.
+    """
+    if response_format is not None:
+        response_format = response_format.strip().lower()
+        if response_format not in FORMAT_MEDIA_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unsupported format {response_format!r}, expected one of {list(FORMAT_MEDIA_TYPES)}",
+            )
+        return FORMAT_MEDIA_TYPES[response_format]
+    if accept is None:
+        return None
+    for accepted, media_type in ACCEPT_MEDIA_TYPES.items():
+        if accepted in accept:
+            return media_type
+    return None
@@ -0,0 +1,39 @@
+import asyncio
+from typing import Awaitable, Optional, TypeVar
+
+from starlette.requests import Request
+
+T = TypeVar("T")
+
+# Status of responses to clients that left (never actually received, only logged)
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> Optional[T]:
+    """
+    Await `awaitable`, cancelling it if the client disconnects first (None is returned then).
+    The request body must have been read already: only the disconnect message is left to receive.
+    """
+    task = asyncio.ensure_future(awaitable)
+    watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+    try:
+        await asyncio.wait((task, watcher), return_when=asyncio.FIRST_COMPLETED)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        watcher.cancel()
+
+    if task.done():
+        return task.result()
+    task.cancel()
+    # Let the cancellation unwind (e.g. the upstream request closed, the inference slot released)
+    await asyncio.wait((task,))
+    return None
@@ -1,56 +1,304 @@
 from contextlib import asynccontextmanager
 import time
-from fastapi import Depends, FastAPI, Request
+from typing import Callable, Optional
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Request, WebSocket, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.requests import HTTPConnection
 
-from src.api.dependencies.authentication import authenticate_api_key
-from src.api.schemas import HealthResponse
+from src.api.camera_session import CameraSession
+from src.api.columnar import COLUMNAR_JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, columnar_response
+from src.api.disconnect import CLIENT_CLOSED_REQUEST, cancel_on_disconnect
+from src.api.dependencies.authentication import (
+    authenticate_api_key,
+    get_authentication_repository,
+    get_usage_aggregator,
+)
+from src.api.dependencies.cache_control import use_result_cache
+from src.api.dependencies.rate_limiting import rate_limit_api_key, rate_limit_websocket
+from src.api.dependencies.image_input import IMAGE_REQUEST_BODY, get_ocr_options, read_image_input
+from src.api.dependencies.response_format import get_columnar_media_type
+from src.api.schemas import HealthResponse, MetricsResponse, RevokeKeyResponse
+from src.api.streaming import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, ocr_stream_response
 from src.core.config import CONFIG
 from src.domain.authentication.api_key import ApiKey
-from src.domain.models import OcrInput, OcrOutput
+from src.domain.authentication.api_key_repository import ApiKeyRepository
+from src.domain.models import OcrImageInput, OcrInput, OcrOptions, OcrOutput
+from src.domain.ports import BatchOcrPort, OcrPort
 from src.domain.use_cases.process_image import ProcessImageUseCase
-from src.infrastructure.authentication.api_key_repositories.registry import get_api_key_repository
+from src.infrastructure.authentication.api_key_repositories.caching import (
+    create_api_key_repository,
+    get_api_key_repository_stats,
+)
+from src.infrastructure.authentication.api_key_repositories.signed import SignedApiKey, SignedApiKeyRepository
+from src.infrastructure.authentication.usage_aggregator import ApiKeyUsageAggregator
+from src.infrastructure.caching.ocr_result_cache import create_ocr_result_cache
+from src.infrastructure.models.model_pool import UnsupportedLanguageError
+from src.infrastructure.models.profiles import UnknownProfileError
 from src.infrastructure.models.registry import get_adapter
+from src.infrastructure.scheduling.inference_executor import (
+    PROCESS_MODE,
+    THREAD_MODE,
+    InferenceExecutor,
+    InferenceQueueFullError,
+)
+from src.infrastructure.scheduling.micro_batcher import MicroBatchingOcrPort
+from src.infrastructure.scheduling.rate_limiter import InferenceClient, RateLimiter, RateLimitExceededError
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: instantiate adapter & use case once
-    AdapterCls = get_adapter(CONFIG.ocr_adapter)
-    app.state.ocr_port = AdapterCls()
-    app.state.process_use_case = ProcessImageUseCase(app.state.ocr_port)
+    # Startup: connect the API key repository once (fails fast if unreachable), shared by all requests
+    app.state.api_key_repository = create_api_key_repository(CONFIG.api_key_repository)
+    await app.state.api_key_repository.start()
+    app.state.api_key_usage = ApiKeyUsageAggregator(
+        app.state.api_key_repository,
+        flush_interval_s=CONFIG.api_key_usage_flush_interval_s,
+        max_pending_keys=CONFIG.api_key_usage_flush_max_keys,
+    )
+    app.state.api_key_usage.start()
+    app.state.rate_limiter = RateLimiter(
+        rate_per_s=CONFIG.rate_limit_per_s,
+        burst=CONFIG.rate_limit_burst,
+        max_concurrency=CONFIG.rate_limit_max_concurrency,
+        max_keys=CONFIG.rate_limit_max_keys,
+    )
+
+    # Instantiate adapter & use case once
+    app.state.ocr_port = None
+    app.state.ocr_batcher = None
+    app.state.ocr_cache = None
+    if CONFIG.inference_executor == PROCESS_MODE:
+        # Each worker process loads its own adapter & use case
+        app.state.inference_executor = InferenceExecutor(
+            PROCESS_MODE,
+            max_workers=CONFIG.inference_max_workers,
+            max_queue_size=CONFIG.inference_max_queue_size,
+            retry_after_s=CONFIG.inference_retry_after_s,
+            adapter_name=CONFIG.ocr_adapter,
+        )
+    else:
+        AdapterCls = get_adapter(CONFIG.ocr_adapter)
+        app.state.ocr_port = AdapterCls()
+        # Collect concurrent requests into batches, for adapters supporting it
+        ocr_port: OcrPort = app.state.ocr_port
+        if isinstance(ocr_port, BatchOcrPort) and CONFIG.ocr_batch_max_size > 1:
+            app.state.ocr_batcher = MicroBatchingOcrPort(
+                ocr_port,
+                max_batch_size=CONFIG.ocr_batch_max_size,
+                max_wait_ms=CONFIG.ocr_batch_max_wait_ms,
+                max_in_flight=CONFIG.ocr_batch_max_in_flight,
+            )
+            ocr_port = app.state.ocr_batcher
+        app.state.ocr_cache = create_ocr_result_cache(CONFIG.ocr_adapter)
+        app.state.inference_executor = InferenceExecutor(
+            THREAD_MODE,
+            max_workers=CONFIG.inference_max_workers,
+            max_queue_size=CONFIG.inference_max_queue_size,
+            retry_after_s=CONFIG.inference_retry_after_s,
+            use_case=ProcessImageUseCase(ocr_port, cache=app.state.ocr_cache),
+        )
     yield
+    # Shutdown
+    app.state.inference_executor.shutdown()
+    if app.state.ocr_batcher is not None:
+        app.state.ocr_batcher.close()
+    if app.state.ocr_port is not None:
+        app.state.ocr_port.close()
+    await app.state.api_key_usage.close()
+    await app.state.api_key_repository.close()
 
 app = FastAPI(
     title="OCR Service",
     lifespan=lifespan,
 )
 
-def get_process_use_case(request: Request) -> ProcessImageUseCase:
-    return request.app.state.process_use_case
+def get_inference_executor(connection: HTTPConnection) -> InferenceExecutor:
+    return connection.app.state.inference_executor
+
+@app.exception_handler(InferenceQueueFullError)
+async def inference_queue_full_handler(_: Request, exc: InferenceQueueFullError) -> JSONResponse:
+    # Shed load right away instead of letting latency grow
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
+
+@app.exception_handler(UnsupportedLanguageError)
+async def unsupported_language_handler(_: Request, exc: UnsupportedLanguageError) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+@app.exception_handler(UnknownProfileError)
+async def unknown_profile_handler(_: Request, exc: UnknownProfileError) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+@app.exception_handler(RateLimitExceededError)
+async def rate_limit_exceeded_handler(_: Request, exc: RateLimitExceededError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers=exc.headers,
+    )
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check() -> HealthResponse:
     return HealthResponse()
 
-@app.get("/create_key", response_model=ApiKey)
-async def create_api_key() -> ApiKey:
-    api_key_repo = get_api_key_repository(CONFIG.api_key_repository)()
-    return await api_key_repo.create()
+@app.get("/create_key", response_model=SignedApiKey | ApiKey)
+async def create_api_key(
+    signed: bool = Query(False, description="Mint a signed key, verified without a database round trip"),
+    api_key_repo: ApiKeyRepository = Depends(get_authentication_repository),
+) -> ApiKey:
+    if not signed:
+        return await api_key_repo.create()
+    if not isinstance(api_key_repo, SignedApiKeyRepository):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Signed API keys are not enabled")
+    return await api_key_repo.create_signed()
+
+@app.post("/revoke_key", response_model=RevokeKeyResponse)
+async def revoke_api_key(
+    api_key: ApiKey = Depends(authenticate_api_key),
+    api_key_repo: ApiKeyRepository = Depends(get_authentication_repository),
+) -> RevokeKeyResponse:
+    """Revoke the API key authenticating this request, it is rejected right away."""
+    assert api_key.id is not None
+    return RevokeKeyResponse(id=api_key.id, revoked=await api_key_repo.revoke(api_key.id))
+
+@app.get("/metrics", response_model=MetricsResponse)
+async def metrics(
+    request: Request,
+    api_key_repo: ApiKeyRepository = Depends(get_authentication_repository),
+    usage_aggregator: ApiKeyUsageAggregator = Depends(get_usage_aggregator),
+    _ = Depends(authenticate_api_key),
+) -> MetricsResponse:
+    ocr_port = request.app.state.ocr_port
+    batcher = request.app.state.ocr_batcher
+    cache = request.app.state.ocr_cache
+    return MetricsResponse(
+        inference=request.app.state.inference_executor.stats(),
+        batching=batcher.stats() if batcher is not None else None,
+        pipeline=ocr_port.pipeline_stats() if ocr_port is not None else None,
+        models=ocr_port.model_stats() if ocr_port is not None else None,
+        cache=cache.stats() if cache is not None else None,
+        api_keys=get_api_key_repository_stats(api_key_repo),
+        api_key_usage=usage_aggregator.stats(),
+        rate_limiting=request.app.state.rate_limiter.stats(),
+    )
+
+
+# Alternative response content of the predict endpoints
+COLUMNAR_RESPONSES = {200: {"content": {COLUMNAR_JSON_MEDIA_TYPE: {}, MSGPACK_MEDIA_TYPE: {}}}}
+
+async def run_prediction(
+    request: Request,
+    executor: InferenceExecutor,
+    ocr_input: OcrInput | OcrImageInput,
+    use_cache: bool,
+    columnar_media_type: Optional[str],
+    client: InferenceClient,
+) -> OcrOutput | Response:
+    st = time.perf_counter()
+    if columnar_media_type is None:
+        inference = executor.execute(ocr_input, use_cache, client)
+    else:
+        inference = executor.execute_columnar(ocr_input, use_cache, client)
+    if executor.cancellable:
+        # A client that left cancels its inference (e.g. the upstream model API call)
+        output = await cancel_on_disconnect(request, inference)
+        if output is None:
+            return Response(status_code=CLIENT_CLOSED_REQUEST)
+    else:
+        output = await inference
+    response = output if columnar_media_type is None else columnar_response(output, columnar_media_type)
+    elapsed_ms = (time.perf_counter() - st) * 1000
+    print(f"Inference time = {elapsed_ms:.2f} ms")
+    return response
 
 
 @app.post(
     "/ocr/predict",
     response_model=OcrOutput,
     summary="Run OCR on an uploaded image",
-    description="Accepts an image file, performs OCR, and returns detected text blocks."
+    description=(
+        "Accepts an image file, performs OCR, and returns detected text blocks. "
+        "With `format=columnar|msgpack` (or the matching Accept header), returns them as "
+        "columns: texts, confidences and [left, top, right, bottom] boxes."
+    ),
+    responses=COLUMNAR_RESPONSES,
 )
 async def predict(
+    request: Request,
     ocr_input: OcrInput,
-    use_case: ProcessImageUseCase = Depends(get_process_use_case),
-    _ = Depends(authenticate_api_key),
-) -> OcrOutput:
-    st = time.perf_counter()
-    response = use_case.execute(ocr_input)
-    elapsed_ms = (time.perf_counter() - st) * 1000
-    print(f"Inference time = {elapsed_ms:.2f} ms")
-    return response
+    use_cache: bool = Depends(use_result_cache),
+    columnar_media_type: Optional[str] = Depends(get_columnar_media_type),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    client: InferenceClient = Depends(rate_limit_api_key),
+) -> OcrOutput | Response:
+    return await run_prediction(request, executor, ocr_input, use_cache, columnar_media_type, client)
+
+
+@app.post(
+    "/ocr/predict/binary",
+    response_model=OcrOutput,
+    summary="Run OCR on a raw image upload",
+    description=(
+        "Accepts an image as multipart/form-data (`file` field) or as a raw "
+        "application/octet-stream body, options are sent as query parameters/headers. "
+        "Performs OCR, and returns detected text blocks (same response formats as `/ocr/predict`)."
+    ),
+    responses=COLUMNAR_RESPONSES,
+    openapi_extra=IMAGE_REQUEST_BODY,
+)
+async def predict_binary(
+    request: Request,
+    ocr_input: OcrImageInput = Depends(read_image_input),
+    use_cache: bool = Depends(use_result_cache),
+    columnar_media_type: Optional[str] = Depends(get_columnar_media_type),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    client: InferenceClient = Depends(rate_limit_api_key),
+) -> OcrOutput | Response:
+    return await run_prediction(request, executor, ocr_input, use_cache, columnar_media_type, client)
+
+
+@app.post(
+    "/ocr/predict/stream",
+    summary="Run OCR on a raw image upload, streaming text blocks",
+    description=(
+        "Same input as `/ocr/predict/binary`. Streams OcrStreamEvents as newline-delimited JSON "
+        "(or Server-Sent Events with `Accept: text/event-stream`): the detected boxes first, "
+        "then each text block as soon as it is recognized."
+    ),
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}, SSE_MEDIA_TYPE: {}}}},
+    openapi_extra=IMAGE_REQUEST_BODY,
+)
+async def predict_stream(
+    ocr_input: OcrImageInput = Depends(read_image_input),
+    accept: Optional[str] = Header(None),
+    use_cache: bool = Depends(use_result_cache),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    client: InferenceClient = Depends(rate_limit_api_key),
+) -> StreamingResponse:
+    return await ocr_stream_response(executor.stream(ocr_input, use_cache, client), accept)
+
+
+@app.websocket("/ocr/ws")
+async def camera_stream(
+    websocket: WebSocket,
+    options: OcrOptions = Depends(get_ocr_options),
+    executor: InferenceExecutor = Depends(get_inference_executor),
+    acquire: Callable[[], InferenceClient] = Depends(rate_limit_websocket),
+) -> None:
+    """
+    Camera session: authenticated once, then each binary message is a frame (encoded image).
+    Each handled frame gets a FrameResult JSON message back.
+    """
+    await websocket.accept()
+    session = CameraSession(
+        websocket,
+        executor,
+        options,
+        acquire,
+        change_threshold=CONFIG.ws_frame_change_threshold,
+    )
+    await session.run()
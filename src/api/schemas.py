@@ -1,4 +1,42 @@
+from typing import Dict, Literal, Optional
 from pydantic import BaseModel
 
+from src.domain.models import OcrOutput
+
 class HealthResponse(BaseModel):
-    status: str = 'Ok'
\ No newline at end of file
+    status: str = 'Ok'
+
+class MetricsResponse(BaseModel):
+    # Inference executor (running/queued inferences, queue wait time, rejections)
+    inference: Dict[str, float]
+    # Micro-batching scheduler (None when disabled or unsupported by the adapter)
+    batching: Optional[Dict[str, float]] = None
+    # Adapter stage pipeline, per stage (None when the adapter has none, or in process mode)
+    pipeline: Optional[Dict[str, float]] = None
+    # Models loaded on demand by the adapter, per language (None when it has none, or in process mode)
+    models: Optional[Dict[str, float]] = None
+    # OCR result cache (None when disabled, or in process mode where each worker has its own)
+    cache: Optional[Dict[str, float]] = None
+    # Verified API key cache and signed key verification (None when both are disabled)
+    api_keys: Optional[Dict[str, float]] = None
+    # API key usage write-behind buffer (pending and flushed usage)
+    api_key_usage: Dict[str, float]
+    # Per API key rate limiter (allowed and limited requests)
+    rate_limiting: Dict[str, float]
+
+class RevokeKeyResponse(BaseModel):
+    id: str
+    revoked: bool = True
+
+
+class FrameResult(BaseModel):
+    """Message sent back for each handled frame of a camera WebSocket session."""
+    frame: int  # Sequence number of the frame in the session (starting at 0)
+    # processed: OCR ran on this frame
+    # unchanged: frame nearly identical to the last processed one, its output still applies
+    # busy:      inference queue full, frame skipped
+    # error:     OCR failed on this frame
+    status: Literal["processed", "unchanged", "busy", "error"]
+    dropped: int = 0  # Stale frames dropped (never processed) since the previous message
+    output: Optional[OcrOutput] = None
+    detail: Optional[str] = None
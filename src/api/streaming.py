@@ -0,0 +1,49 @@
+from typing import AsyncGenerator, AsyncIterator, Optional
+
+from fastapi.responses import StreamingResponse
+
+from src.domain.models import OcrStreamEvent
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def _encode_ndjson(event: OcrStreamEvent) -> str:
+    return event.model_dump_json(exclude_none=True) + "\n"
+
+def _encode_sse(event: OcrStreamEvent) -> str:
+    return f"event: {event.event}\ndata: {event.model_dump_json(exclude_none=True)}\n\n"
+
+async def ocr_stream_response(
+    events: AsyncGenerator[OcrStreamEvent, None],
+    accept: Optional[str],
+) -> StreamingResponse:
+    """
+    Build a streaming response from OCR events: Server-Sent Events if the client
+    accepts text/event-stream, newline-delimited JSON otherwise.
+
+    The first event is awaited before the response starts, so errors raised before
+    any output (e.g. a full inference queue) still produce a regular error response.
+    Failures after that are reported as a final "error" event.
+    """
+    use_sse = accept is not None and SSE_MEDIA_TYPE in accept
+    encode = _encode_sse if use_sse else _encode_ndjson
+    first = await anext(events)
+
+    async def body() -> AsyncIterator[str]:
+        yield encode(first)
+        try:
+            async for event in events:
+                yield encode(event)
+        except Exception as e:
+            yield encode(OcrStreamEvent(event="error", detail=str(e)))
+        finally:
+            # Stops the inference early if the client went away
+            await events.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type=SSE_MEDIA_TYPE if use_sse else NDJSON_MEDIA_TYPE,
+        # Let proxies forward chunks as soon as they are produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -14,7 +14,34 @@ class ConfigField(Enum):
     LMS_API_BASE_URI_FOR_CONTAINER = "LMS_API_BASE_URI_FOR_CONTAINER"
     MONGODB_URI                    = "MONGODB_URI"
     MONGO_DATABASE                 = "MONGO_DATABASE"
+    MONGODB_MAX_POOL_SIZE          = "MONGODB_MAX_POOL_SIZE"
+    MONGODB_MIN_POOL_SIZE          = "MONGODB_MIN_POOL_SIZE"
+    MONGODB_TIMEOUT_MS             = "MONGODB_TIMEOUT_MS"
     API_KEY_REPOSITORY             = "API_KEY_REPOSITORY"
+    OCR_BATCH_MAX_SIZE             = "OCR_BATCH_MAX_SIZE"
+    OCR_BATCH_MAX_WAIT_MS          = "OCR_BATCH_MAX_WAIT_MS"
+    OCR_BATCH_MAX_IN_FLIGHT        = "OCR_BATCH_MAX_IN_FLIGHT"
+    INFERENCE_EXECUTOR             = "INFERENCE_EXECUTOR"
+    INFERENCE_MAX_WORKERS          = "INFERENCE_MAX_WORKERS"
+    INFERENCE_MAX_QUEUE_SIZE       = "INFERENCE_MAX_QUEUE_SIZE"
+    INFERENCE_RETRY_AFTER_S        = "INFERENCE_RETRY_AFTER_S"
+    WS_FRAME_CHANGE_THRESHOLD      = "WS_FRAME_CHANGE_THRESHOLD"
+    OCR_CACHE_MAX_BYTES            = "OCR_CACHE_MAX_BYTES"
+    OCR_CACHE_TTL_S                = "OCR_CACHE_TTL_S"
+    API_KEY_CACHE_TTL_S            = "API_KEY_CACHE_TTL_S"
+    API_KEY_CACHE_NEGATIVE_TTL_S   = "API_KEY_CACHE_NEGATIVE_TTL_S"
+    API_KEY_CACHE_MAX_ENTRIES      = "API_KEY_CACHE_MAX_ENTRIES"
+    API_KEY_USAGE_FLUSH_INTERVAL_S = "API_KEY_USAGE_FLUSH_INTERVAL_S"
+    API_KEY_USAGE_FLUSH_MAX_KEYS   = "API_KEY_USAGE_FLUSH_MAX_KEYS"
+    API_KEY_SIGNING_KEYS           = "API_KEY_SIGNING_KEYS"
+    API_KEY_SIGNED_MAX_AGE_S       = "API_KEY_SIGNED_MAX_AGE_S"
+    API_KEY_REVOCATION_REFRESH_S   = "API_KEY_REVOCATION_REFRESH_S"
+    API_KEY_REVOCATION_SKEW_S      = "API_KEY_REVOCATION_SKEW_S"
+    RATE_LIMIT_PER_S               = "RATE_LIMIT_PER_S"
+    RATE_LIMIT_BURST               = "RATE_LIMIT_BURST"
+    RATE_LIMIT_MAX_CONCURRENCY     = "RATE_LIMIT_MAX_CONCURRENCY"
+    RATE_LIMIT_MAX_KEYS            = "RATE_LIMIT_MAX_KEYS"
+    MAX_UPLOAD_BYTES               = "MAX_UPLOAD_BYTES"
 
 
 class AppConfig:
@@ -57,11 +84,134 @@ class AppConfig:
     @property
     def mongodb_database(self) -> str:
         return self._get(ConfigField.MONGO_DATABASE, "")
-    
+
+    @property
+    def mongodb_max_pool_size(self) -> int:
+        return int(self._get(ConfigField.MONGODB_MAX_POOL_SIZE, "100"))
+
+    @property
+    def mongodb_min_pool_size(self) -> int:
+        return int(self._get(ConfigField.MONGODB_MIN_POOL_SIZE, "0"))
+
+    @property
+    def mongodb_timeout_ms(self) -> int:
+        # Server selection, connection and socket timeout
+        return int(self._get(ConfigField.MONGODB_TIMEOUT_MS, "5000"))
+
     @property
     def api_key_repository(self) -> str:
         return self._get(ConfigField.API_KEY_REPOSITORY, "")    
 
+    @property
+    def ocr_batch_max_size(self) -> int:
+        # 1 disables micro-batching
+        return int(self._get(ConfigField.OCR_BATCH_MAX_SIZE, "8"))
+
+    @property
+    def ocr_batch_max_wait_ms(self) -> float:
+        return float(self._get(ConfigField.OCR_BATCH_MAX_WAIT_MS, "5"))
+
+    @property
+    def ocr_batch_max_in_flight(self) -> int:
+        # Batches running at once (more than one lets pipelined adapters overlap them)
+        return int(self._get(ConfigField.OCR_BATCH_MAX_IN_FLIGHT, "2"))
+
+    @property
+    def inference_executor(self) -> str:
+        # "thread" or "process"
+        return self._get(ConfigField.INFERENCE_EXECUTOR, "thread")
+
+    @property
+    def inference_max_workers(self) -> int:
+        return int(self._get(ConfigField.INFERENCE_MAX_WORKERS, "8"))
+
+    @property
+    def inference_max_queue_size(self) -> int:
+        return int(self._get(ConfigField.INFERENCE_MAX_QUEUE_SIZE, "32"))
+
+    @property
+    def inference_retry_after_s(self) -> int:
+        return int(self._get(ConfigField.INFERENCE_RETRY_AFTER_S, "1"))
+
+    @property
+    def ws_frame_change_threshold(self) -> int:
+        # Max perceptual hash distance (bits, out of 64) for a frame to count as unchanged
+        return int(self._get(ConfigField.WS_FRAME_CHANGE_THRESHOLD, "4"))
+
+    @property
+    def ocr_cache_max_bytes(self) -> int:
+        # 0 disables the OCR result cache
+        return int(self._get(ConfigField.OCR_CACHE_MAX_BYTES, str(64 * 1024 * 1024)))
+
+    @property
+    def ocr_cache_ttl_s(self) -> float:
+        return float(self._get(ConfigField.OCR_CACHE_TTL_S, "600"))
+
+    @property
+    def api_key_cache_ttl_s(self) -> float:
+        # 0 disables the verified API key cache
+        return float(self._get(ConfigField.API_KEY_CACHE_TTL_S, "60"))
+
+    @property
+    def api_key_cache_negative_ttl_s(self) -> float:
+        # How long unknown keys are rejected without a lookup
+        return float(self._get(ConfigField.API_KEY_CACHE_NEGATIVE_TTL_S, "5"))
+
+    @property
+    def api_key_cache_max_entries(self) -> int:
+        return int(self._get(ConfigField.API_KEY_CACHE_MAX_ENTRIES, "10000"))
+
+    @property
+    def api_key_usage_flush_interval_s(self) -> float:
+        return float(self._get(ConfigField.API_KEY_USAGE_FLUSH_INTERVAL_S, "5"))
+
+    @property
+    def api_key_usage_flush_max_keys(self) -> int:
+        # Flush early once this many keys have pending usage
+        return int(self._get(ConfigField.API_KEY_USAGE_FLUSH_MAX_KEYS, "1000"))
+
+    @property
+    def api_key_signing_keys(self) -> str:
+        # `kid:secret,...`, the first one signs new keys, empty disables signed keys
+        return self._get(ConfigField.API_KEY_SIGNING_KEYS, "")
+
+    @property
+    def api_key_signed_max_age_s(self) -> float:
+        # 0: signed keys never expire
+        return float(self._get(ConfigField.API_KEY_SIGNED_MAX_AGE_S, "0"))
+
+    @property
+    def api_key_revocation_refresh_s(self) -> float:
+        return float(self._get(ConfigField.API_KEY_REVOCATION_REFRESH_S, "5"))
+
+    @property
+    def api_key_revocation_skew_s(self) -> float:
+        # Revocation refreshes overlap the previous one by this much (late or out of order writes)
+        return float(self._get(ConfigField.API_KEY_REVOCATION_SKEW_S, "30"))
+
+    @property
+    def rate_limit_per_s(self) -> float:
+        # Default requests per second per API key, 0 disables rate limiting
+        return float(self._get(ConfigField.RATE_LIMIT_PER_S, "10"))
+
+    @property
+    def rate_limit_burst(self) -> int:
+        return int(self._get(ConfigField.RATE_LIMIT_BURST, "20"))
+
+    @property
+    def rate_limit_max_concurrency(self) -> int:
+        # Default max inferences running or queued per API key, 0: unlimited
+        return int(self._get(ConfigField.RATE_LIMIT_MAX_CONCURRENCY, "8"))
+
+    @property
+    def rate_limit_max_keys(self) -> int:
+        return int(self._get(ConfigField.RATE_LIMIT_MAX_KEYS, "100000"))
+
+    @property
+    def max_upload_bytes(self) -> int:
+        # Max request body size of binary image uploads, 0: unlimited
+        return int(self._get(ConfigField.MAX_UPLOAD_BYTES, str(20 * 1024 * 1024)))
+
 
 # Single, module‐level instance
 CONFIG = AppConfig()
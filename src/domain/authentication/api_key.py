@@ -12,6 +12,11 @@ class ApiKey(BaseModel):
     initialized_in: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     last_use_in: Optional[datetime] = None
     number_of_requests: int = 0
+    revoked_in: Optional[datetime] = None
+    # Per-key overrides of the default rate limits (None: default)
+    rate_limit_per_s: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
+    max_concurrency: Optional[int] = None
 
     def update_usage(self,
                      last_use_in: Optional[datetime] = None,
@@ -20,4 +25,18 @@ class ApiKey(BaseModel):
             last_use_in = datetime.now(timezone.utc)
         self.last_use_in = last_use_in
         self.number_of_requests += increment
-        return self
\ No newline at end of file
+        return self
+
+
+class ApiKeyUsage(BaseModel):
+    """
+    Usage of one ApiKey aggregated over several requests, not yet persisted.
+    """
+    increment: int = 0
+    last_use_in: Optional[datetime] = None
+
+    def add(self, last_use_in: datetime, increment: int = 1) -> "ApiKeyUsage":
+        self.increment += increment
+        if self.last_use_in is None or last_use_in > self.last_use_in:
+            self.last_use_in = last_use_in
+        return self
@@ -1,15 +1,28 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Dict, Optional
 
-from src.domain.authentication.api_key import ApiKey
+from src.domain.authentication.api_key import ApiKey, ApiKeyUsage
 
 
 class ApiKeyRepository(ABC):
+    async def start(self) -> None:
+        """
+        Connect and prepare the backend (e.g. indexes), called once at app startup.
+        Should raise if the backend is unreachable.
+        """
+        pass
+
+    async def close(self) -> None:
+        """
+        Release backend resources, called once at app shutdown.
+        """
+        pass
+
     @abstractmethod
     async def get_by_key(self, key: str) -> Optional[ApiKey]:
         """
-        Retrieve an ApiKey by its plain-text key. Return None if not found.
+        Retrieve an ApiKey by its plain-text key. Return None if not found (or revoked).
         """
         pass
 
@@ -24,6 +37,15 @@ class ApiKeyRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    async def register(self, entity: ApiKey) -> ApiKey:
+        """
+        Store the record of a key verified without a lookup (e.g. a signed key): its
+        `hashed_key` is empty and the backend appends the record id to its `key_prefix`.
+        Should return the stored entity (with id populated).
+        """
+        pass
+
     @abstractmethod
     async def update_usage(
         self,
@@ -34,4 +56,29 @@ class ApiKeyRepository(ABC):
         """
         Update the last_use timestamp and increment number_of_requests.
         """
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def add_usage(self, usages: Dict[str, ApiKeyUsage]) -> None:
+        """
+        Persist aggregated usage of several keys (by id) at once: number_of_requests
+        is incremented and last_use_in only moves forward, so concurrent writers
+        never lose updates.
+        """
+        pass
+
+    @abstractmethod
+    async def get_revoked_ids(self, since: Optional[datetime] = None) -> Dict[str, datetime]:
+        """
+        Return the ids of keys revoked at or after `since` (all revoked keys if None),
+        with their revocation time.
+        """
+        pass
+
+    @abstractmethod
+    async def revoke(self, key_id: str) -> bool:
+        """
+        Mark the ApiKey as revoked, it is no longer returned by `get_by_key`.
+        Return False if no such key exists.
+        """
+        pass
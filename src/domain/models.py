@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+from pydantic import BaseModel, ConfigDict
+from typing import Iterator, List, Literal, Optional, Dict, Tuple
 
 
 class Rect(BaseModel):
@@ -21,6 +21,20 @@ class OcrLangs:
 
 class OcrOptions(BaseModel):
     lang: OcrLang = OcrLangs.EN
+    # Latency/quality profile of the adapter (e.g. "fast", "accurate"), None: its default
+    profile: Optional[str] = None
+
+
+class OcrImageInput(BaseModel):
+    """
+    Encoded image carried as one immutable buffer.
+    This is what adapters receive: they read `content` directly (no copies).
+    """
+    model_config = ConfigDict(frozen=True)
+
+    content: bytes
+    metadata: Optional[Dict[str, object]] = None
+    options: OcrOptions = OcrOptions()
 
 
 class OcrInput(BaseModel):
@@ -28,6 +42,14 @@ class OcrInput(BaseModel):
     metadata: Optional[Dict[str, object]] = None
     options: OcrOptions = OcrOptions()
 
+    def to_image_input(self) -> OcrImageInput:
+        """Pack the JSON integer list into a single buffer (the only copy)."""
+        return OcrImageInput(
+            content=bytes(self.bytes),
+            metadata=self.metadata,
+            options=self.options,
+        )
+
 
 class OcrResult(BaseModel):
     text: str
@@ -37,3 +59,63 @@ class OcrResult(BaseModel):
 class OcrOutput(BaseModel):
     texts: list[OcrResult]
     description: Optional[Dict[str, object]] = []
+
+    def to_stream_events(self) -> Iterator["OcrStreamEvent"]:
+        """Emit a complete output as one burst of stream events."""
+        yield OcrStreamEvent(event="layout", boxes=[result.box for result in self.texts])
+        for index, result in enumerate(self.texts):
+            yield OcrStreamEvent(event="result", index=index, result=result)
+        yield OcrStreamEvent(event="done", description=self.description or None)
+
+
+class OcrColumnarOutput(BaseModel):
+    """
+    Same content as OcrOutput, stored as parallel columns instead of one object per text block:
+    `texts[i]` was read with `confidences[i]` in `boxes[i]` = [left, top, right, bottom].
+    Adapters fill it directly, which avoids building (and serializing) a model per box.
+    """
+    texts: List[str]
+    confidences: List[Optional[float]]
+    boxes: List[Tuple[float, float, float, float]]
+    description: Optional[Dict[str, object]] = None
+
+    @classmethod
+    def from_output(cls, output: OcrOutput) -> "OcrColumnarOutput":
+        return cls(
+            texts=[result.text for result in output.texts],
+            confidences=[result.confidence for result in output.texts],
+            boxes=[
+                (result.box.left, result.box.top, result.box.right, result.box.bottom)
+                for result in output.texts
+            ],
+            description=output.description or None,
+        )
+
+    def to_output(self) -> OcrOutput:
+        output = OcrOutput(texts=[
+            OcrResult(
+                text=text,
+                confidence=confidence,
+                box=Rect(left=box[0], top=box[1], right=box[2], bottom=box[3]),
+            )
+            for text, confidence, box in zip(self.texts, self.confidences, self.boxes)
+        ])
+        if self.description is not None:
+            output.description = self.description
+        return output
+
+
+class OcrStreamEvent(BaseModel):
+    """
+    One chunk of a streamed OCR response, in order:
+      - "layout": all detected boxes, before any recognition
+      - "result": one recognized text block, `index` refers to its box in the layout
+      - "done":   end of stream, with the optional description
+      - "error":  inference failed mid-stream
+    """
+    event: Literal["layout", "result", "done", "error"]
+    boxes: Optional[List[Rect]] = None
+    index: Optional[int] = None
+    result: Optional[OcrResult] = None
+    description: Optional[Dict[str, object]] = None
+    detail: Optional[str] = None
@@ -1,14 +1,146 @@
 from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterator, List, Optional, Type, TypeVar
 
-from src.domain.models import OcrInput, OcrOutput
+from src.domain.models import OcrColumnarOutput, OcrImageInput, OcrOutput, OcrStreamEvent
+
+CachedOutput = TypeVar("CachedOutput", OcrOutput, OcrColumnarOutput)
 
 class OcrPort(ABC):
     """
     Port/interface for OCR implementations.
     """
     @abstractmethod
-    def predict(self, ocrInput: OcrInput) -> OcrOutput:
+    def predict(self, ocrInput: OcrImageInput) -> OcrOutput:
         """
         Perform OCR on the given input data.
         """
         pass
+
+    def predict_stream(self, ocrInput: OcrImageInput) -> Iterator[OcrStreamEvent]:
+        """
+        Perform OCR, yielding a "layout" event, then each result as soon as it is
+        recognized, then a "done" event.
+        Adapters able to recognize incrementally should override this,
+        by default everything is emitted at once after `predict`.
+        """
+        yield from self.predict(ocrInput).to_stream_events()
+
+    def predict_columnar(self, ocrInput: OcrImageInput) -> OcrColumnarOutput:
+        """
+        Perform OCR, returning the output as columns.
+        Adapters producing columns natively should override this (and derive `predict` from it),
+        by default the output of `predict` is converted.
+        """
+        return OcrColumnarOutput.from_output(self.predict(ocrInput))
+
+    def pipeline_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Metrics of the adapter's internal processing stages (e.g. per-stage utilization).
+        None by default, for adapters processing each call in one go.
+        """
+        return None
+
+    def model_stats(self) -> Optional[Dict[str, float]]:
+        """
+        Metrics of the models the adapter loads on demand (e.g. per-language loads, hits
+        and evictions). None by default, for adapters loading everything at startup.
+        """
+        return None
+
+    def close(self) -> None:
+        """
+        Release resources held by the adapter (e.g. worker threads), nothing by default.
+        """
+        pass
+
+
+class BatchOcrPort(OcrPort):
+    """
+    Optional extension of OcrPort for adapters able to run several images in one call.
+    """
+    @abstractmethod
+    def predict_batch(self, ocrInputs: List[OcrImageInput]) -> List[OcrOutput]:
+        """
+        Perform OCR on several inputs at once.
+        Must return exactly one output per input, in the same order.
+        """
+        pass
+
+    def predict_batch_columnar(self, ocrInputs: List[OcrImageInput]) -> List[OcrColumnarOutput]:
+        """
+        Same as `predict_batch`, returning the outputs as columns.
+        """
+        return [OcrColumnarOutput.from_output(output) for output in self.predict_batch(ocrInputs)]
+
+
+class AsyncOcrPort(OcrPort):
+    """
+    Optional extension of OcrPort for adapters waiting on I/O (e.g. a remote model API):
+    `predict_async` is awaited on the event loop instead of holding a worker thread.
+    Cancelling it must cancel the work in flight.
+    """
+    @abstractmethod
+    async def predict_async(self, ocrInput: OcrImageInput) -> OcrOutput:
+        """
+        Same as `predict`, as a coroutine.
+        """
+        pass
+
+    async def predict_columnar_async(self, ocrInput: OcrImageInput) -> OcrColumnarOutput:
+        """
+        Same as `predict_columnar`, as a coroutine.
+        """
+        return OcrColumnarOutput.from_output(await self.predict_async(ocrInput))
+
+
+class OcrCachePort(ABC):
+    """
+    Port for caching OCR outputs of identical requests (same image, adapter and options).
+    OcrOutput and OcrColumnarOutput are cached separately, as selected by `output_type`.
+    Cached outputs are shared between callers and must be treated as read-only.
+    """
+    @abstractmethod
+    def key(self, ocrInput: OcrImageInput, output_type: Type[CachedOutput] = OcrOutput) -> str:
+        """
+        Return the key identifying the output cached for this input.
+        """
+        pass
+
+    @abstractmethod
+    def get(
+        self,
+        ocrInput: OcrImageInput,
+        output_type: Type[CachedOutput] = OcrOutput,
+        key: Optional[str] = None,
+    ) -> Optional[CachedOutput]:
+        """
+        Return the cached output for this input, or None.
+        `key`: the input's `key`, if already computed.
+        """
+        pass
+
+    @abstractmethod
+    def put(
+        self,
+        ocrInput: OcrImageInput,
+        output: OcrOutput | OcrColumnarOutput,
+        key: Optional[str] = None,
+    ) -> None:
+        """
+        Store the output computed for this input.
+        `key`: the input's `key`, if already computed.
+        """
+        pass
+
+    @abstractmethod
+    def get_or_compute(
+        self,
+        ocrInput: OcrImageInput,
+        compute: Callable[[], CachedOutput],
+        output_type: Type[CachedOutput] = OcrOutput,
+    ) -> CachedOutput:
+        """
+        Return the cached output for this input, or run `compute` and store its output.
+        Concurrent calls for the same input must run `compute` only once.
+        """
+        pass
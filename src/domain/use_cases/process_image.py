@@ -1,17 +1,119 @@
-from src.domain.models import OcrInput, OcrOutput
-from src.domain.ports import OcrPort
+from functools import partial
+from typing import Iterator, Optional
+
+from src.domain.models import OcrColumnarOutput, OcrImageInput, OcrInput, OcrOutput, OcrStreamEvent
+from src.domain.ports import AsyncOcrPort, OcrCachePort, OcrPort
 
 
 class ProcessImageUseCase:
     """
     Use-case for processing an image via OCR.
     """
-    def __init__(self, ocr_port: OcrPort):
+    def __init__(self, ocr_port: OcrPort, cache: Optional[OcrCachePort] = None):
         self._ocr_port = ocr_port
+        self._cache = cache
+
+    @property
+    def cache(self) -> Optional[OcrCachePort]:
+        """The cache of OCR outputs, if any."""
+        return self._cache
+
+    def execute(self, ocr_input: OcrInput | OcrImageInput, use_cache: bool = True) -> OcrOutput:
+        """
+        Delegate an OcrInput (JSON) or OcrImageInput (binary) to the OCRPort and return OCRResponse.
+        Identical requests are served from the cache (if any), unless `use_cache` is False.
+        """
+        if isinstance(ocr_input, OcrInput):
+            ocr_input = ocr_input.to_image_input()
+        if self._cache is None or not use_cache:
+            return self._ocr_port.predict(ocr_input)
+        return self._cache.get_or_compute(ocr_input, partial(self._ocr_port.predict, ocr_input))
+
+    def execute_columnar(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool = True,
+    ) -> OcrColumnarOutput:
+        """
+        Same as `execute`, but returns the output as columns (compact response formats).
+        """
+        if isinstance(ocr_input, OcrInput):
+            ocr_input = ocr_input.to_image_input()
+        if self._cache is None or not use_cache:
+            return self._ocr_port.predict_columnar(ocr_input)
+        return self._cache.get_or_compute(
+            ocr_input,
+            partial(self._ocr_port.predict_columnar, ocr_input),
+            OcrColumnarOutput,
+        )
+
+    @property
+    def is_async(self) -> bool:
+        """Whether the OCRPort can be awaited on the event loop (`execute_async`)."""
+        return isinstance(self._ocr_port, AsyncOcrPort)
 
-    def execute(self, ocr_input: OcrInput) -> OcrOutput:
+    async def execute_async(self, ocr_input: OcrInput | OcrImageInput, use_cache: bool = True) -> OcrOutput:
         """
-        Delegate a Pydantic OcrInput to the OCRPort and return OCRResponse.
+        Same as `execute`, awaiting an AsyncOcrPort: cancelling it cancels the OCR.
+        Concurrent identical requests each run the OCR (the cache is read, then written).
         """
-        result = self._ocr_port.predict(ocr_input)
-        return result
\ No newline at end of file
+        assert isinstance(self._ocr_port, AsyncOcrPort), "execute_async requires an AsyncOcrPort"
+        if isinstance(ocr_input, OcrInput):
+            ocr_input = ocr_input.to_image_input()
+        cached = self._cache.get(ocr_input) if self._cache is not None and use_cache else None
+        if cached is not None:
+            return cached
+        output = await self._ocr_port.predict_async(ocr_input)
+        if self._cache is not None and use_cache:
+            self._cache.put(ocr_input, output)
+        return output
+
+    async def execute_columnar_async(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool = True,
+    ) -> OcrColumnarOutput:
+        """
+        Same as `execute_async`, but returns the output as columns.
+        """
+        assert isinstance(self._ocr_port, AsyncOcrPort), "execute_columnar_async requires an AsyncOcrPort"
+        if isinstance(ocr_input, OcrInput):
+            ocr_input = ocr_input.to_image_input()
+        cached = self._cache.get(ocr_input, OcrColumnarOutput) if self._cache is not None and use_cache else None
+        if cached is not None:
+            return cached
+        output = await self._ocr_port.predict_columnar_async(ocr_input)
+        if self._cache is not None and use_cache:
+            self._cache.put(ocr_input, output)
+        return output
+
+    def execute_stream(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool = True,
+    ) -> Iterator[OcrStreamEvent]:
+        """
+        Same as `execute`, but yields OcrStreamEvents as soon as the OCRPort produces them.
+        Cached outputs are emitted at once, fresh ones are stored once the stream completes.
+        """
+        if isinstance(ocr_input, OcrInput):
+            ocr_input = ocr_input.to_image_input()
+        if self._cache is None or not use_cache:
+            yield from self._ocr_port.predict_stream(ocr_input)
+            return
+
+        cached = self._cache.get(ocr_input)
+        if cached is not None:
+            yield from cached.to_stream_events()
+            return
+
+        results = []
+        for event in self._ocr_port.predict_stream(ocr_input):
+            if event.result is not None:
+                results.append(event.result)
+            if event.event == "done":
+                output = OcrOutput(texts=results)
+                if event.description is not None:
+                    output.description = event.description
+                self._cache.put(ocr_input, output)
+            yield event
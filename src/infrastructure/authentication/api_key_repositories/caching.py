@@ -0,0 +1,172 @@
+import hashlib
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from src.core.config import CONFIG
+from src.domain.authentication.api_key import ApiKey, ApiKeyUsage
+from src.domain.authentication.api_key_repository import ApiKeyRepository
+from src.infrastructure.authentication.api_key_repositories.registry import get_api_key_repository
+from src.infrastructure.authentication.api_key_repositories.signed import (
+    SignedApiKeyRepository,
+    parse_signing_keys,
+)
+
+
+class CachingApiKeyRepository(ApiKeyRepository):
+    """
+    ApiKeyRepository decorator caching `get_by_key` verifications in memory.
+
+    Successful lookups are kept for `ttl_s` seconds, failed ones for `negative_ttl_s`
+    seconds (so repeated invalid keys don't hit the database and bcrypt), each bounded
+    to `max_entries` (least recently used first out).
+    Entries are keyed by a keyed BLAKE2b digest of the presented key, with a random
+    per-process secret: plain-text keys are never stored.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        repository: ApiKeyRepository,
+        ttl_s: float,
+        negative_ttl_s: float,
+        max_entries: int,
+    ):
+        self._repository = repository
+        self._ttl_s = ttl_s
+        self._negative_ttl_s = negative_ttl_s
+        self._max_entries = max_entries
+        self._secret = secrets.token_bytes(32)
+
+        self._verified: "OrderedDict[bytes, Tuple[ApiKey, float]]" = OrderedDict()
+        self._rejected: "OrderedDict[bytes, float]" = OrderedDict()
+        # Bumped on revocation, so lookups started before it don't cache stale entities
+        self._generation = 0
+
+        # Metrics
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+
+    async def start(self) -> None:
+        await self._repository.start()
+
+    async def close(self) -> None:
+        await self._repository.close()
+
+    def _digest(self, key: str) -> bytes:
+        return hashlib.blake2b(key.encode(), key=self._secret, digest_size=32).digest()
+
+    async def get_by_key(self, key: str) -> Optional[ApiKey]:
+        digest = self._digest(key)
+        now = time.monotonic()
+
+        verified = self._verified.get(digest)
+        if verified is not None:
+            entity, expires_at = verified
+            if expires_at > now:
+                self._verified.move_to_end(digest)
+                self._hits += 1
+                return entity
+            del self._verified[digest]
+
+        rejected_until = self._rejected.get(digest)
+        if rejected_until is not None:
+            if rejected_until > now:
+                self._negative_hits += 1
+                return None
+            del self._rejected[digest]
+
+        self._misses += 1
+        generation = self._generation
+        entity = await self._repository.get_by_key(key)
+        if generation != self._generation:
+            return entity
+        if entity is not None:
+            self._insert(self._verified, digest, (entity, time.monotonic() + self._ttl_s))
+        elif self._negative_ttl_s > 0:
+            self._insert(self._rejected, digest, time.monotonic() + self._negative_ttl_s)
+        return entity
+
+    async def create(self, key: Optional[str] = None) -> ApiKey:
+        return await self._repository.create(key)
+
+    async def register(self, entity: ApiKey) -> ApiKey:
+        return await self._repository.register(entity)
+
+    async def update_usage(
+        self,
+        entity: ApiKey,
+        last_use_in: Optional[datetime] = None,
+        increment: int = 1
+    ) -> ApiKey:
+        return await self._repository.update_usage(entity, last_use_in, increment)
+
+    async def add_usage(self, usages: Dict[str, ApiKeyUsage]) -> None:
+        await self._repository.add_usage(usages)
+
+    async def get_revoked_ids(self, since: Optional[datetime] = None) -> Dict[str, datetime]:
+        return await self._repository.get_revoked_ids(since)
+
+    async def revoke(self, key_id: str) -> bool:
+        self.invalidate(key_id)
+        return await self._repository.revoke(key_id)
+
+    def invalidate(self, key_id: str) -> None:
+        """Drop the cached verifications of this key, e.g. after revoking it elsewhere."""
+        self._generation += 1
+        for digest in [digest for digest, (entity, _) in self._verified.items() if entity.id == key_id]:
+            del self._verified[digest]
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._verified),
+            "negative_entries": len(self._rejected),
+            "hits": self._hits,
+            "negative_hits": self._negative_hits,
+            "misses": self._misses,
+        }
+
+    def _insert(self, entries: OrderedDict, digest: bytes, value: object) -> None:
+        entries[digest] = value
+        entries.move_to_end(digest)
+        while len(entries) > self._max_entries:
+            entries.popitem(last=False)
+
+
+def create_api_key_repository(name: str) -> ApiKeyRepository:
+    """
+    Build the registered repository, wrapped in the verification cache and in signed
+    key verification unless disabled in CONFIG.
+    """
+    repository = get_api_key_repository(name)()
+    if CONFIG.api_key_cache_ttl_s > 0:
+        repository = CachingApiKeyRepository(
+            repository,
+            ttl_s=CONFIG.api_key_cache_ttl_s,
+            negative_ttl_s=CONFIG.api_key_cache_negative_ttl_s,
+            max_entries=CONFIG.api_key_cache_max_entries,
+        )
+    signing_keys = parse_signing_keys(CONFIG.api_key_signing_keys)
+    if signing_keys:
+        repository = SignedApiKeyRepository(
+            repository,
+            signing_keys,
+            revocation_refresh_s=CONFIG.api_key_revocation_refresh_s,
+            revocation_skew_s=CONFIG.api_key_revocation_skew_s,
+            max_age_s=CONFIG.api_key_signed_max_age_s,
+        )
+    return repository
+
+
+def get_api_key_repository_stats(repository: ApiKeyRepository) -> Optional[Dict[str, float]]:
+    """Stats of the verification cache and signed key verification (None when both are disabled)."""
+    stats: Dict[str, float] = {}
+    if isinstance(repository, SignedApiKeyRepository):
+        stats.update(repository.stats())
+        repository = repository.repository
+    if isinstance(repository, CachingApiKeyRepository):
+        stats.update(repository.stats())
+    return stats or None
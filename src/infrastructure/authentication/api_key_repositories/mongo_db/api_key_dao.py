@@ -28,6 +28,10 @@ class ApiKeyDAO(BaseModel):
     initialized_in: datetime
     last_use_in: Optional[datetime] = None
     number_of_requests: int = 0
+    revoked_in: Optional[datetime] = None
+    rate_limit_per_s: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
+    max_concurrency: Optional[int] = None
 
     class Config:
         validate_by_name = True
@@ -42,6 +46,10 @@ class ApiKeyDAO(BaseModel):
             initialized_in=self.initialized_in,
             last_use_in=self.last_use_in,
             number_of_requests=self.number_of_requests,
+            revoked_in=self.revoked_in,
+            rate_limit_per_s=self.rate_limit_per_s,
+            rate_limit_burst=self.rate_limit_burst,
+            max_concurrency=self.max_concurrency,
         )
 
     @classmethod
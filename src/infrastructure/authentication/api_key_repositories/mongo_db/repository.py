@@ -1,11 +1,15 @@
+import asyncio
 from datetime import datetime
 import secrets
 import string
-from typing import Optional
+from typing import Dict, Optional
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
 from src.core.config import CONFIG
-from src.domain.authentication.api_key import ApiKey
+from src.domain.authentication.api_key import ApiKey, ApiKeyUsage
 from src.domain.authentication.api_key_repository import ApiKeyRepository
 from src.infrastructure.authentication.api_key_repositories.registry import register_api_key_repository
 from src.infrastructure.authentication.api_key_repositories.mongo_db.api_key_dao import ApiKeyDAO
@@ -14,28 +18,60 @@ from src.infrastructure.authentication.utils.hash_provider import HashProvider
 API_KEYS_COLLECTION = "api_keys"
 KEY_PREFIX_SIZE = 10
 KEY_SIZE = 48
+# Generated keys are retried on (unlikely) key_prefix collisions
+CREATE_ATTEMPTS = 5
+# Fields needed to authenticate and rate limit (usage counters are only ever incremented)
+AUTHENTICATION_PROJECTION = {
+    "hashed_key": 1,
+    "key_prefix": 1,
+    "initialized_in": 1,
+    "rate_limit_per_s": 1,
+    "rate_limit_burst": 1,
+    "max_concurrency": 1,
+}
+
 @register_api_key_repository("mongo_db")
 class MongoDbApiKeyRepository(ApiKeyRepository):
     def __init__(self):
-        # Initialize Motor client & select database/collection
-        self._client = AsyncIOMotorClient(CONFIG.mongodb_uri)
+        # Initialize Motor client (one connection pool, shared by all requests) & select database/collection
+        self._client = AsyncIOMotorClient(
+            CONFIG.mongodb_uri,
+            maxPoolSize=CONFIG.mongodb_max_pool_size,
+            minPoolSize=CONFIG.mongodb_min_pool_size,
+            serverSelectionTimeoutMS=CONFIG.mongodb_timeout_ms,
+            connectTimeoutMS=CONFIG.mongodb_timeout_ms,
+            socketTimeoutMS=CONFIG.mongodb_timeout_ms,
+        )
         self._db = self._client[CONFIG.mongodb_database]
         self._collection = self._db[API_KEYS_COLLECTION]
         self._hash_provider = HashProvider()
 
+    async def start(self) -> None:
+        """
+        Fail fast if MongoDB is unreachable, and ensure the `key_prefix` index lookups rely on
+        (and the `revoked_in` index revocation refreshes rely on).
+        """
+        await self._db.command("ping")
+        await self._collection.create_index([("key_prefix", ASCENDING)], unique=True)
+        # Revoked keys are refreshed incrementally by revocation time
+        await self._collection.create_index([("revoked_in", ASCENDING)], sparse=True)
+
+    async def close(self) -> None:
+        self._client.close()
+
     async def get_by_key(self, key: str) -> Optional[ApiKey]:
         """
-        Retrieve an ApiKey by its plain-text key. Return None if not found.
+        Retrieve an ApiKey by its plain-text key. Return None if not found (or revoked).
         """
         key_prefix = key[:KEY_PREFIX_SIZE]
-        cursor = self._collection.find({"key_prefix": key_prefix}) # This will be indexed search
-        matching = None
-        async for doc in cursor:
-            if self._hash_provider.verify_api_key(key, doc["hashed_key"]):
-                matching = doc
-                break
-        if matching is not None:
-            return ApiKeyDAO(**matching).to_domain()
+        # Unique index lookup, `None` also matches documents without the field
+        doc = await self._collection.find_one(
+            {"key_prefix": key_prefix, "revoked_in": None},
+            AUTHENTICATION_PROJECTION,
+        )
+        # bcrypt is CPU-bound: keep it off the event loop
+        if doc is not None and await asyncio.to_thread(self._hash_provider.verify_api_key, key, doc["hashed_key"]):
+            return ApiKeyDAO(**doc).to_domain()
         return None
 
     async def create(
@@ -46,14 +82,26 @@ class MongoDbApiKeyRepository(ApiKeyRepository):
         Store a fresh ApiKey record in persistence.
         Should return the stored entity (with id populated).
         """
-        if key is None:
-            characters = string.ascii_letters + string.digits
-            random_part = ''.join(secrets.choice(characters) for _ in range(KEY_SIZE))
-            key = f"sk-{random_part}"            
+        if key is not None:
+            return await self._insert(key)
+        for _ in range(CREATE_ATTEMPTS - 1):
+            try:
+                return await self._insert(self._generate_key())
+            except DuplicateKeyError:
+                # key_prefix is unique: draw another key
+                pass
+        return await self._insert(self._generate_key())
+
+    def _generate_key(self) -> str:
+        characters = string.ascii_letters + string.digits
+        random_part = ''.join(secrets.choice(characters) for _ in range(KEY_SIZE))
+        return f"sk-{random_part}"
+
+    async def _insert(self, key: str) -> ApiKey:
         key_prefix = key[:KEY_PREFIX_SIZE]
         dao = ApiKeyDAO.from_domain(
             ApiKey(
-                hashed_key=self._hash_provider.hash_api_key(key),
+                hashed_key=await asyncio.to_thread(self._hash_provider.hash_api_key, key),
                 key_prefix=key_prefix
             )
         )
@@ -62,6 +110,16 @@ class MongoDbApiKeyRepository(ApiKeyRepository):
         dao.id = str(result.inserted_id)
         return dao.to_domain()
 
+    async def register(self, entity: ApiKey) -> ApiKey:
+        """
+        Store the record of a key verified without a lookup, `key_prefix` gets the
+        record id appended so it stays unique.
+        """
+        dao = ApiKeyDAO.from_domain(entity)
+        dao.key_prefix = f"{dao.key_prefix}{dao.id}"
+        await self._collection.insert_one(dao.model_dump(by_alias=True))
+        return dao.to_domain()
+
     async def update_usage(
         self,
         entity: ApiKey,
@@ -72,16 +130,46 @@ class MongoDbApiKeyRepository(ApiKeyRepository):
         Update the last_use timestamp and increment number_of_requests.
         """
         entity.update_usage(last_use_in, increment)
-        dao = ApiKeyDAO.from_domain(entity)
-        print(dao.last_use_in)
-        await self._collection.update_one(
-            {"_id": dao.id},
-            {
-                "$set": {
-                    "last_use_in": dao.last_use_in,
-                    "number_of_requests": dao.number_of_requests,
-                }
-            },
-        )
+        assert entity.id is not None and entity.last_use_in is not None
+        await self.add_usage({entity.id: ApiKeyUsage(increment=increment, last_use_in=entity.last_use_in)})
         return entity
-        
\ No newline at end of file
+
+    async def add_usage(self, usages: Dict[str, ApiKeyUsage]) -> None:
+        """
+        Persist aggregated usage of several keys (by id) in one bulk write.
+        """
+        if not usages:
+            return
+        await self._collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": ObjectId(key_id)},
+                    {
+                        "$inc": {"number_of_requests": usage.increment},
+                        "$max": {"last_use_in": usage.last_use_in},
+                    },
+                )
+                for key_id, usage in usages.items()
+            ],
+            ordered=False,
+        )
+
+    async def get_revoked_ids(self, since: Optional[datetime] = None) -> Dict[str, datetime]:
+        """
+        Return the ids of keys revoked at or after `since` (all revoked keys if None).
+        """
+        revoked_in = {"$ne": None} if since is None else {"$gte": since}
+        cursor = self._collection.find({"revoked_in": revoked_in}, {"_id": 1, "revoked_in": 1})
+        return {str(doc["_id"]): doc["revoked_in"] async for doc in cursor}
+
+    async def revoke(self, key_id: str) -> bool:
+        """
+        Mark the ApiKey as revoked, it is no longer returned by `get_by_key`.
+        Return False if no such key exists.
+        """
+        # Stamped by the server: revocation times of all instances come from one clock
+        result = await self._collection.update_one(
+            {"_id": ObjectId(key_id)},
+            {"$currentDate": {"revoked_in": True}},
+        )
+        return result.matched_count > 0
@@ -0,0 +1,203 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from src.domain.authentication.api_key import ApiKey, ApiKeyUsage
+from src.domain.authentication.api_key_repository import ApiKeyRepository
+
+# Signed keys look like `sks.<key id>.<issued at (unix s)>.<signing key id>.<signature>`
+SIGNED_KEY_PREFIX = "sks."
+_SIGNED_KEY_PARTS = 5
+
+
+class SignedApiKey(ApiKey):
+    """ApiKey minted as a signed key, with its plain-text key (only known at creation)."""
+    key: str
+
+
+def parse_signing_keys(value: str) -> List[Tuple[str, bytes]]:
+    """
+    Parse `kid:secret,kid:secret,...` signing keys, the first one signs new keys
+    and all of them verify (keep retired ones listed while their keys are in use).
+    """
+    signing_keys = []
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kid, sep, secret = item.partition(":")
+        if not sep or not kid or not secret or "." in kid:
+            raise ValueError(f"Invalid API key signing key {kid!r}, expected `kid:secret`")
+        signing_keys.append((kid, secret.encode()))
+    return signing_keys
+
+
+class SignedApiKeyRepository(ApiKeyRepository):
+    """
+    ApiKeyRepository decorator verifying signed keys without a database round trip.
+
+    A signed key carries its record id, issue time and an HMAC-SHA256 signature under
+    one of the server-side `signing_keys` (kid -> secret): verifying it is pure CPU work.
+    Revocations are checked against an in-memory set of revoked ids, refreshed from
+    the wrapped repository every `revocation_refresh_s` seconds (revoking through this
+    instance applies right away). Each refresh fetches the revocations since the latest
+    one seen minus `revocation_skew_s`, so revocations stamped earlier but written later
+    (e.g. by an instance whose clock lags) are still picked up.
+    Keys older than `max_age_s` are rejected (0: never).
+    Other (bcrypt) keys are delegated to the wrapped repository.
+    Signed keys are verified without their record, so default rate limits apply to them.
+    Must be used from a single event loop, `start` and `close` are called by the app lifespan.
+    """
+
+    def __init__(
+        self,
+        repository: ApiKeyRepository,
+        signing_keys: List[Tuple[str, bytes]],
+        revocation_refresh_s: float,
+        max_age_s: float = 0,
+        revocation_skew_s: float = 0,
+    ):
+        if not signing_keys:
+            raise ValueError("At least one API key signing key is required")
+        self._repository = repository
+        self._active_kid = signing_keys[0][0]
+        self._secrets: Dict[str, bytes] = dict(signing_keys)
+        self._revocation_refresh_s = revocation_refresh_s
+        self._max_age_s = max_age_s
+        self._revocation_skew = timedelta(seconds=revocation_skew_s)
+
+        self._revoked: Dict[str, datetime] = {}
+        self._revoked_since: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._verified = 0
+        self._rejected = 0
+        self._refreshes = 0
+        self._failed_refreshes = 0
+
+    @property
+    def repository(self) -> ApiKeyRepository:
+        return self._repository
+
+    async def start(self) -> None:
+        await self._repository.start()
+        # Fail fast: signed keys must never be accepted without the revocation set
+        await self.refresh_revocations()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._repository.close()
+
+    async def get_by_key(self, key: str) -> Optional[ApiKey]:
+        if not key.startswith(SIGNED_KEY_PREFIX):
+            return await self._repository.get_by_key(key)
+        entity = self._verify(key)
+        if entity is None:
+            self._rejected += 1
+        else:
+            self._verified += 1
+        return entity
+
+    async def create(self, key: Optional[str] = None) -> ApiKey:
+        return await self._repository.create(key)
+
+    async def create_signed(self) -> SignedApiKey:
+        """Register a new key record and mint its signed key (under the first signing key)."""
+        entity = await self._repository.register(ApiKey(hashed_key="", key_prefix=SIGNED_KEY_PREFIX))
+        assert entity.id is not None
+        issued_at = int(entity.initialized_in.timestamp())
+        payload = f"{SIGNED_KEY_PREFIX}{entity.id}.{issued_at}.{self._active_kid}"
+        key = f"{payload}.{self._sign(self._active_kid, payload)}"
+        return SignedApiKey(**entity.model_dump(), key=key)
+
+    async def register(self, entity: ApiKey) -> ApiKey:
+        return await self._repository.register(entity)
+
+    async def update_usage(
+        self,
+        entity: ApiKey,
+        last_use_in: Optional[datetime] = None,
+        increment: int = 1
+    ) -> ApiKey:
+        return await self._repository.update_usage(entity, last_use_in, increment)
+
+    async def add_usage(self, usages: Dict[str, ApiKeyUsage]) -> None:
+        await self._repository.add_usage(usages)
+
+    async def get_revoked_ids(self, since: Optional[datetime] = None) -> Dict[str, datetime]:
+        return await self._repository.get_revoked_ids(since)
+
+    async def revoke(self, key_id: str) -> bool:
+        revoked = await self._repository.revoke(key_id)
+        if revoked:
+            self._revoked[key_id] = datetime.now(timezone.utc)
+        return revoked
+
+    async def refresh_revocations(self) -> None:
+        """Fetch keys revoked since the last refresh (all of them on the first one)."""
+        since = None if self._revoked_since is None else self._revoked_since - self._revocation_skew
+        revoked = await self._repository.get_revoked_ids(since)
+        # Backends may return naive UTC datetimes
+        revoked = {
+            key_id: revoked_in if revoked_in.tzinfo is not None else revoked_in.replace(tzinfo=timezone.utc)
+            for key_id, revoked_in in revoked.items()
+        }
+        self._revoked.update(revoked)
+        if revoked:
+            latest = max(revoked.values())
+            if self._revoked_since is None or latest > self._revoked_since:
+                # Revocations at that exact time are fetched again, never missed
+                self._revoked_since = latest
+        self._refreshes += 1
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "signed_verified": self._verified,
+            "signed_rejected": self._rejected,
+            "revoked_keys": len(self._revoked),
+            "revocation_refreshes": self._refreshes,
+            "failed_revocation_refreshes": self._failed_refreshes,
+        }
+
+    def _sign(self, kid: str, payload: str) -> str:
+        digest = hmac.new(self._secrets[kid], payload.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    def _verify(self, key: str) -> Optional[ApiKey]:
+        parts = key.split(".")
+        if len(parts) != _SIGNED_KEY_PARTS:
+            return None
+        _, key_id, issued_at, kid, signature = parts
+        if kid not in self._secrets or not issued_at.isdigit():
+            return None
+        payload = key[:-len(signature) - 1]
+        if not hmac.compare_digest(self._sign(kid, payload), signature):
+            return None
+        if key_id in self._revoked:
+            return None
+        if self._max_age_s > 0 and time.time() - int(issued_at) > self._max_age_s:
+            return None
+        return ApiKey(
+            id=key_id,
+            hashed_key="",
+            key_prefix=f"{SIGNED_KEY_PREFIX}{key_id}",
+            initialized_in=datetime.fromtimestamp(int(issued_at), timezone.utc),
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._revocation_refresh_s)
+            try:
+                await self.refresh_revocations()
+            except Exception as e:
+                self._failed_refreshes += 1
+                print(f"Warning: Could not refresh revoked API keys, retrying on next refresh: {e}")
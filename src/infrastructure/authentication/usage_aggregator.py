@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from src.domain.authentication.api_key import ApiKey, ApiKeyUsage
+from src.domain.authentication.api_key_repository import ApiKeyRepository
+
+
+class ApiKeyUsageAggregator:
+    """
+    Write-behind buffer for API key usage.
+
+    `record` only updates in-memory counters, a background task persists them through
+    `ApiKeyRepository.add_usage` every `flush_interval_s` seconds, or as soon as
+    `max_pending_keys` keys are pending. Failed writes are kept for the next flush.
+    Must be used from a single event loop, `start` and `close` are called by the app lifespan.
+    """
+
+    def __init__(self, repository: ApiKeyRepository, flush_interval_s: float, max_pending_keys: int):
+        self._repository = repository
+        self._flush_interval_s = flush_interval_s
+        self._max_pending_keys = max_pending_keys
+        self._pending: Dict[str, ApiKeyUsage] = {}
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Metrics
+        self._flushes = 0
+        self._failed_flushes = 0
+        self._flushed_requests = 0
+
+    def record(self, entity: ApiKey) -> None:
+        """Count one request of this key, never waits on the repository."""
+        assert entity.id is not None
+        now = datetime.now(timezone.utc)
+        # Keep the (possibly cached) entity up to date for this process
+        entity.update_usage(now)
+        usage = self._pending.get(entity.id)
+        if usage is None:
+            usage = self._pending[entity.id] = ApiKeyUsage()
+        usage.add(now)
+        if len(self._pending) >= self._max_pending_keys:
+            self._flush_requested.set()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the background task and persist what is still pending."""
+        self._closing = True
+        self._flush_requested.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        usages, self._pending = self._pending, {}
+        try:
+            await self._repository.add_usage(usages)
+        except Exception as e:
+            self._failed_flushes += 1
+            print(f"Warning: Could not persist API key usage, retrying on next flush: {e}")
+            for key_id, usage in usages.items():
+                pending = self._pending.get(key_id)
+                if pending is None:
+                    self._pending[key_id] = usage
+                else:
+                    pending.add(usage.last_use_in, usage.increment)
+            return
+        self._flushes += 1
+        self._flushed_requests += sum(usage.increment for usage in usages.values())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "pending_keys": len(self._pending),
+            "pending_requests": sum(usage.increment for usage in self._pending.values()),
+            "flushes": self._flushes,
+            "failed_flushes": self._failed_flushes,
+            "flushed_requests": self._flushed_requests,
+        }
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self._flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
@@ -0,0 +1,163 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Type
+
+from src.core.config import CONFIG
+from src.domain.models import OcrColumnarOutput, OcrImageInput, OcrOutput
+from src.domain.ports import CachedOutput, OcrCachePort
+
+
+@dataclass
+class _CacheEntry:
+    output: OcrOutput | OcrColumnarOutput
+    size: int
+    expires_at: float
+
+
+class OcrResultCache(OcrCachePort):
+    """
+    In-process, thread-safe OCR output cache.
+
+    Entries are keyed by a digest of the image bytes, the adapter name, the
+    effective OcrOptions and the output type. The total (JSON-serialized) size of stored outputs is
+    bounded by `max_bytes`, least recently used entries are evicted first, and
+    entries expire after `ttl_s` seconds.
+    Concurrent `get_or_compute` calls for the same key are coalesced: only the first
+    one computes, the others wait for its output (single-flight).
+    """
+
+    def __init__(self, adapter_name: str, max_bytes: int, ttl_s: float):
+        self._adapter_name = adapter_name.encode()
+        self._max_bytes = max_bytes
+        self._ttl_s = ttl_s
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._size = 0
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def key(self, ocrInput: OcrImageInput, output_type: Type[CachedOutput] = OcrOutput) -> str:
+        digest = hashlib.blake2b(ocrInput.content, digest_size=20)
+        digest.update(b"\0" + self._adapter_name + b"\0")
+        digest.update(ocrInput.options.model_dump_json().encode())
+        digest.update(b"\0" + output_type.__name__.encode())
+        return digest.hexdigest()
+
+    def get(
+        self,
+        ocrInput: OcrImageInput,
+        output_type: Type[CachedOutput] = OcrOutput,
+        key: Optional[str] = None,
+    ) -> Optional[CachedOutput]:
+        key = key or self.key(ocrInput, output_type)
+        with self._lock:
+            output = self._lookup(key)
+            if output is None:
+                self._misses += 1
+            return output
+
+    def put(
+        self,
+        ocrInput: OcrImageInput,
+        output: OcrOutput | OcrColumnarOutput,
+        key: Optional[str] = None,
+    ) -> None:
+        key = key or self.key(ocrInput, type(output))
+        size = len(output.model_dump_json(warnings=False))
+        with self._lock:
+            self._store(key, output, size)
+
+    def get_or_compute(
+        self,
+        ocrInput: OcrImageInput,
+        compute: Callable[[], CachedOutput],
+        output_type: Type[CachedOutput] = OcrOutput,
+    ) -> CachedOutput:
+        key = self.key(ocrInput, output_type)
+        with self._lock:
+            output = self._lookup(key)
+            if output is not None:
+                return output
+            flight = self._in_flight.get(key)
+            is_leader = flight is None
+            if flight is None:
+                flight = self._in_flight[key] = Future()
+                self._misses += 1
+            else:
+                self._coalesced += 1
+
+        if not is_leader:
+            return flight.result()
+
+        try:
+            output = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            flight.set_exception(e)
+            raise
+        size = len(output.model_dump_json(warnings=False))
+        with self._lock:
+            del self._in_flight[key]
+            self._store(key, output, size)
+        flight.set_result(output)
+        return output
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "coalesced": self._coalesced,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    def _lookup(self, key: str) -> Optional[OcrOutput | OcrColumnarOutput]:
+        """Return a fresh entry (marking it as recently used), dropping it if expired. Lock must be held."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self._expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return entry.output
+
+    def _store(self, key: str, output: OcrOutput | OcrColumnarOutput, size: int) -> None:
+        """Insert an entry of `size` bytes, evicting least recently used ones to fit. Lock must be held."""
+        if size > self._max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        while self._size + size > self._max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+        self._entries[key] = _CacheEntry(output, size, time.monotonic() + self._ttl_s)
+        self._size += size
+
+    def _remove(self, key: str) -> None:
+        self._size -= self._entries.pop(key).size
+
+
+def create_ocr_result_cache(adapter_name: str) -> Optional[OcrResultCache]:
+    """Build the cache from CONFIG, None if disabled."""
+    if CONFIG.ocr_cache_max_bytes <= 0:
+        return None
+    return OcrResultCache(adapter_name, CONFIG.ocr_cache_max_bytes, CONFIG.ocr_cache_ttl_s)
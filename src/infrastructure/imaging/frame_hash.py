@@ -0,0 +1,27 @@
+from typing import Optional
+import cv2
+import numpy as np
+
+HASH_SIZE = 8  # 8x8 comparisons → 64-bit hash
+
+
+def difference_hash(image_bytes: bytes) -> Optional[int]:
+    """
+    Perceptual difference hash (dHash) of an encoded image.
+    The image is decoded at reduced size in grayscale (cheap for JPEG camera frames),
+    shrunk to (HASH_SIZE + 1) x HASH_SIZE, and each bit tells whether a pixel is
+    brighter than its left neighbour.
+    Returns None if the bytes can't be decoded.
+    """
+    buffer = np.frombuffer(image_bytes, np.uint8)
+    gray = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(hash_a: int, hash_b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (hash_a ^ hash_b).bit_count()
@@ -1,93 +1,315 @@
-from typing import List
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 import easyocr
 import numpy as np
 import cv2
 
-from src.domain.models import OcrInput, OcrOutput, OcrResult, Rect
-from src.domain.ports import OcrPort
+from src.domain.models import OcrColumnarOutput, OcrImageInput, OcrOutput
+from src.domain.ports import BatchOcrPort
+from src.infrastructure.models.model_pool import ModelPool, UnsupportedLanguageError
+from src.infrastructure.models.profiles import Profiles
 from src.infrastructure.models.registry import register_adapter
-from src.infrastructure.models.easyocr.config import easy_ocr_settings
+from src.infrastructure.models.easyocr.config import EasyOCRSettings, easy_ocr_settings
+from src.infrastructure.models.tiling import merge_tile_boxes, tile_grid
+
+
+@dataclass(eq=False)
+class _Profile:
+    """Detection/recognition parameters of one profile, built once"""
+    settings: EasyOCRSettings
+    # `Reader.detect` / `Reader.recognize` keyword arguments (recognition batch size aside)
+    detect_params: Dict[str, Any]
+    recognize_params: Dict[str, Any]
+    # Shape buckets whose detection canvas isn't capped by `canvas_size`: padding an
+    # image to them leaves its detection scale (`mag_ratio`) unchanged
+    shape_buckets: List[int]
+
+    @classmethod
+    def build(cls, settings: EasyOCRSettings) -> "_Profile":
+        detect_params = dict(
+            min_size=settings.min_size,
+            text_threshold=settings.text_threshold,
+            low_text=settings.low_text,
+            link_threshold=settings.link_threshold,
+            canvas_size=settings.canvas_size,
+            mag_ratio=settings.mag_ratio,
+            slope_ths=settings.slope_ths,
+            ycenter_ths=settings.ycenter_ths,
+            height_ths=settings.height_ths,
+            width_ths=settings.width_ths,
+            add_margin=settings.add_margin,
+            reformat=False,
+            threshold=settings.threshold,
+            bbox_min_score=settings.bbox_min_score,
+            bbox_min_size=settings.bbox_min_size,
+            max_candidates=settings.max_candidates,
+        )
+        recognize_params = dict(
+            decoder=settings.decoder,
+            beamWidth=settings.beamWidth,
+            workers=settings.workers,
+            allowlist=settings.allowlist,
+            blocklist=settings.blocklist,
+            detail=settings.detail,
+            rotation_info=settings.rotation_info,
+            paragraph=settings.paragraph,
+            contrast_ths=settings.contrast_ths,
+            adjust_contrast=settings.adjust_contrast,
+            filter_ths=settings.filter_ths,
+            y_ths=settings.y_ths,
+            x_ths=settings.x_ths,
+            reformat=False,
+            output_format=settings.output_format,
+        )
+        shape_buckets = sorted(
+            bucket for bucket in settings.batch_shape_buckets
+            if bucket * settings.mag_ratio <= settings.canvas_size
+        )
+        return cls(settings, detect_params, recognize_params, shape_buckets)
+
+    def tiles(self, image: np.ndarray) -> bool:
+        return self.settings.tiling and max(image.shape[:2]) > self.settings.tile_threshold_side
+
 
 @register_adapter("easyocr")
-class EasyOCRAdapter(OcrPort):
+class EasyOCRAdapter(BatchOcrPort):
     def __init__(self):
+        # Detection only reader, shared by the readers of every language
+        self.detector = self._reader(["en"], detector=True, recognizer=False)
+        # Recognition only readers by language set
+        self._readers: ModelPool[easyocr.Reader] = ModelPool(
+            self._load_reader,
+            memory_budget_bytes=int(easy_ocr_settings.memory_budget_mb * 1024 * 1024),
+        )
+        for lang in easy_ocr_settings.pinned_langs:
+            self._readers.pin(self._reader_key(lang))
+        # Parameters of each profile, resolved once
+        self._profiles: Profiles[_Profile] = Profiles(
+            easy_ocr_settings, easy_ocr_settings.profiles, easy_ocr_settings.default_profile, prepare=_Profile.build
+        )
+
+    @staticmethod
+    def _reader(lang_list: List[str], detector: bool, recognizer: bool) -> easyocr.Reader:
         # Initialize EasyOCR reader with settings from config
-        self.reader = easyocr.Reader(
-            lang_list=easy_ocr_settings.lang_list,
+        return easyocr.Reader(
+            lang_list=lang_list,
             gpu=easy_ocr_settings.gpu,
             model_storage_directory=easy_ocr_settings.model_storage_directory,
             user_network_directory=easy_ocr_settings.user_network_directory,
             detect_network=easy_ocr_settings.detect_network,
             recog_network=easy_ocr_settings.recog_network,
             download_enabled=easy_ocr_settings.download_enabled,
-            detector=easy_ocr_settings.detector,
-            recognizer=easy_ocr_settings.recognizer,
+            detector=detector,
+            recognizer=recognizer,
             verbose=easy_ocr_settings.verbose,
             quantize=easy_ocr_settings.quantize,
             cudnn_benchmark=easy_ocr_settings.cudnn_benchmark
         )
 
-    def predict(self, data: OcrInput) -> OcrOutput:
+    @staticmethod
+    def _reader_key(lang: str) -> str:
+        return "+".join(easy_ocr_settings.reader_languages(lang))
+
+    @classmethod
+    def _load_reader(cls, key: str) -> Tuple[easyocr.Reader, int]:
+        """Recognition reader of a language set, sized by its recognizer weights"""
+        try:
+            reader = cls._reader(key.split("+"), detector=False, recognizer=True)
+        except ValueError as e:
+            # Unknown languages, or languages that can't share a recognizer
+            raise UnsupportedLanguageError(f"No EasyOCR recognizer for languages {key!r}: {e}") from e
+        return reader, _tensors_size(reader.recognizer.state_dict().values())
+
+    def model_stats(self) -> Optional[Dict[str, float]]:
+        return self._readers.stats()
+
+    def predict(self, data: OcrImageInput) -> OcrOutput:
         """Run OCR on the input image."""
-        # Convert bytes to numpy array
-        nparr = np.array(data.bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        # Run OCR with settings from config
-        result = self.reader.readtext(
-            image=image,
-            decoder=easy_ocr_settings.decoder,
-            beamWidth=easy_ocr_settings.beamWidth,
-            batch_size=easy_ocr_settings.batch_size,
-            workers=easy_ocr_settings.workers,
-            allowlist=easy_ocr_settings.allowlist,
-            blocklist=easy_ocr_settings.blocklist,
-            detail=easy_ocr_settings.detail,
-            paragraph=easy_ocr_settings.paragraph,
-            min_size=easy_ocr_settings.min_size,
-            rotation_info=easy_ocr_settings.rotation_info,
-            contrast_ths=easy_ocr_settings.contrast_ths,
-            adjust_contrast=easy_ocr_settings.adjust_contrast,
-            filter_ths=easy_ocr_settings.filter_ths,
-            text_threshold=easy_ocr_settings.text_threshold,
-            low_text=easy_ocr_settings.low_text,
-            link_threshold=easy_ocr_settings.link_threshold,
-            canvas_size=easy_ocr_settings.canvas_size,
-            mag_ratio=easy_ocr_settings.mag_ratio,
-            slope_ths=easy_ocr_settings.slope_ths,
-            ycenter_ths=easy_ocr_settings.ycenter_ths,
-            height_ths=easy_ocr_settings.height_ths,
-            width_ths=easy_ocr_settings.width_ths,
-            add_margin=easy_ocr_settings.add_margin,
-            x_ths=easy_ocr_settings.x_ths,
-            y_ths=easy_ocr_settings.y_ths,
-            threshold=easy_ocr_settings.threshold,
-            bbox_min_score=easy_ocr_settings.bbox_min_score,
-            bbox_min_size=easy_ocr_settings.bbox_min_size,
-            max_candidates=easy_ocr_settings.max_candidates,
-            output_format=easy_ocr_settings.output_format
-        )
+        return self.predict_columnar(data).to_output()
+
+    def predict_columnar(self, data: OcrImageInput) -> OcrColumnarOutput:
+        """Run OCR on the input image, return texts, confidences and boxes as columns."""
+        return self.predict_batch_columnar([data])[0]
+
+    def predict_batch(self, ocrInputs: List[OcrImageInput]) -> List[OcrOutput]:
+        """Run OCR on several images, detection runs as one call per shape bucket."""
+        return [columns.to_output() for columns in self.predict_batch_columnar(ocrInputs)]
+
+    def predict_batch_columnar(self, ocrInputs: List[OcrImageInput]) -> List[OcrColumnarOutput]:
+        """Same as `predict_batch`, outputs are built directly as columns."""
+        # Readers and profiles first: an unsupported language or profile fails before any inference
+        readers = [self._readers.get(self._reader_key(data.options.lang.lang)) for data in ocrInputs]
+        profiles = [self._profiles.get(data.options.profile) for data in ocrInputs]
+        # Wrap the encoded buffers as numpy arrays (no copy)
+        images = [cv2.imdecode(np.frombuffer(data.content, np.uint8), cv2.IMREAD_COLOR) for data in ocrInputs]
+
+        results: List[Optional[list]] = [None] * len(images)
+        # Images detected together share a profile and a shape bucket
+        buckets: Dict[Tuple[_Profile, Tuple[int, int]], List[int]] = {}
+        for index, (image, profile) in enumerate(zip(images, profiles)):
+            if profile.tiles(image):
+                results[index] = self._readtext_tiled(image, readers[index], profile)
+            else:
+                buckets.setdefault((profile, self._shape_bucket(image, profile)), []).append(index)
 
-        # Process results
-        ocr_results = []
+        batch_size = easy_ocr_settings.detect_max_batch_size
+        for (profile, bucket), indices in buckets.items():
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                chunk_results = self._readtext_batch(
+                    bucket, [images[i] for i in chunk], [readers[i] for i in chunk], profile
+                )
+                for index, result in zip(chunk, chunk_results):
+                    results[index] = result
+
+        return [self._to_columns(result) for result in results]
+
+    @staticmethod
+    def _shape_bucket(image: np.ndarray, profile: _Profile) -> Tuple[int, int]:
+        """
+        (height, width) of the smallest of the profile's usable buckets fitting each side
+        of `image`, or its own shape when none fits.
+        """
+        def fit(side: int) -> Optional[int]:
+            return next((bucket for bucket in profile.shape_buckets if bucket >= side), None)
+
+        h, w = image.shape[:2]
+        bucket_h, bucket_w = fit(h), fit(w)
+        if bucket_h is None or bucket_w is None:
+            return h, w
+        return bucket_h, bucket_w
+
+    def _readtext_batch(
+        self,
+        bucket: Tuple[int, int],
+        images: List[np.ndarray],
+        readers: List[easyocr.Reader],
+        profile: _Profile,
+    ) -> List[list]:
+        """`_readtext` of images of the same shape bucket, detected in one call on a zero-padded batch"""
+        if len(images) == 1:
+            return [self._readtext(images[0], readers[0], profile)]
+        batch = np.zeros((len(images), *bucket, 3), dtype=np.uint8)
+        for row, image in enumerate(images):
+            # Bottom/right padding: boxes keep the image's coordinates
+            batch[row, :image.shape[0], :image.shape[1]] = image
+        horizontal_lists, free_lists = self._detect(batch, profile)
+        # Recognition on the unpadded images (horizontal boxes are clipped to their bounds)
+        return [
+            self._recognize(reader, image, horizontal_list, free_list, profile)
+            for image, reader, horizontal_list, free_list in zip(images, readers, horizontal_lists, free_lists)
+        ]
+
+    def _to_columns(self, result: list) -> OcrColumnarOutput:
+        texts, confidences, boxes = [], [], []
         for detection in result:
             bbox, text, confidence = detection[0], detection[1], detection[2]
-            ocr_results.append(OcrResult(text=text, confidence=confidence, box=self.coords_to_rect(bbox)))
+            texts.append(text)
+            confidences.append(confidence)
+            boxes.append(self.coords_to_box(bbox))
+
+        return OcrColumnarOutput(texts=texts, confidences=confidences, boxes=boxes)
+
+    def _readtext(self, image: np.ndarray, reader: easyocr.Reader, profile: _Profile) -> list:
+        """`readtext` of the language's reader, detection run by the shared detector"""
+        horizontal_lists, free_lists = self._detect(image, profile)
+        return self._recognize(reader, image, horizontal_lists[0], free_lists[0], profile)
+
+    def _detect(self, images: np.ndarray, profile: _Profile, **overrides: Any) -> Tuple[list, list]:
+        """Horizontal and free boxes of each BGR image of a batch (or of a single image)"""
+        # Run detection with the profile's settings
+        return self.detector.detect(images, **{**profile.detect_params, **overrides})
+
+    def _recognize(
+        self,
+        reader: easyocr.Reader,
+        image: np.ndarray,
+        horizontal_list: list,
+        free_list: list,
+        profile: _Profile,
+    ) -> list:
+        # Run recognition with the profile's settings
+        return reader.recognize(
+            cv2.cvtColor(image, cv2.COLOR_BGR2GRAY),
+            horizontal_list,
+            free_list,
+            batch_size=self._recognition_batch_size(len(horizontal_list) + len(free_list), profile.settings),
+            **profile.recognize_params,
+        )
+
+    @staticmethod
+    def _recognition_batch_size(regions: int, settings: EasyOCRSettings) -> int:
+        """All the crops of an image in one batch (each rotation being a crop), up to `max_batch_size`"""
+        if not settings.auto_batch_size:
+            return settings.batch_size
+        crops = regions * (1 + len(settings.rotation_info or []))
+        return max(1, min(settings.max_batch_size, crops))
 
-        return OcrOutput(texts=ocr_results) 
-    
-    def coords_to_rect(self, coords: List[List]) -> Rect:
+    def _readtext_tiled(self, image: np.ndarray, reader: easyocr.Reader, profile: _Profile) -> list:
+        """
+        Same as `_readtext`, with detection run on overlapping tiles at native resolution
+        (`tile_batch_size` tiles per detector call, only one batch of tiles copied at a time),
+        then recognition run once on the whole image over the merged boxes.
+        """
+        h, w = image.shape[:2]
+        (tile_w, tile_h), origins = tile_grid(
+            w, h, easy_ocr_settings.tile_size, easy_ocr_settings.tile_overlap
+        )
+        # Boxes in image coordinates: horizontal ones as [x_min, x_max, y_min, y_max], free ones as 4 points
+        horizontal_boxes, free_boxes = [], []
+        ltrbs, tile_ids = [], []
+        batch_size = easy_ocr_settings.tile_batch_size
+        for start in range(0, len(origins), batch_size):
+            chunk = origins[start:start + batch_size]
+            tiles = np.stack([image[y:y + tile_h, x:x + tile_w] for x, y in chunk])
+            # Native resolution
+            horizontal_lists, free_lists = self._detect(tiles, profile, canvas_size=max(tile_w, tile_h), mag_ratio=1.0)
+            for row, ((x, y), horizontal_list, free_list) in enumerate(zip(chunk, horizontal_lists, free_lists)):
+                for x_min, x_max, y_min, y_max in horizontal_list:
+                    box = [int(x_min) + x, int(x_max) + x, int(y_min) + y, int(y_max) + y]
+                    horizontal_boxes.append(box)
+                    free_boxes.append(None)
+                    ltrbs.append((box[0], box[2], box[1], box[3]))
+                    tile_ids.append(start + row)
+                for points in free_list:
+                    box = [[int(px) + x, int(py) + y] for px, py in points]
+                    horizontal_boxes.append(None)
+                    free_boxes.append(box)
+                    ltrbs.append(self.coords_to_box(box))
+                    tile_ids.append(start + row)
+
+        horizontal_list, free_list = [], []
+        groups = merge_tile_boxes(
+            np.array(ltrbs, dtype=np.float64).reshape(-1, 4),
+            np.array(tile_ids),
+            easy_ocr_settings.tile_merge_threshold,
+        )
+        for group in groups:
+            if len(group) == 1 and free_boxes[group[0]] is not None:
+                free_list.append(free_boxes[group[0]])
+            elif len(group) == 1:
+                horizontal_list.append(horizontal_boxes[group[0]])
+            else:
+                # Same text seen by several tiles: their enclosing horizontal box
+                left, top, right, bottom = np.array([ltrbs[i] for i in group]).T
+                horizontal_list.append([int(left.min()), int(right.max()), int(top.min()), int(bottom.max())])
+
+        return self._recognize(reader, image, horizontal_list, free_list, profile)
+
+    def coords_to_box(self, coords: List[List]) -> Tuple[float, float, float, float]:
         # Convert each numpy int into a Python float
         xs = [float(point[0]) for point in coords]
         ys = [float(point[1]) for point in coords]
 
-        return Rect(
-            left=min(xs),
-            top=min(ys),
-            right=max(xs),
-            bottom=max(ys),
-        )
-    
-
+        return min(xs), min(ys), max(xs), max(ys)
 
 
+def _tensors_size(values) -> int:
+    """Bytes of the tensors in a state dict's values (quantized modules hold tuples of tensors)"""
+    size = 0
+    for value in values:
+        if isinstance(value, (tuple, list)):
+            size += _tensors_size(value)
+        elif hasattr(value, "element_size"):
+            size += value.numel() * value.element_size()
+    return size
@@ -1,19 +1,33 @@
 import os
 import yaml
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, field_validator
+from typing import Any, Dict, List, Optional
+
+from src.infrastructure.models.profiles import check_profile_overrides
+
+# Settings a profile can override per request (models and readers are shared)
+PROFILE_FIELDS = (
+    "decoder", "beamWidth", "min_size", "rotation_info",
+    "contrast_ths", "adjust_contrast", "filter_ths",
+    "text_threshold", "low_text", "link_threshold", "canvas_size", "mag_ratio",
+    "bbox_min_score", "bbox_min_size", "tiling", "tile_threshold_side",
+)
 
 class EasyOCRSettings(BaseModel):
     # Model configuration
-    lang_list: List[str]
+    # Reader languages by request language (`options.lang`), unlisted languages get a
+    # reader of their own. Readers are loaded on first use and share one detector, the
+    # least recently used ones are evicted beyond `memory_budget_mb` (pinned languages are
+    # loaded at startup and never evicted)
+    languages: Dict[str, List[str]] = {}
+    pinned_langs: List[str] = ["en"]
+    memory_budget_mb: float = 1024
     gpu: bool
     model_storage_directory: str
     user_network_directory: Optional[str]
     detect_network: str
     recog_network: str
     download_enabled: bool
-    detector: bool
-    recognizer: bool
     verbose: bool
     quantize: bool
     cudnn_benchmark: bool
@@ -30,6 +44,17 @@ class EasyOCRSettings(BaseModel):
     min_size: int
     rotation_info: Optional[List[int]]
 
+    # Recognition batch size from the number of detected regions of each image, up to
+    # `max_batch_size` (false: always `batch_size`)
+    auto_batch_size: bool = True
+    max_batch_size: int = 32
+    # Batched inference (`predict_batch`): images are zero-padded to the smallest of
+    # `batch_shape_buckets` fitting each side and detected `detect_max_batch_size` at a
+    # time. Buckets are only used while `mag_ratio * bucket <= canvas_size` (detection
+    # scale unchanged by the padding), larger images run alone
+    batch_shape_buckets: List[int] = [640, 960, 1280, 1920, 2560]
+    detect_max_batch_size: int = 4
+
     # Contrast parameters
     contrast_ths: float
     adjust_contrast: float
@@ -58,6 +83,32 @@ class EasyOCRSettings(BaseModel):
     max_candidates: int
     output_format: str
 
+    # Tiling of large images: for images whose longest side exceeds `tile_threshold_side`,
+    # detection runs on overlapping `tile_size` tiles at native resolution (instead of the
+    # whole image scaled to `canvas_size`), `tile_batch_size` tiles per detector call, and
+    # boxes found in several tiles are merged before recognition
+    tiling: bool = False
+    tile_threshold_side: int = 2560
+    tile_size: int = 1280
+    tile_overlap: int = 160
+    tile_batch_size: int = 4
+    tile_merge_threshold: float = 0.7
+
+    # Latency/quality profiles selected per request (`options.profile`), each overriding
+    # some of PROFILE_FIELDS; requests without profile get `default_profile` (None: the
+    # settings above)
+    default_profile: Optional[str] = None
+    profiles: Dict[str, Dict[str, Any]] = {}
+
+    @field_validator("profiles")
+    @classmethod
+    def _check_profiles(cls, profiles: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        return check_profile_overrides(profiles, PROFILE_FIELDS)
+
+    def reader_languages(self, lang: str) -> List[str]:
+        """Languages of the reader serving requests in `lang`."""
+        return sorted(set(self.languages.get(lang, [lang])))
+
     @classmethod
     def from_yaml(cls, yaml_path: str) -> "EasyOCRSettings":
         with open(yaml_path, 'r') as f:
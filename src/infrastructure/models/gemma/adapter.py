@@ -2,20 +2,23 @@ import base64
 import json
 from typing import Dict, Any, Optional
 
-import requests
+import httpx
 from src.core.config import CONFIG
-from src.domain.models import OcrInput, OcrOutput
-from src.domain.ports import OcrPort
+from src.domain.models import OcrImageInput, OcrOutput
+from src.domain.ports import AsyncOcrPort
 from src.infrastructure.models.registry import register_adapter
+from src.infrastructure.models.gemma.client import LmsClient
 from src.infrastructure.models.gemma.config import gemma_settings
 
 
 @register_adapter("gemma")
-class GemmaAdapter(OcrPort):
+class GemmaAdapter(AsyncOcrPort):
     def __init__(self):
         # Build base API URL and load the prompt only once
         self.api_url = gemma_settings.get_full_api_url(CONFIG.lms_api)
         self._load_prompt()
+        # Connections to the API are pooled and reused across calls
+        self._client = LmsClient(self.api_url, gemma_settings.headers, gemma_settings)
 
     def _load_prompt(self) -> None:
         try:
@@ -116,27 +119,8 @@ class GemmaAdapter(OcrPort):
         except json.JSONDecodeError as e:
             raise RuntimeError(f"Failed to parse model response as JSON: {str(e)}")
 
-    def predict(
-        self, 
-        ocrInput: OcrInput, 
-        overrides: Optional[Dict[str, Any]] = None # For runtime generate hyperparams override
-    ) -> OcrOutput:
-        #build the payload
-        payload = self._prepare_payload(bytes(ocrInput.bytes), overrides)
-
-        # request Gemma API
-        try:
-            response = requests.post(
-                self.api_url,
-                headers=gemma_settings.headers,
-                json=payload
-            )
-            response.raise_for_status()
-        except requests.RequestException as e:
-            raise RuntimeError(f"API request failed: {str(e)}")
-
+    def _to_output(self, data: Dict[str, Any]) -> OcrOutput:
         # Extract the raw string content
-        data = response.json()
         model_output = data["choices"][0]["message"]["content"]
 
         # parse JSON
@@ -150,3 +134,37 @@ class GemmaAdapter(OcrPort):
                 "sentence": processed_output["sentence"],
             },
         )
+
+    def predict(
+        self, 
+        ocrInput: OcrImageInput, 
+        overrides: Optional[Dict[str, Any]] = None # For runtime generate hyperparams override
+    ) -> OcrOutput:
+        #build the payload
+        payload = self._prepare_payload(ocrInput.content, overrides)
+
+        # request Gemma API (blocks this thread until the generation is done)
+        try:
+            data = self._client.post(payload)
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"API request failed: {str(e)}")
+
+        return self._to_output(data)
+
+    async def predict_async(
+        self,
+        ocrInput: OcrImageInput,
+        overrides: Optional[Dict[str, Any]] = None
+    ) -> OcrOutput:
+        """Same as `predict`, without holding a thread; cancelling it cancels the API request"""
+        payload = self._prepare_payload(ocrInput.content, overrides)
+
+        try:
+            data = await self._client.post_async(payload)
+        except httpx.HTTPError as e:
+            raise RuntimeError(f"API request failed: {str(e)}")
+
+        return self._to_output(data)
+
+    def close(self) -> None:
+        self._client.close()
@@ -0,0 +1,86 @@
+import asyncio
+import random
+import threading
+from typing import Any, Dict
+
+import httpx
+
+from src.infrastructure.models.gemma.config import GemmaSettings
+
+# Failures worth another attempt: the request didn't reach the model, or the connection
+# broke (e.g. a keep-alive connection closed by the server). Timeouts waiting for the
+# generation aren't retried, the next attempt would most likely time out too.
+RETRYABLE_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.ReadError,
+    httpx.WriteError,
+    httpx.RemoteProtocolError,
+)
+
+
+class LmsClient:
+    """
+    Client of the LMS chat completion endpoint, shared by all calls of an adapter.
+
+    One httpx.AsyncClient (keep-alive connection pool) serves every request. It runs on
+    its own event loop thread, so worker threads (`post`) and coroutines of any loop
+    (`post_async`) share the same connections. 5xx responses and connection errors are
+    retried after a jittered exponential backoff. Cancelling `post_async` cancels the
+    upstream request (its connection is closed, the server sees the client leave).
+    """
+
+    def __init__(self, url: str, headers: Dict[str, str], settings: GemmaSettings):
+        self._url = url
+        self._headers = headers
+        self._max_retries = settings.max_retries
+        self._backoff_s = settings.retry_backoff_s
+        self._backoff_max_s = settings.retry_backoff_max_s
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(
+                connect=settings.connect_timeout_s,
+                read=settings.read_timeout_s,
+                write=settings.write_timeout_s,
+                pool=settings.pool_timeout_s,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry_s,
+            ),
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="lms-client", daemon=True)
+        self._thread.start()
+
+    def post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST `payload`, return the JSON response (blocks the calling thread)."""
+        return asyncio.run_coroutine_threadsafe(self._post(payload), self._loop).result()
+
+    async def post_async(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Same as `post`, awaitable from any event loop; cancellation reaches the upstream request."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._post(payload), self._loop))
+
+    def close(self) -> None:
+        """Close the pooled connections and stop the client's loop."""
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _post(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            try:
+                response = await self._client.post(self._url, headers=self._headers, json=payload)
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500 or attempt >= self._max_retries:
+                    raise
+            except RETRYABLE_ERRORS:
+                if attempt >= self._max_retries:
+                    raise
+            # Full jitter: concurrent callers don't retry in lockstep
+            await asyncio.sleep(random.uniform(0, min(self._backoff_max_s, self._backoff_s * 2 ** attempt)))
+            attempt += 1
@@ -15,6 +15,22 @@ class GemmaSettings(BaseModel):
     # Request Configuration
     headers: Dict[str, str]
 
+    # HTTP client: one keep-alive connection pool shared by all calls
+    connect_timeout_s: float = 5.0
+    # Max wait for each read of the response, i.e. for the whole generation
+    read_timeout_s: float = 120.0
+    write_timeout_s: float = 30.0
+    # Max wait for a free connection once `max_connections` are in use
+    pool_timeout_s: float = 30.0
+    max_connections: int = 16
+    max_keepalive_connections: int = 8
+    keepalive_expiry_s: float = 30.0
+    # Retries of 5xx responses and connection errors, after a random delay of up to
+    # `retry_backoff_s` * 2^attempt (at most `retry_backoff_max_s`)
+    max_retries: int = 2
+    retry_backoff_s: float = 0.5
+    retry_backoff_max_s: float = 5.0
+
     # Generation Parameters
     temperature: float
     top_k: int
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Generic, Iterable, Tuple, TypeVar
+
+Model = TypeVar("Model")
+
+
+class UnsupportedLanguageError(ValueError):
+    """Raised when an adapter has no model for the requested language."""
+
+
+@dataclass
+class _Entry(Generic[Model]):
+    model: Model
+    size_bytes: int
+
+
+@dataclass
+class _Counters:
+    loads: int = 0
+    hits: int = 0
+    evictions: int = 0
+
+
+class ModelPool(Generic[Model]):
+    """
+    Models loaded on first use by key (a language, or language set), within a memory budget.
+
+    `load(key)` returns the model and its (estimated) size in bytes. Concurrent first
+    uses of a key load it once. Once the resident models exceed `memory_budget_bytes`,
+    the least recently used ones are evicted, except pinned keys and the model just
+    loaded (a model larger than the whole budget still loads, alone).
+    An evicted model is only dropped from the pool: callers still using it keep it alive
+    until they are done.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], Tuple[Model, int]],
+        memory_budget_bytes: int,
+        pinned: Iterable[str] = (),
+    ):
+        self._load = load
+        self._budget = memory_budget_bytes
+        self._pinned = set(pinned)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry[Model]]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._size = 0
+        # Only for keys loaded at least once (failed loads of unknown keys aren't tracked)
+        self._counters: Dict[str, _Counters] = {}
+
+    def get(self, key: str) -> Model:
+        """Return the model of `key`, loading it (and evicting others) if it's not resident."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters[key].hits += 1
+                return entry.model
+            flight = self._loading.get(key)
+            is_leader = flight is None
+            if flight is None:
+                flight = self._loading[key] = Future()
+
+        if not is_leader:
+            return flight.result()
+
+        try:
+            model, size_bytes = self._load(key)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[key]
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[key]
+            self._entries[key] = _Entry(model, size_bytes)
+            self._size += size_bytes
+            self._counters.setdefault(key, _Counters()).loads += 1
+            self._evict(keep=key)
+        flight.set_result(model)
+        return model
+
+    def pin(self, key: str) -> Model:
+        """Keep `key` resident from now on, loading it if needed."""
+        with self._lock:
+            self._pinned.add(key)
+        return self.get(key)
+
+    def unpin(self, key: str) -> None:
+        """Make `key` evictable again (it stays resident until evicted)."""
+        with self._lock:
+            self._pinned.discard(key)
+            self._evict()
+
+    def _evict(self, keep: str | None = None) -> None:
+        # Least recently used first
+        for key in list(self._entries):
+            if self._size <= self._budget:
+                return
+            if key in self._pinned or key == keep:
+                continue
+            entry = self._entries.pop(key)
+            self._size -= entry.size_bytes
+            self._counters[key].evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats: Dict[str, float] = {
+                "resident": len(self._entries),
+                "memory_bytes": self._size,
+                "memory_budget_bytes": self._budget,
+            }
+            for key, counters in self._counters.items():
+                stats[f"{key}.loads"] = counters.loads
+                stats[f"{key}.hits"] = counters.hits
+                stats[f"{key}.evictions"] = counters.evictions
+                stats[f"{key}.resident"] = int(key in self._entries)
+                stats[f"{key}.pinned"] = int(key in self._pinned)
+            return stats
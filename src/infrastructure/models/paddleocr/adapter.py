@@ -1,118 +1,433 @@
-import io
-from typing import Tuple
+import os
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import numpy as np
-from PIL import Image
-import onnxruntime as ort
 
-from src.domain.models import OcrInput, OcrOutput, OcrResult, Rect
-from src.domain.ports import OcrPort
-from src.infrastructure.models.paddleocr.postprocessing import post_process
+from src.domain.models import (
+    OcrColumnarOutput,
+    OcrImageInput,
+    OcrOutput,
+    OcrResult,
+    OcrStreamEvent,
+    Rect,
+)
+from src.domain.ports import BatchOcrPort
+from src.infrastructure.models.paddleocr.decoding import (
+    CtcResult,
+    ctc_beam_search_decode,
+    ctc_greedy_decode,
+)
+from src.infrastructure.models.paddleocr.helpers import warp_crop
+from src.infrastructure.models.paddleocr.postprocessing import enclosing_box, find_boxes, post_process
+from src.infrastructure.models.paddleocr.session import OnnxModel, check_model_variants, model_path_for_precision
 from src.infrastructure.models.paddleocr.preprocessing import (
-    preprocess_for_det,
+    TensorPool,
+    decode_for_det,
+    det_canvas_shape,
+    normalize_for_det,
+    normalize_for_rec,
     preprocess_recognize,
+    tiles_image,
 )
+from src.infrastructure.models.model_pool import ModelPool, UnsupportedLanguageError
+from src.infrastructure.models.profiles import Profiles
 from src.infrastructure.models.registry import register_adapter
-from src.infrastructure.models.paddleocr.config import paddle_ocr_settings
+from src.infrastructure.models.tiling import merge_tile_boxes, tile_grid
+from src.infrastructure.models.paddleocr.config import PaddleOCRSettings, paddle_ocr_settings
+from src.infrastructure.scheduling.stage_pipeline import Stage, StagePipeline
+
+# (indices of the crops in the call, [N, T, C] CTC outputs, number of steps of each row
+# covering its crop, the others cover width padding) of one recognition session call
+RecRun = Tuple[List[int], np.ndarray, np.ndarray]
+
+
+@dataclass
+class Recognizer:
+    """Recognition model of one language and its character dictionary"""
+    model: OnnxModel
+    chars: List[str]
+
+
+@dataclass
+class _BatchJob:
+    """One `predict_batch_columnar` call going through the stages, each stage fills the next field"""
+    inputs: List[OcrImageInput]
+    # Recognizer of each input's language, settings of its profile
+    recognizers: List[Recognizer] = field(default_factory=list)
+    profiles: List[PaddleOCRSettings] = field(default_factory=list)
+    # (original size, detection input image) per input
+    prepared: List[Tuple[Tuple[int, int], np.ndarray]] = field(default_factory=list)
+    # Detection map per input, or [N, 4, 2] boxes per tiled input (by index)
+    det_maps: List[Optional[np.ndarray]] = field(default_factory=list)
+    tile_boxes: Dict[int, np.ndarray] = field(default_factory=dict)
+    # (LTRB boxes, crops) per input
+    located: List[Tuple[np.ndarray, List[np.ndarray]]] = field(default_factory=list)
+    rec_runs: List[List[RecRun]] = field(default_factory=list)
+
+
+def _detached(output: np.ndarray) -> np.ndarray:
+    """Session output safe to hand to another stage: IO bound outputs are overwritten by the next run"""
+    return output.copy() if paddle_ocr_settings.io_binding else output
 
 
 @register_adapter("paddleocr")
-class PaddleOCRAdapter(OcrPort):
+class PaddleOCRAdapter(BatchOcrPort):
     def __init__(self):
+        # Recognizers load on first use: fail at startup, not on a language's first request
+        check_model_variants(paddle_ocr_settings.rec_model_paths().values(), paddle_ocr_settings.rec_precision)
         # Load ONNX models
-        self.det_sess = ort.InferenceSession(
-            paddle_ocr_settings.det_model_path,
-            providers=paddle_ocr_settings.providers,
+        self.det_model = OnnxModel(
+            model_path_for_precision(paddle_ocr_settings.det_model_path, paddle_ocr_settings.det_precision),
+            paddle_ocr_settings,
+        )
+        # Recognizers by language, sharing the detection model
+        self._recognizers: ModelPool[Recognizer] = ModelPool(
+            self._load_recognizer,
+            memory_budget_bytes=int(paddle_ocr_settings.rec_memory_budget_mb * 1024 * 1024),
         )
-        self.rec_sess = ort.InferenceSession(
-            paddle_ocr_settings.rec_model_path,
-            providers=paddle_ocr_settings.providers,
+        for lang in paddle_ocr_settings.rec_pinned_langs:
+            self._recognizers.pin(lang)
+        # Settings of each profile, resolved once
+        self._profiles: Profiles[PaddleOCRSettings] = Profiles(
+            paddle_ocr_settings, paddle_ocr_settings.profiles, paddle_ocr_settings.default_profile
         )
+        # Reusable detection/recognition batch tensors (per worker thread)
+        self._tensors = TensorPool()
+        # Overlap concurrent calls across stages
+        self._pipeline: Optional[StagePipeline] = None
+        if paddle_ocr_settings.pipeline:
+            self._pipeline = StagePipeline(self._stages(), paddle_ocr_settings.pipeline_queue_size, name="paddleocr")
+
+    def _stages(self) -> List[Stage]:
+        workers = paddle_ocr_settings.pipeline_workers
+        return [
+            Stage("decode", self._decode_stage, workers["decode"]),
+            Stage("det", self._det_stage, workers["det"]),
+            Stage("post_process", self._post_process_stage, workers["post_process"]),
+            Stage("rec", self._rec_stage, workers["rec"]),
+            Stage("ctc_decode", self._ctc_decode_stage, workers["ctc_decode"]),
+        ]
+
+    @staticmethod
+    def _load_recognizer(lang: str) -> Tuple[Recognizer, int]:
+        """Recognizer of a language, sized by its model file"""
+        language = paddle_ocr_settings.rec_language(lang)
+        if language is None:
+            raise UnsupportedLanguageError(f"No PaddleOCR recognition model for language {lang!r}")
+        model_path = model_path_for_precision(language.rec_model_path, paddle_ocr_settings.rec_precision)
         # Load character dictionary
-        with open(paddle_ocr_settings.char_dict_path, encoding="utf8") as f:
-            self.chars = [line.rstrip("\n") for line in f]
+        with open(language.char_dict_path, encoding="utf8") as f:
+            chars = [line.rstrip("\n") for line in f]
+        return Recognizer(OnnxModel(model_path, paddle_ocr_settings), chars), os.path.getsize(model_path)
+
+    def _recognizer(self, data: OcrImageInput) -> Recognizer:
+        return self._recognizers.get(data.options.lang.lang)
 
-    def ctc_decode(self, pred: np.ndarray) -> Tuple[str, float]:
+    def _profile(self, data: OcrImageInput) -> PaddleOCRSettings:
+        return self._profiles.get(data.options.profile)
+
+    def pipeline_stats(self) -> Optional[Dict[str, float]]:
+        return self._pipeline.stats() if self._pipeline is not None else None
+
+    def model_stats(self) -> Optional[Dict[str, float]]:
+        return self._recognizers.stats()
+
+    def close(self) -> None:
+        if self._pipeline is not None:
+            self._pipeline.close()
+
+    def ctc_decode(
+        self,
+        preds: np.ndarray,
+        chars: List[str],
+        char_confidences: bool = False,
+        settings: PaddleOCRSettings = paddle_ocr_settings,
+        lengths: Optional[np.ndarray] = None,
+    ) -> List[CtcResult]:
         """
-        Decode CTC output to text and estimate confidence as the mean of max probablities
+        Decode a [N, T, C] batch of CTC outputs to texts, with confidence as the mean of max probabilities
+        (decoder from `settings`, a request's profile), over the first `lengths` steps of each row if given
         """
-        # pred shape: [1, T, C]
-        logits = pred.squeeze(0)  # shape [T, C]
-        # Softmax
-        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
-        probs = exp / exp.sum(axis=1, keepdims=True)  # shape [T, C]
-        max_probs = probs.max(axis=1)  # shape [T]
-        confidence = float(max_probs.mean())
-
-        idxs = logits.argmax(axis=1)
-        blank = len(self.chars) - 1
-        text_chars = []
-        prev = None
-        for i in idxs:
-            if i != prev and i != blank:
-                text_chars.append(self.chars[i])
-            prev = i
-        text = "".join(text_chars)
-        return text, confidence
-
-    def predict(self, data: OcrInput) -> OcrOutput:
+        blank = len(chars) - 1
+        if settings.rec_decoder == "beam_search":
+            return ctc_beam_search_decode(
+                preds, chars, blank, settings.rec_beam_width, char_confidences, lengths
+            )
+        return ctc_greedy_decode(preds, chars, blank, char_confidences, lengths)
+
+    def predict(self, data: OcrImageInput) -> OcrOutput:
         """Run OCR on the input bytes, return list of OcrResult"""
-        # Load original image and note dimensions
-        original_image = Image.open(io.BytesIO(bytes(data.bytes)))
-        orig_w, orig_h = original_image.size
+        return self.predict_batch([data])[0]
 
-        # Preprocess for detection
-        det_tensor, resized_pil = preprocess_for_det(bytes(data.bytes))
-        resized_w, resized_h = resized_pil.size
+    def predict_columnar(self, data: OcrImageInput) -> OcrColumnarOutput:
+        """Run OCR on the input bytes, return texts, confidences and boxes as columns"""
+        return self.predict_batch_columnar([data])[0]
 
-        # Run text detection
-        det_name = self.det_sess.get_inputs()[0].name
-        det_out = self.det_sess.run(
-            [self.det_sess.get_outputs()[0].name],
-            {det_name: det_tensor},
-        )[0].squeeze(0).squeeze(0)
+    def predict_batch(self, ocrInputs: List[OcrImageInput]) -> List[OcrOutput]:
+        """Run OCR on several images, detection runs as one session call per input shape"""
+        return [columns.to_output() for columns in self.predict_batch_columnar(ocrInputs)]
 
-        # Post-process: get quadrilateral boxes (list of 4-point coords) and crops
-        boxes, crops = post_process(det_out, resized_pil)
-
-        results = []
-        for quad, crop in zip(boxes, crops):
-            # Scale quadrilateral points back to original image size
-            scaled_points = [
-                [
-                    float(pt[0] * orig_w / resized_w),
-                    float(pt[1] * orig_h / resized_h),
-                ]
-                for pt in quad
+    def predict_batch_columnar(self, ocrInputs: List[OcrImageInput]) -> List[OcrColumnarOutput]:
+        """Same as `predict_batch`, outputs are built directly as columns"""
+        job = _BatchJob(ocrInputs)
+        if self._pipeline is not None:
+            return self._pipeline.run(job)
+        for stage in self._stages():
+            job = stage.fn(job)
+        return job
+
+    def _decode_stage(self, job: _BatchJob) -> _BatchJob:
+        # Unknown languages/profiles fail before any work, new languages load off the det/rec stages
+        job.recognizers = [self._recognizer(data) for data in job.inputs]
+        job.profiles = [self._profile(data) for data in job.inputs]
+        job.prepared = [
+            decode_for_det(data.content, settings=settings) for data, settings in zip(job.inputs, job.profiles)
+        ]
+        return job
+
+    def _det_stage(self, job: _BatchJob) -> _BatchJob:
+        tiled = [
+            tiles_image(*original_size, settings) for (original_size, _), settings in zip(job.prepared, job.profiles)
+        ]
+        resized = [i for i, is_tiled in enumerate(tiled) if not is_tiled]
+        det_maps = self._detect_batch([job.prepared[i][1] for i in resized])
+        job.det_maps = [None] * len(job.prepared)
+        for i, det_map in zip(resized, det_maps):
+            job.det_maps[i] = _detached(det_map)
+        job.tile_boxes = {
+            i: self._detect_tiles(image, job.profiles[i])
+            for i, ((_, image), is_tiled) in enumerate(zip(job.prepared, tiled)) if is_tiled
+        }
+        return job
+
+    def _post_process_stage(self, job: _BatchJob) -> _BatchJob:
+        job.located = [
+            self._locate_tiled(original_size, image, job.tile_boxes[i])
+            if i in job.tile_boxes else self._locate(original_size, image, job.det_maps[i], job.profiles[i])
+            for i, (original_size, image) in enumerate(job.prepared)
+        ]
+        # Only crops are needed from here on
+        job.prepared, job.det_maps, job.tile_boxes = [], [], {}
+        return job
+
+    def _rec_stage(self, job: _BatchJob) -> _BatchJob:
+        job.rec_runs = [
+            [
+                (indices, _detached(preds), steps)
+                for indices, preds, steps in self._run_recognition(crops, recognizer.model)
             ]
-            # Convert to LTRB
-            xs = [p[0] for p in scaled_points]
-            ys = [p[1] for p in scaled_points]
-            left, top, right, bottom = min(xs), min(ys), max(xs), max(ys)
-
-            # Preprocess for recognition
-            rec_tensor = preprocess_recognize(crop)
-
-            # Run text recognition
-            rec_name = self.rec_sess.get_inputs()[0].name
-            pred = self.rec_sess.run(
-                [self.rec_sess.get_outputs()[0].name],
-                {rec_name: rec_tensor},
-            )[0]  # shape [1, T, C]
-
-            # Decode CTC output
-            text, confidence = self.ctc_decode(pred)
-
-            results.append(
-                OcrResult(
-                    text=text,
-                    confidence=confidence,
-                    box=Rect(
-                        left=left,
-                        top=top,
-                        right=right,
-                        bottom=bottom,
-                    ),
-                )
+            for (_, crops), recognizer in zip(job.located, job.recognizers)
+        ]
+        return job
+
+    def _ctc_decode_stage(self, job: _BatchJob) -> List[OcrColumnarOutput]:
+        outputs = []
+        for (boxes, crops), runs, recognizer, settings in zip(job.located, job.rec_runs, job.recognizers, job.profiles):
+            decoded = self._decode_runs(len(crops), runs, recognizer.chars, settings)
+            outputs.append(OcrColumnarOutput(
+                texts=[text for text, _ in decoded],
+                confidences=[confidence for _, confidence in decoded],
+                boxes=boxes.tolist(),
+            ))
+        return outputs
+
+    def _detect_batch(self, images: List[np.ndarray]) -> List[np.ndarray]:
+        """
+        Run text detection on [H, W, 3] uint8 images, grouping them by padded size bucket into batched calls.
+        Images are normalized straight into a reused [N, 3, H, W] batch tensor.
+        Returned maps cover each image only (padding cropped out).
+        """
+        groups: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, image in enumerate(images):
+            groups[det_canvas_shape(image)].append(i)
+
+        det_maps: List[np.ndarray] = [np.empty(0)] * len(images)
+        for (h, w), indices in groups.items():
+            batch = self._tensors.get(len(indices), (3, h, w))
+            for row, i in enumerate(indices):
+                normalize_for_det(images[i], batch[row])
+            det_out = self.det_model.run(batch)  # shape [N, 1, H', W']
+            for i, det_map in zip(indices, det_out):
+                image_h, image_w = images[i].shape[:2]
+                map_h, map_w = det_map.shape[1:]
+                det_maps[i] = det_map[0, :round(image_h * map_h / h), :round(image_w * map_w / w)]
+        return det_maps
+
+    def _detect_tiles(self, image: np.ndarray, settings: PaddleOCRSettings = paddle_ocr_settings) -> np.ndarray:
+        """
+        Run text detection on overlapping tiles of a native resolution [H, W, 3] image,
+        `tile_batch_size` tiles per session call (only one batch of tiles is normalized at a time).
+        Returns [N, 4, 2] boxes in image coordinates, boxes found in several tiles merged.
+        """
+        h, w = image.shape[:2]
+        (tile_w, tile_h), origins = tile_grid(
+            w, h, paddle_ocr_settings.tile_size, paddle_ocr_settings.tile_overlap
+        )
+        canvas_h, canvas_w = det_canvas_shape(image[:tile_h, :tile_w])
+        quads: List[np.ndarray] = []
+        tile_ids: List[int] = []
+        batch_size = paddle_ocr_settings.tile_batch_size
+        for start in range(0, len(origins), batch_size):
+            chunk = origins[start:start + batch_size]
+            batch = self._tensors.get(len(chunk), (3, canvas_h, canvas_w))
+            for row, (x, y) in enumerate(chunk):
+                normalize_for_det(image[y:y + tile_h, x:x + tile_w], batch[row])
+            det_out = self.det_model.run(batch)  # shape [N, 1, H', W']
+            map_h, map_w = det_out.shape[2:]
+            for row, ((x, y), det_map) in enumerate(zip(chunk, det_out)):
+                tile_map = det_map[0, :round(tile_h * map_h / canvas_h), :round(tile_w * map_w / canvas_w)]
+                boxes = find_boxes(tile_map, (tile_h, tile_w), settings) + np.array([x, y], dtype=np.float32)
+                quads.append(boxes)
+                tile_ids.extend([start + row] * len(boxes))
+
+        all_quads = np.concatenate(quads)
+        if not len(all_quads):
+            return all_quads
+        ltrb = np.concatenate([all_quads.min(axis=1), all_quads.max(axis=1)], axis=1)
+        groups = merge_tile_boxes(ltrb, np.array(tile_ids), paddle_ocr_settings.tile_merge_threshold)
+        return np.stack([
+            all_quads[group[0]] if len(group) == 1 else enclosing_box(all_quads[group])
+            for group in groups
+        ])
+
+    def predict_stream(self, ocrInput: OcrImageInput) -> Iterator[OcrStreamEvent]:
+        """Run OCR on the input bytes, yielding each OcrResult as soon as it is decoded"""
+        recognizer = self._recognizer(ocrInput)
+        settings = self._profile(ocrInput)
+        original_size, image = decode_for_det(ocrInput.content, settings=settings)
+        if tiles_image(*original_size, settings):
+            boxes, crops = self._locate_tiled(original_size, image, self._detect_tiles(image, settings))
+        else:
+            boxes, crops = self._locate(original_size, image, self._detect_batch([image])[0], settings)
+        yield from self._recognize_stream(boxes, crops, recognizer, settings)
+
+    def _recognize_stream(
+        self,
+        boxes: np.ndarray,
+        crops: List[np.ndarray],
+        recognizer: Recognizer,
+        settings: PaddleOCRSettings = paddle_ocr_settings,
+    ) -> Iterator[OcrStreamEvent]:
+        """Yield the layout, then recognize boxes one by one"""
+        rects = [
+            Rect(left=left, top=top, right=right, bottom=bottom)
+            for left, top, right, bottom in boxes.tolist()
+        ]
+        yield OcrStreamEvent(event="layout", boxes=rects)
+
+        for index, (rect, crop) in enumerate(zip(rects, crops)):
+            text, confidence = self._recognize_crop(crop, recognizer, settings)
+            yield OcrStreamEvent(
+                event="result",
+                index=index,
+                result=OcrResult(text=text, confidence=confidence, box=rect),
             )
+        yield OcrStreamEvent(event="done")
+
+    def _locate(
+        self,
+        original_size: Tuple[int, int],
+        image: np.ndarray,
+        det_out: np.ndarray,
+        settings: PaddleOCRSettings = paddle_ocr_settings,
+    ) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Post-process one detection map into [N, 4] LTRB boxes (original image scale) and crops"""
+        # Post-process: get quadrilateral boxes (list of 4-point coords) and crops
+        quads, crops = post_process(det_out, image, settings)
+        return self._to_ltrb(original_size, image, quads), crops
+
+    def _locate_tiled(
+        self,
+        original_size: Tuple[int, int],
+        image: np.ndarray,
+        quads: np.ndarray,
+    ) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Crops of the [N, 4, 2] boxes detected on the tiles of a native resolution image, and their LTRB boxes"""
+        crops = [warp_crop(image, quad, paddle_ocr_settings.rec_height) for quad in quads]
+        return self._to_ltrb(original_size, image, list(quads)), crops
+
+    def _to_ltrb(
+        self,
+        original_size: Tuple[int, int],
+        image: np.ndarray,
+        quads: List[np.ndarray],
+    ) -> np.ndarray:
+        """Quadrilateral boxes on the detection input image to [N, 4] LTRB boxes at original image scale"""
+        if not quads:
+            return np.empty((0, 4))
+        orig_w, orig_h = original_size
+        resized_h, resized_w = image.shape[:2]
+
+        # Scale quadrilateral points back to original image size: [N, 4, 2]
+        points = np.stack(quads)
+        xs = points[:, :, 0] * orig_w / resized_w
+        ys = points[:, :, 1] * orig_h / resized_h
+        # Convert to LTRB
+        return np.stack([xs.min(axis=1), ys.min(axis=1), xs.max(axis=1), ys.max(axis=1)], axis=1)
+
+    def _recognize_crop(
+        self,
+        crop: np.ndarray,
+        recognizer: Recognizer,
+        settings: PaddleOCRSettings = paddle_ocr_settings,
+    ) -> Tuple[str, float]:
+        # Preprocess for recognition
+        rec_tensor = preprocess_recognize(crop)
+
+        # Run text recognition
+        pred = recognizer.model.run(rec_tensor)  # shape [1, T, C]
+
+        # Decode CTC output
+        result = self.ctc_decode(pred, recognizer.chars, settings=settings)[0]
+        return result.text, result.confidence
+
+    def _decode_runs(
+        self,
+        count: int,
+        runs: Iterable[RecRun],
+        chars: List[str],
+        settings: PaddleOCRSettings = paddle_ocr_settings,
+    ) -> List[Tuple[str, float]]:
+        """CTC decode the outputs of recognition session calls over `count` crops, in crop order"""
+        decoded: List[Tuple[str, float]] = [("", 0.0)] * count
+        for indices, preds, steps in runs:
+            for i, result in zip(indices, self.ctc_decode(preds, chars, settings=settings, lengths=steps)):
+                decoded[i] = (result.text, result.confidence)
+        return decoded
+
+    def _run_recognition(self, crops: List[np.ndarray], model: OnnxModel) -> Iterator[RecRun]:
+        """
+        Run the recognition model over crops, yielding the outputs of each session call.
+        With `rec_batching`, crops are grouped by width rounded up to a multiple of
+        `rec_width_bucket`, each group is right-padded to its width and run by up to
+        `rec_max_batch_size` crops; otherwise each crop runs alone. The steps of a row
+        past its crop's width only see padding: they are left out of decoding.
+        """
+        if not paddle_ocr_settings.rec_batching:
+            for i, crop in enumerate(crops):
+                preds = model.run(preprocess_recognize(crop))
+                yield [i], preds, np.array([preds.shape[1]])
+            return
+
+        bucket = paddle_ocr_settings.rec_width_bucket
+        groups: Dict[int, List[int]] = defaultdict(list)
+        # Narrowest first, so padding stays within one bucket
+        for i in sorted(range(len(crops)), key=lambda i: crops[i].shape[1]):
+            width = crops[i].shape[1]
+            groups[max(bucket, -(-width // bucket) * bucket)].append(i)
 
-        return OcrOutput(texts=results)
+        max_batch_size = paddle_ocr_settings.rec_max_batch_size
+        for width, indices in groups.items():
+            for start in range(0, len(indices), max_batch_size):
+                chunk = indices[start:start + max_batch_size]
+                batch = self._tensors.get(len(chunk), (3, paddle_ocr_settings.rec_height, width))
+                for row, i in enumerate(chunk):
+                    crop = crops[i]
+                    normalize_for_rec(crop, batch[row])
+                    # Zero padding, i.e. mid-gray once normalized
+                    batch[row, :, :, crop.shape[1]:] = 0
+                preds = model.run(batch)  # shape [N, T, C]
+                # Steps are evenly spaced over the width
+                widths = np.array([crops[i].shape[1] for i in chunk])
+                yield chunk, preds, np.minimum(-(-widths * preds.shape[1] // width), preds.shape[1])
@@ -1,27 +1,106 @@
 import os
 import yaml
 import numpy as np
-from pydantic import BaseModel
-from typing import Tuple, List
+from pydantic import BaseModel, field_validator, model_validator
+from typing import Any, Dict, List, Literal, Optional
+
+from src.infrastructure.models.profiles import check_profile_overrides
+
+# Stages of the adapter pipeline, in order
+PIPELINE_STAGES = ("decode", "det", "post_process", "rec", "ctc_decode")
+# Settings a profile can override per request (models, runtime and batch shapes are shared)
+PROFILE_FIELDS = (
+    "box_threshold", "min_area", "unclip_ratio", "box_score_threshold",
+    "det_limit_type", "det_limit_side_len", "tiling", "tile_threshold_side",
+    "rec_decoder", "rec_beam_width",
+)
+
+
+class RecLanguageSettings(BaseModel):
+    rec_model_path: str
+    char_dict_path: str
+
 
 class PaddleOCRSettings(BaseModel):
-    # ONNX model paths
+    # ONNX model paths (`rec_model_path` / `char_dict_path`: recognition of `default_lang`)
     det_model_path: str
     rec_model_path: str
     char_dict_path: str
+    # Recognition models of other languages (`options.lang`), sharing the detection model.
+    # Loaded on first use, least recently used ones evicted beyond `rec_memory_budget_mb`
+    # (pinned languages are loaded at startup and never evicted)
+    default_lang: str = "en"
+    rec_languages: Dict[str, RecLanguageSettings] = {}
+    rec_memory_budget_mb: float = 256
+    rec_pinned_langs: List[str] = ["en"]
+    # Precision of each model: quantized variants are read next to the fp32 model
+    # (`<name>.int8_dynamic.onnx`, `<name>.int8_static.onnx`, see `quantization.py`)
+    det_precision: Literal["fp32", "int8_dynamic", "int8_static"] = "fp32"
+    rec_precision: Literal["fp32", "int8_dynamic", "int8_static"] = "fp32"
 
     # ONNX runtime configuration
+    # Preferred execution providers, unavailable ones are skipped (CPU is always the last resort)
     providers: List[str]
+    # SessionOptions (0 threads: onnxruntime default)
+    intra_op_num_threads: int = 0
+    inter_op_num_threads: int = 0
+    execution_mode: Literal["sequential", "parallel"] = "sequential"
+    graph_optimization_level: Literal["disable", "basic", "extended", "all"] = "all"
+    # Where graphs optimized on first load are saved and reused, relative to each model's
+    # directory (None: optimized on every boot)
+    optimized_model_dir: Optional[str] = None
+    # Run det/rec through IO binding with preallocated output buffers
+    io_binding: bool = False
 
     # Detection parameters
     box_threshold: float
     min_area: int
     unclip_ratio: float
-    poly_approx_eps: float
+    # Boxes whose mean probability is below this are dropped
+    box_score_threshold: float = 0.6
+
+    # Detection input size: images are scaled (aspect preserved) so that their
+    # `det_limit_type` side ("max": longest, never upscaled / "min": shortest, never
+    # downscaled) is `det_limit_side_len`, then padded up to the smallest of
+    # `det_size_buckets` (multiples of 32) fitting each side
+    det_limit_type: Literal["max", "min"] = "max"
+    det_limit_side_len: int = 960
+    det_size_buckets: List[int] = [320, 480, 640, 800, 960, 1280, 1600, 1920]
+
+    # Tiling of large images: images whose longest side exceeds `tile_threshold_side` are
+    # not downscaled, detection runs on overlapping `tile_size` tiles at native resolution
+    # (`tile_batch_size` tiles per session call) and boxes found in several tiles are merged
+    # (see `tile_merge_threshold` in `tiling.merge_tile_boxes`)
+    tiling: bool = False
+    tile_threshold_side: int = 2000
+    tile_size: int = 960
+    tile_overlap: int = 128
+    tile_batch_size: int = 4
+    tile_merge_threshold: float = 0.7
 
     # Recognition parameters
     rec_height: int
-    target_size: Tuple[int, int]
+    # Batched recognition: crops are grouped by width (rounded up to a multiple of
+    # `rec_width_bucket`) and each group runs as [N, 3, rec_height, W] session calls
+    rec_batching: bool = True
+    rec_max_batch_size: int = 16
+    rec_width_bucket: int = 32
+    # CTC decoding: "greedy" (best path) or "beam_search" (prefix beam search, slower)
+    rec_decoder: Literal["greedy", "beam_search"] = "greedy"
+    rec_beam_width: int = 5
+
+    # Stage pipeline: concurrent calls overlap, each stage (decode, det, post_process,
+    # rec, ctc_decode) runs on its own `pipeline_workers` threads, connected by queues
+    # of `pipeline_queue_size` calls (false: each call runs all stages in sequence)
+    pipeline: bool = True
+    pipeline_queue_size: int = 4
+    pipeline_workers: Dict[str, int] = {"decode": 2, "det": 1, "post_process": 2, "rec": 1, "ctc_decode": 1}
+
+    # Latency/quality profiles selected per request (`options.profile`), each overriding
+    # some of PROFILE_FIELDS; requests without profile get `default_profile` (null: the
+    # settings above)
+    default_profile: Optional[str] = None
+    profiles: Dict[str, Dict[str, Any]] = {}
 
     # Normalization parameters
     det_norm_mean: List[float]
@@ -29,11 +108,54 @@ class PaddleOCRSettings(BaseModel):
     rec_norm_mean: List[float]
     rec_norm_std: List[float]
 
+    @field_validator("det_size_buckets")
+    @classmethod
+    def _check_det_size_buckets(cls, buckets: List[int]) -> List[int]:
+        if not buckets or any(bucket <= 0 or bucket % 32 for bucket in buckets):
+            raise ValueError("det_size_buckets must be positive multiples of 32")
+        return sorted(set(buckets))
+
+    @model_validator(mode="after")
+    def _check_tiles(self) -> "PaddleOCRSettings":
+        if self.tile_size % 32 or self.tile_size > self.det_size_buckets[-1]:
+            raise ValueError("tile_size must be a multiple of 32, at most the largest det_size_buckets")
+        if not 0 <= self.tile_overlap < self.tile_size:
+            raise ValueError("tile_overlap must be >= 0 and < tile_size")
+        return self
+
+    @field_validator("pipeline_workers")
+    @classmethod
+    def _check_pipeline_workers(cls, workers: Dict[str, int]) -> Dict[str, int]:
+        unknown = set(workers) - set(PIPELINE_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {sorted(unknown)}, expected {PIPELINE_STAGES}")
+        if any(count < 1 for count in workers.values()):
+            raise ValueError("pipeline_workers must be >= 1")
+        # Unlisted stages get one worker
+        return {stage: workers.get(stage, 1) for stage in PIPELINE_STAGES}
+
+    @field_validator("profiles")
+    @classmethod
+    def _check_profiles(cls, profiles: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        return check_profile_overrides(profiles, PROFILE_FIELDS)
+
+    def rec_language(self, lang: str) -> Optional[RecLanguageSettings]:
+        """Recognition model of a language, None if there is none."""
+        if lang == self.default_lang:
+            return RecLanguageSettings(rec_model_path=self.rec_model_path, char_dict_path=self.char_dict_path)
+        return self.rec_languages.get(lang)
+
+    def rec_model_paths(self) -> Dict[str, str]:
+        """fp32 recognition model of every language, `default_lang`'s first."""
+        return {
+            self.default_lang: self.rec_model_path,
+            **{lang: language.rec_model_path for lang, language in self.rec_languages.items()},
+        }
+
     @classmethod
     def from_yaml(cls, yaml_path: str) -> "PaddleOCRSettings":
         with open(yaml_path, 'r') as f:
             config = yaml.safe_load(f)
-            config['target_size'] = tuple(config['target_size'])
             # Convert normalization parameters to numpy arrays
             for key in ['det_norm_mean', 'det_norm_std', 'rec_norm_mean', 'rec_norm_std']:
                 config[key] = np.array(config[key], dtype=np.float32)
@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class CtcResult:
+    text: str
+    # Mean over time steps of the most likely class probability
+    confidence: float
+    # Probability of each decoded character (only if requested)
+    char_confidences: Optional[List[float]] = field(default=None)
+
+
+def _log_softmax_max(logits: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Most likely class and its log-probability (max logit minus logsumexp) at each step
+    of [N, T, C] logits, without materializing the probability matrix.
+    """
+    idxs = logits.argmax(axis=2)  # [N, T]
+    max_logits = np.take_along_axis(logits, idxs[..., None], axis=2)[..., 0]  # [N, T]
+    # logsumexp, shifted by the max for stability (exp(x - max) <= 1)
+    sum_exp = np.exp(logits - max_logits[..., None]).sum(axis=2)  # [N, T]
+    return idxs, -np.log(sum_exp)
+
+
+def ctc_greedy_decode(
+    logits: np.ndarray,
+    chars: Sequence[str],
+    blank: int,
+    char_confidences: bool = False,
+    lengths: Optional[np.ndarray] = None,
+) -> List[CtcResult]:
+    """
+    Best path decoding of [N, T, C] logits: the most likely class of each step, repeats
+    collapsed, blanks removed (vectorized over the whole batch).
+    Only the first `lengths[i]` steps of row i are decoded (all of them if None).
+    """
+    if logits.shape[0] == 0:
+        return []
+    idxs, max_log_probs = _log_softmax_max(logits)
+    max_probs = np.exp(max_log_probs)  # [N, T]
+
+    # Keep a step if it's not blank and differs from the previous one
+    keep = idxs != blank
+    keep[:, 1:] &= idxs[:, 1:] != idxs[:, :-1]
+    if lengths is None:
+        confidences = max_probs.mean(axis=1)
+    else:
+        valid = np.arange(idxs.shape[1]) < lengths[:, None]  # [N, T]
+        keep &= valid
+        confidences = (max_probs * valid).sum(axis=1) / np.maximum(lengths, 1)
+
+    chars_arr = np.asarray(chars, dtype=object)
+    results = []
+    for row in range(idxs.shape[0]):
+        kept = keep[row]
+        results.append(CtcResult(
+            text="".join(chars_arr[idxs[row, kept]]),
+            confidence=float(confidences[row]),
+            char_confidences=max_probs[row, kept].tolist() if char_confidences else None,
+        ))
+    return results
+
+
+def _log_add(a: float, b: float) -> float:
+    if a == -np.inf:
+        return b
+    if b == -np.inf:
+        return a
+    return max(a, b) + float(np.log1p(np.exp(-abs(a - b))))
+
+
+def ctc_beam_search_decode(
+    logits: np.ndarray,
+    chars: Sequence[str],
+    blank: int,
+    beam_width: int,
+    char_confidences: bool = False,
+    lengths: Optional[np.ndarray] = None,
+) -> List[CtcResult]:
+    """
+    CTC prefix beam search over [N, T, C] logits, keeping `beam_width` prefixes and
+    extending them by the `beam_width` most likely classes of each step.
+    Confidence is the per-step geometric mean probability of the best prefix, character
+    confidences are the probabilities of the steps where each character was emitted.
+    Only the first `lengths[i]` steps of row i are decoded (all of them if None).
+    """
+    if logits.shape[0] == 0:
+        return []
+    log_probs = logits - logits.max(axis=2, keepdims=True)
+    log_probs -= np.log(np.exp(log_probs).sum(axis=2, keepdims=True))
+    top_k = min(beam_width, log_probs.shape[2])
+    candidates = np.argsort(-log_probs, axis=2)[:, :, :top_k]  # [N, T, K]
+
+    results = []
+    for row in range(log_probs.shape[0]):
+        # prefix -> (log P(ending in blank), log P(ending in a non-blank), emission log probs)
+        beams: Dict[Tuple[int, ...], Tuple[float, float, Tuple[float, ...]]] = {(): (0.0, -np.inf, ())}
+        row_steps = log_probs.shape[1] if lengths is None else int(lengths[row])
+        for t in range(row_steps):
+            step = log_probs[row, t]
+            next_beams: Dict[Tuple[int, ...], Tuple[float, float, Tuple[float, ...]]] = {}
+
+            def add(prefix, blank_lp, non_blank_lp, emissions):
+                prev_blank, prev_non_blank, prev_emissions = next_beams.get(prefix, (-np.inf, -np.inf, emissions))
+                next_beams[prefix] = (
+                    _log_add(prev_blank, blank_lp),
+                    _log_add(prev_non_blank, non_blank_lp),
+                    prev_emissions,
+                )
+
+            for prefix, (blank_lp, non_blank_lp, emissions) in beams.items():
+                total_lp = _log_add(blank_lp, non_blank_lp)
+                for c in candidates[row, t]:
+                    c = int(c)
+                    lp = float(step[c])
+                    if c == blank:
+                        add(prefix, total_lp + lp, -np.inf, emissions)
+                    elif prefix and prefix[-1] == c:
+                        # Repeat without blank in between: same prefix
+                        add(prefix, -np.inf, non_blank_lp + lp, emissions)
+                        # Repeat after a blank: new character
+                        add(prefix + (c,), -np.inf, blank_lp + lp, emissions + (lp,))
+                    else:
+                        add(prefix + (c,), -np.inf, total_lp + lp, emissions + (lp,))
+
+            beams = dict(sorted(
+                next_beams.items(),
+                key=lambda item: _log_add(item[1][0], item[1][1]),
+                reverse=True,
+            )[:beam_width])
+
+        prefix, (blank_lp, non_blank_lp, emissions) = next(iter(beams.items()))
+        steps = max(row_steps, 1)
+        results.append(CtcResult(
+            text="".join(chars[c] for c in prefix),
+            confidence=float(np.exp(_log_add(blank_lp, non_blank_lp) / steps)),
+            char_confidences=[float(np.exp(lp)) for lp in emissions] if char_confidences else None,
+        ))
+    return results
@@ -1,7 +1,5 @@
 import numpy as np
 import cv2
-import pyclipper
-from shapely.geometry import Polygon
 
 def order_points(pts: np.ndarray) -> np.ndarray:
     """Order points in [top-left, top-right, bottom-right, bottom-left] order."""
@@ -14,22 +12,6 @@ def order_points(pts: np.ndarray) -> np.ndarray:
     rect[3] = pts[np.argmax(diff)]
     return rect
 
-def unclip_polygon(poly: np.ndarray, unclip_ratio: float) -> np.ndarray:
-    """Expand polygon by unclip_ratio."""
-    area = Polygon(poly).area
-    length = Polygon(poly).length
-    if length == 0 or area == 0:
-        return poly
-    offset = (area * unclip_ratio) / length
-    pc = pyclipper.PyclipperOffset()
-    pc.AddPath(poly.astype(np.int32).tolist(),
-               pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
-    expanded = pc.Execute(offset)
-    if not expanded:
-        return poly
-    return np.array(max(expanded, key=lambda p: Polygon(p).area),
-                    dtype=np.float32)
-
 def warp_crop(img: np.ndarray, box: np.ndarray, height: int) -> np.ndarray:
     """Perspective-warp quadrilateral to rectangle of given height."""
     box = order_points(box)
@@ -1,42 +1,115 @@
 import numpy as np
 import cv2
-from PIL import Image
-from shapely.geometry import Polygon
-from src.infrastructure.models.paddleocr.config import paddle_ocr_settings
-from src.infrastructure.models.paddleocr.helpers import unclip_polygon, warp_crop
+from src.infrastructure.models.paddleocr.config import PaddleOCRSettings, paddle_ocr_settings
+from src.infrastructure.models.paddleocr.helpers import warp_crop
 
-def post_process(det_map: np.ndarray, orig_pil: Image.Image) -> tuple[list[np.ndarray], list[np.ndarray]]:
-    """Post-process detection results to get boxes and crops."""
+# Boxes with a side shorter than this (detection map pixels) are dropped
+MIN_BOX_SIDE = 3
+
+
+def polygon_areas_and_perimeters(contours: list[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Area (shoelace) and perimeter of each closed polygon, computed over all of them at once."""
+    lengths = np.fromiter((len(c) for c in contours), dtype=np.int64, count=len(contours))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    points = np.concatenate([c.reshape(-1, 2) for c in contours]).astype(np.float64)
+    # Index of the next point of each point, wrapping around within its polygon
+    following = np.arange(len(points)) + 1
+    following[starts + lengths - 1] = starts
+    x, y = points[:, 0], points[:, 1]
+    cross = x * y[following] - x[following] * y
+    edges = np.hypot(x[following] - x, y[following] - y)
+    return np.abs(np.add.reduceat(cross, starts)) / 2, np.add.reduceat(edges, starts)
+
+
+def rect_points(rects: np.ndarray) -> np.ndarray:
+    """Corners of [N, 5] (cx, cy, w, h, angle in degrees) rotated rectangles as [N, 4, 2], like cv2.boxPoints."""
+    cx, cy, w, h, angle = rects.T
+    theta = np.deg2rad(angle)
+    b, a = np.cos(theta) * 0.5, np.sin(theta) * 0.5
+    p0 = np.stack([cx - a * h - b * w, cy + b * h - a * w], axis=1)
+    p1 = np.stack([cx + a * h - b * w, cy - b * h - a * w], axis=1)
+    center = np.stack([cx, cy], axis=1)
+    return np.stack([p0, p1, 2 * center - p0, 2 * center - p1], axis=1).astype(np.float32)
+
+
+def enclosing_box(points: np.ndarray) -> np.ndarray:
+    """[4, 2] corners of the minimum area rectangle enclosing [..., 2] points."""
+    (cx, cy), (w, h), angle = cv2.minAreaRect(points.reshape(-1, 2).astype(np.float32))
+    return rect_points(np.array([[cx, cy, w, h, angle]]))[0]
+
+
+def box_score(det_map: np.ndarray, box: np.ndarray) -> float:
+    """Mean probability of the detection map inside a box (PaddleOCR's `box_score_fast`)."""
     h, w = det_map.shape
-    bin_map = (cv2.GaussianBlur(det_map, (5,5), 0) > paddle_ocr_settings.box_threshold).astype(np.uint8)*255
+    xmin, ymin = np.clip(np.floor(box.min(axis=0)).astype(np.int32), 0, [w - 1, h - 1])
+    xmax, ymax = np.clip(np.ceil(box.max(axis=0)).astype(np.int32), 0, [w - 1, h - 1])
+    mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype=np.uint8)
+    cv2.fillPoly(mask, [(box - [xmin, ymin]).round().astype(np.int32)], 1)
+    return cv2.mean(det_map[ymin:ymax + 1, xmin:xmax + 1], mask)[0]
+
+
+def post_process(
+    det_map: np.ndarray,
+    image: np.ndarray,
+    settings: PaddleOCRSettings = paddle_ocr_settings,
+) -> tuple[list[np.ndarray], list[np.ndarray]]:
+    """
+    Post-process detection results to get boxes and crops (from the [H, W, 3] detection input image).
+    Contours are filtered by area, size and box score before any crop is made, boxes are
+    expanded by `unclip_ratio` in closed form.
+    """
+    boxes = find_boxes(det_map, image.shape[:2], settings)
+    # Crops, only for surviving boxes
+    crops = [warp_crop(image, box, paddle_ocr_settings.rec_height) for box in boxes]
+    return list(boxes), crops
+
+
+def find_boxes(
+    det_map: np.ndarray,
+    image_shape: tuple[int, int],
+    settings: PaddleOCRSettings = paddle_ocr_settings,
+) -> np.ndarray:
+    """[N, 4, 2] boxes of a detection map, scaled to an image of (H, W) `image_shape`, thresholds from `settings`."""
+    h, w = det_map.shape
+    empty = np.empty((0, 4, 2), dtype=np.float32)
+    bin_map = (cv2.GaussianBlur(det_map, (5,5), 0) > settings.box_threshold).astype(np.uint8)*255
     cnts, _ = cv2.findContours(bin_map, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    if not cnts:
+        return empty
+
+    # Area filter, in one pass over all contours
+    areas, _ = polygon_areas_and_perimeters(cnts)
+    cnts = [cnts[i] for i in np.flatnonzero(areas >= settings.min_area)]
+    if not cnts:
+        return empty
+
+    # Minimum area rectangles: [N, 5] (cx, cy, w, h, angle)
+    rects = np.array(
+        [(cx, cy, rw, rh, angle) for (cx, cy), (rw, rh), angle in map(cv2.minAreaRect, cnts)],
+        dtype=np.float64,
+    )
+    rects = rects[np.minimum(rects[:, 2], rects[:, 3]) >= MIN_BOX_SIDE]
+    if not len(rects):
+        return empty
+
+    # Box score against the probability map
+    boxes = rect_points(rects)
+    scores = np.array([box_score(det_map, box) for box in boxes])
+    rects = rects[scores >= settings.box_score_threshold]
+    if not len(rects):
+        return empty
+
+    # Unclip: offset each rectangle by area * ratio / perimeter on every side
+    widths, heights = rects[:, 2], rects[:, 3]
+    offsets = widths * heights * settings.unclip_ratio / (2 * (widths + heights))
+    rects[:, 2] += 2 * offsets
+    rects[:, 3] += 2 * offsets
+    boxes = rect_points(rects)
 
-    orig = np.array(orig_pil)
-    scale_x, scale_y = orig_pil.width / w, orig_pil.height / h
-
-    boxes, crops = [], []
-    for c in cnts:
-        if cv2.contourArea(c) < paddle_ocr_settings.min_area:
-            continue
-        eps = paddle_ocr_settings.poly_approx_eps * cv2.arcLength(c, True)
-        pp = cv2.approxPolyDP(c, eps, True).reshape(-1,2).astype(np.float32)
-        pp = unclip_polygon(pp, paddle_ocr_settings.unclip_ratio)
-        if pp.shape[0] < 4:
-            continue
-        # scale back to original
-        pp[:,0] *= scale_x
-        pp[:,1] *= scale_y
-        # get minAreaRect and boxPoints
-        rect = cv2.minAreaRect(pp)
-        box4 = cv2.boxPoints(rect).astype(np.float32)
-        # clip coords
-        box4[:,0] = np.clip(box4[:,0], 0, orig_pil.width-1)
-        box4[:,1] = np.clip(box4[:,1], 0, orig_pil.height-1)
-        if Polygon(box4).area < paddle_ocr_settings.min_area:
-            continue
-
-        crop = warp_crop(orig, box4, paddle_ocr_settings.rec_height)
-        boxes.append(box4)
-        crops.append(crop)
-
-    return boxes, crops
+    # Scale to the image, clip, then drop boxes left too small
+    image_h, image_w = image_shape
+    boxes *= np.array([image_w / w, image_h / h], dtype=np.float32)
+    boxes[:, :, 0] = np.clip(boxes[:, :, 0], 0, image_w - 1)
+    boxes[:, :, 1] = np.clip(boxes[:, :, 1], 0, image_h - 1)
+    box_areas, _ = polygon_areas_and_perimeters(list(boxes))
+    return boxes[box_areas >= settings.min_area]
@@ -1,31 +1,116 @@
+import io
+import threading
+from collections import OrderedDict
+from typing import Sequence, Tuple
+
 import numpy as np
-import cv2
 from PIL import Image
-import io
-from src.infrastructure.models.paddleocr.config import paddle_ocr_settings
-
-def _normalize_and_transpose(img: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
-    """Shared preprocessing function for normalization and transpose operations.
-    
-    Args:
-        img: Input image array
-        mean: Normalization mean values
-        std: Normalization standard deviation values
-    
-    Returns:
-        Normalized and transposed image array
+from src.infrastructure.models.paddleocr.config import PaddleOCRSettings, paddle_ocr_settings
+
+
+def _normalization_table(mean: Sequence[float], std: Sequence[float]) -> np.ndarray:
+    """Precompute the normalized float32 value of each uint8 value, per channel: shape [3, 256]."""
+    values = np.arange(256, dtype=np.float32) / 255.0
+    mean_arr = np.asarray(mean, dtype=np.float32)[:, None]
+    std_arr = np.asarray(std, dtype=np.float32)[:, None]
+    return ((values[None, :] - mean_arr) / std_arr).astype(np.float32)
+
+_DET_TABLE = _normalization_table(paddle_ocr_settings.det_norm_mean, paddle_ocr_settings.det_norm_std)
+_REC_TABLE = _normalization_table(paddle_ocr_settings.rec_norm_mean, paddle_ocr_settings.rec_norm_std)
+
+
+def normalize_into(img: np.ndarray, table: np.ndarray, out: np.ndarray, reverse_channels: bool = False) -> None:
+    """Normalize and transpose.
+
+    Writes the [H, W, 3] uint8 image into the top-left corner of the [3, H', W']
+    float32 `out` in one table lookup per channel (no float temporaries).
+    `reverse_channels` feeds RGB images to models trained on BGR ones.
+    """
+    h, w = img.shape[:2]
+    for c in range(3):
+        channel = img[:, :, 2 - c if reverse_channels else c]
+        # Indices are uint8, always in range: 'clip' avoids buffering `out`
+        np.take(table[c], channel, out=out[c, :h, :w], mode="clip")
+
+
+class TensorPool:
     """
-    normalized = (img - mean) / std
-    return normalized.transpose(2, 0, 1)[None, ...].astype(np.float32)
+    Per-thread reusable float32 batch tensors, by item shape ([3, H, W]).
+    A tensor is reused until its thread asks for the same shape again, so callers must
+    be done with it by then. At most `max_shapes` shapes are kept per thread (least
+    recently used first out).
+    """
+
+    def __init__(self, max_shapes: int = 8):
+        self._max_shapes = max_shapes
+        self._local = threading.local()
+
+    def get(self, batch_size: int, shape: Tuple[int, ...]) -> np.ndarray:
+        """Return an uninitialized [batch_size, *shape] tensor."""
+        tensors: "OrderedDict[Tuple[int, ...], np.ndarray]" = getattr(self._local, "tensors", None) or OrderedDict()
+        self._local.tensors = tensors
+        tensor = tensors.pop(shape, None)
+        if tensor is None or tensor.shape[0] < batch_size:
+            tensor = np.empty((batch_size, *shape), dtype=np.float32)
+        tensors[shape] = tensor
+        while len(tensors) > self._max_shapes:
+            tensors.popitem(last=False)
+        return tensor[:batch_size]
+
+
+def det_resize_size(width: int, height: int, settings: PaddleOCRSettings = paddle_ocr_settings) -> Tuple[int, int]:
+    """(width, height) an image is scaled to for detection, aspect ratio preserved."""
+    if settings.det_limit_type == "max":
+        scale = min(1.0, settings.det_limit_side_len / max(width, height))
+    else:
+        scale = max(1.0, settings.det_limit_side_len / min(width, height))
+    # Must fit the largest bucket
+    scale = min(scale, paddle_ocr_settings.det_size_buckets[-1] / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def det_canvas_shape(image: np.ndarray) -> Tuple[int, int]:
+    """(H, W) of the detection input a resized image is padded to: the smallest bucket fitting each side."""
+    h, w = image.shape[:2]
+    buckets = paddle_ocr_settings.det_size_buckets
+    return next(b for b in buckets if b >= h), next(b for b in buckets if b >= w)
+
+def tiles_image(width: int, height: int, settings: PaddleOCRSettings = paddle_ocr_settings) -> bool:
+    """Whether detection runs on tiles of the image at native resolution, rather than on the resized image."""
+    return settings.tiling and max(width, height) > settings.tile_threshold_side
+
+def decode_for_det(
+    im_bytes: bytes,
+    allow_tiling: bool = True,
+    settings: PaddleOCRSettings = paddle_ocr_settings,
+) -> Tuple[Tuple[int, int], np.ndarray]:
+    """
+    Decode image once: original (width, height) and the [H, W, 3] RGB uint8 image resized
+    for detection (kept at native resolution if it is to be tiled), as set by `settings`
+    (a request's profile).
+    """
+    img = Image.open(io.BytesIO(im_bytes))
+    original_size = img.size
+    img = img.convert("RGB")
+    resized_size = det_resize_size(*original_size, settings)
+    if resized_size != original_size and not (allow_tiling and tiles_image(*original_size, settings)):
+        img = img.resize(resized_size, Image.BILINEAR)
+    return original_size, np.asarray(img)
+
+def normalize_for_det(img: np.ndarray, out: np.ndarray) -> None:
+    """Write a resized image into the top-left corner of its [3, H, W] slot of a detection batch, padding the rest."""
+    h, w = img.shape[:2]
+    normalize_into(img, _DET_TABLE, out)
+    # Zero padding, i.e. the mean color once normalized
+    out[:, h:, :] = 0
+    out[:, :h, w:] = 0
 
-def preprocess_for_det(im_bytes: bytes) -> tuple[np.ndarray, Image.Image]:
-    """Preprocess image for detection."""
-    img = Image.open(io.BytesIO(im_bytes)).convert("RGB")
-    img = img.resize(paddle_ocr_settings.target_size, Image.BILINEAR)
-    arr = np.array(img, dtype=np.float32) / 255.0
-    return _normalize_and_transpose(arr, paddle_ocr_settings.det_norm_mean, paddle_ocr_settings.det_norm_std), img
+def normalize_for_rec(crop: np.ndarray, out: np.ndarray) -> None:
+    """Write a crop into (the left part of) its [3, rec_height, W] slot of a recognition batch."""
+    # Recognition models expect BGR
+    normalize_into(crop, _REC_TABLE, out, reverse_channels=True)
 
 def preprocess_recognize(crop: np.ndarray) -> np.ndarray:
     """Preprocess crop for recognition."""
-    im = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
-    return _normalize_and_transpose(im, paddle_ocr_settings.rec_norm_mean, paddle_ocr_settings.rec_norm_std)
+    tensor = np.empty((1, 3, *crop.shape[:2]), dtype=np.float32)
+    normalize_for_rec(crop, tensor[0])
+    return tensor
@@ -0,0 +1,171 @@
+"""
+INT8 quantization of the PaddleOCR detection/recognition models.
+
+Builds, next to each fp32 model (detection, and recognition of every language of
+`rec_languages`), a dynamically quantized variant (`<name>.int8_dynamic.onnx`, weights only,
+no calibration) and a statically quantized QDQ variant (`<name>.int8_static.onnx`, activations
+calibrated on a set of local images, which should contain text of every language). Select them
+with `det_precision` / `rec_precision` in `config.yaml`.
+
+    python -m src.infrastructure.models.paddleocr.quantization --calibration-dir images/
+
+Requires the `onnx` package.
+"""
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.infrastructure.models.paddleocr.config import PaddleOCRSettings, paddle_ocr_settings
+from src.infrastructure.models.paddleocr.postprocessing import post_process
+from src.infrastructure.models.paddleocr.preprocessing import (
+    decode_for_det,
+    det_canvas_shape,
+    normalize_for_det,
+    preprocess_recognize,
+)
+from src.infrastructure.models.paddleocr.session import OnnxModel, variant_model_path
+
+QUANTIZED_PRECISIONS = ("int8_dynamic", "int8_static")
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff"}
+
+
+def list_images(directory: str) -> List[Path]:
+    return sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def quantization_targets(models: Iterable[str], settings: PaddleOCRSettings) -> List[Tuple[str, str]]:
+    """(name, fp32 model path) of the models to quantize: `det`, and `rec` of every language."""
+    targets = []
+    if "det" in models:
+        targets.append(("det", settings.det_model_path))
+    if "rec" in models:
+        targets.extend((f"rec[{lang}]", path) for lang, path in settings.rec_model_paths().items())
+    return targets
+
+
+def det_calibration_tensors(images: Iterable[Path]) -> Iterator[np.ndarray]:
+    """Detection inputs ([1, 3, H, W], padded to their size bucket) of calibration images."""
+    for image_path in images:
+        _, image = decode_for_det(image_path.read_bytes(), allow_tiling=False)
+        tensor = np.empty((1, 3, *det_canvas_shape(image)), dtype=np.float32)
+        normalize_for_det(image, tensor[0])
+        yield tensor
+
+
+def rec_calibration_tensors(images: Iterable[Path], det_model_path: str, max_crops: int) -> Iterator[np.ndarray]:
+    """Recognition inputs ([1, 3, rec_height, w]) of text lines detected by the fp32 detection model."""
+    det_model = OnnxModel(det_model_path, paddle_ocr_settings)
+    count = 0
+    for image_path in images:
+        _, image = decode_for_det(image_path.read_bytes(), allow_tiling=False)
+        tensor = np.empty((1, 3, *det_canvas_shape(image)), dtype=np.float32)
+        normalize_for_det(image, tensor[0])
+        det_map = det_model.run(tensor)[0, 0, :image.shape[0], :image.shape[1]]
+        _, crops = post_process(det_map, image)
+        for crop in crops:
+            yield preprocess_recognize(crop)
+            count += 1
+            if count >= max_crops:
+                return
+
+
+def _preprocess(model_path: str, output_path: str) -> str:
+    """Shape inference and graph cleanup recommended before quantization (best effort)."""
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    try:
+        quant_pre_process(model_path, output_path, skip_symbolic_shape=True)
+        return output_path
+    except Exception as e:
+        print(f"Warning: Could not pre-process {model_path} for quantization, using it as is: {e}")
+        return model_path
+
+
+def quantize_dynamic_model(model_path: str, output_path: str) -> None:
+    """Quantize weights to 8 bits, activations are quantized on the fly at inference."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = _preprocess(model_path, str(Path(tmp) / "preprocessed.onnx"))
+        # Unsigned weights: onnxruntime's CPU ConvInteger kernel has no int8 variant
+        quantize_dynamic(source, output_path, weight_type=QuantType.QUInt8)
+
+
+def quantize_static_model(
+    model_path: str,
+    output_path: str,
+    calibration: Iterable[np.ndarray],
+    calibration_method: str = "minmax",
+) -> None:
+    """Quantize weights and activations to 8 bits (QDQ format), activation ranges calibrated on `calibration` inputs."""
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        CalibrationMethod,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    input_name = onnx.load(model_path, load_external_data=False).graph.input[0].name
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._inputs = iter(calibration)
+
+        def get_next(self) -> Optional[dict]:
+            tensor = next(self._inputs, None)
+            return None if tensor is None else {input_name: tensor}
+
+    methods = {
+        "minmax": CalibrationMethod.MinMax,
+        "entropy": CalibrationMethod.Entropy,
+        "percentile": CalibrationMethod.Percentile,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        source = _preprocess(model_path, str(Path(tmp) / "preprocessed.onnx"))
+        quantize_static(
+            source,
+            output_path,
+            _Reader(),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=methods[calibration_method],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calibration-dir", help="Images used to calibrate static quantization")
+    parser.add_argument("--models", nargs="+", choices=["det", "rec"], default=["det", "rec"])
+    parser.add_argument("--precisions", nargs="+", choices=QUANTIZED_PRECISIONS, default=list(QUANTIZED_PRECISIONS))
+    parser.add_argument("--calibration-method", choices=["minmax", "entropy", "percentile"], default="minmax")
+    parser.add_argument("--max-images", type=int, default=100, help="Calibration images used for detection")
+    parser.add_argument("--max-crops", type=int, default=500, help="Calibration text lines used for recognition")
+    args = parser.parse_args()
+
+    if "int8_static" in args.precisions and not args.calibration_dir:
+        parser.error("--calibration-dir is required for int8_static")
+    images = list_images(args.calibration_dir)[:args.max_images] if args.calibration_dir else []
+
+    for name, model_path in quantization_targets(args.models, paddle_ocr_settings):
+        for precision in args.precisions:
+            output_path = variant_model_path(model_path, precision)
+            if precision == "int8_dynamic":
+                quantize_dynamic_model(model_path, output_path)
+            else:
+                if name == "det":
+                    calibration = det_calibration_tensors(images)
+                else:
+                    calibration = rec_calibration_tensors(images, paddle_ocr_settings.det_model_path, args.max_crops)
+                quantize_static_model(model_path, output_path, calibration, args.calibration_method)
+            print(f"{name} {precision}: {output_path}")
+
+
+if __name__ == "__main__":
+    main()
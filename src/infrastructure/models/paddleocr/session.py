@@ -0,0 +1,163 @@
+import hashlib
+import os
+import platform
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import onnxruntime as ort
+
+from src.infrastructure.models.paddleocr.config import PaddleOCRSettings
+
+FALLBACK_PROVIDER = "CPUExecutionProvider"
+
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+_GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+
+def variant_model_path(model_path: str, precision: str) -> str:
+    """Path of the `precision` variant of a model: `<name>.<precision>.onnx` next to the fp32 one."""
+    if precision == "fp32":
+        return model_path
+    path = Path(model_path)
+    return str(path.with_name(f"{path.stem}.{precision}{path.suffix}"))
+
+
+def model_path_for_precision(model_path: str, precision: str) -> str:
+    """Existing `precision` variant of a model."""
+    variant = variant_model_path(model_path, precision)
+    if not Path(variant).exists():
+        raise FileNotFoundError(
+            f"No {precision} variant of {model_path} ({variant}), "
+            "build it with `python -m src.infrastructure.models.paddleocr.quantization`"
+        )
+    return variant
+
+
+def check_model_variants(model_paths: Iterable[str], precision: str) -> None:
+    """Raise FileNotFoundError listing the models without a `precision` variant, if any."""
+    missing = [variant_model_path(path, precision) for path in model_paths]
+    missing = [path for path in missing if not Path(path).exists()]
+    if missing:
+        hint = ""
+        if precision != "fp32":
+            hint = ", build them with `python -m src.infrastructure.models.paddleocr.quantization`"
+        raise FileNotFoundError(f"Missing {precision} model(s): {', '.join(missing)}{hint}")
+
+
+def select_providers(preferred: List[str]) -> List[str]:
+    """Preferred providers available in this onnxruntime build, in order, CPU always last resort."""
+    available = ort.get_available_providers()
+    providers = [provider for provider in preferred if provider in available]
+    if FALLBACK_PROVIDER not in providers:
+        providers.append(FALLBACK_PROVIDER)
+    return providers
+
+
+def create_session_options(settings: PaddleOCRSettings) -> ort.SessionOptions:
+    options = ort.SessionOptions()
+    # 0 lets onnxruntime pick
+    options.intra_op_num_threads = settings.intra_op_num_threads
+    options.inter_op_num_threads = settings.inter_op_num_threads
+    options.execution_mode = _EXECUTION_MODES[settings.execution_mode]
+    options.graph_optimization_level = _GRAPH_OPTIMIZATION_LEVELS[settings.graph_optimization_level]
+    return options
+
+
+class OnnxModel:
+    """
+    Single input, single output ONNX model.
+
+    Sessions are created with the adapter's SessionOptions and the available providers.
+    With `optimized_model_dir` set (relative to the model's directory), the graph
+    optimized on first load is saved there (per model content, optimization level,
+    provider, machine and onnxruntime version) and loaded as-is on later boots.
+    With `io_binding` enabled, outputs are written into per-thread buffers reused per
+    input shape: a returned array is only valid until the same thread runs the model
+    again on the same shape.
+    """
+
+    def __init__(self, model_path: str, settings: PaddleOCRSettings):
+        providers = select_providers(settings.providers)
+        options = create_session_options(settings)
+
+        if settings.optimized_model_dir:
+            optimized_path = self._optimized_model_path(model_path, settings, providers[0])
+            if optimized_path.exists():
+                model_path = str(optimized_path)
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+            else:
+                optimized_path.parent.mkdir(parents=True, exist_ok=True)
+                # Written under a temporary name: other worker processes may load the model at the same time
+                tmp_path = optimized_path.with_name(f"{optimized_path.name}.{os.getpid()}.tmp")
+                options.optimized_model_filepath = str(tmp_path)
+                self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+                os.replace(tmp_path, optimized_path)
+        else:
+            self.session = ort.InferenceSession(model_path, sess_options=options, providers=providers)
+
+        self.providers = self.session.get_providers()
+        self._input_name = self.session.get_inputs()[0].name
+        self._output_name = self.session.get_outputs()[0].name
+        self._io_binding = settings.io_binding
+        # Output shape of each input shape seen so far (learned on first run)
+        self._output_shapes: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+        self._local = threading.local()
+
+    @staticmethod
+    def _optimized_model_path(model_path: str, settings: PaddleOCRSettings, provider: str) -> Path:
+        path = Path(model_path)
+        # Content hash: a model replaced (e.g. re-quantized) under the same name gets a new graph
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        name = (
+            f"{path.stem}.{digest.hexdigest()[:16]}.{settings.graph_optimization_level}.{provider}"
+            f".{platform.machine()}.ort{ort.__version__}.onnx"
+        )
+        # Absolute directories are kept as-is by the join
+        return path.parent / settings.optimized_model_dir / name
+
+    def run(self, batch: np.ndarray) -> np.ndarray:
+        output_shape = self._output_shapes.get(batch.shape)
+        if not self._io_binding or output_shape is None:
+            output = self.session.run([self._output_name], {self._input_name: batch})[0]
+            self._output_shapes[batch.shape] = output.shape
+            return output
+
+        output = self._output_buffer(batch.shape, output_shape)
+        binding = self.session.io_binding()
+        binding.bind_cpu_input(self._input_name, np.ascontiguousarray(batch))
+        binding.bind_output(
+            self._output_name,
+            device_type="cpu",
+            device_id=0,
+            element_type=output.dtype,
+            shape=output.shape,
+            buffer_ptr=output.ctypes.data,
+        )
+        self.session.run_with_iobinding(binding)
+        return output
+
+    def _output_buffer(self, input_shape: Tuple[int, ...], output_shape: Tuple[int, ...], max_shapes: int = 8) -> np.ndarray:
+        buffers: "OrderedDict[Tuple[int, ...], np.ndarray]" = getattr(self._local, "buffers", None) or OrderedDict()
+        self._local.buffers = buffers
+        buffer = buffers.pop(input_shape, None)
+        if buffer is None:
+            buffer = np.empty(output_shape, dtype=np.float32)
+        buffers[input_shape] = buffer
+        while len(buffers) > max_shapes:
+            buffers.popitem(last=False)
+        return buffer
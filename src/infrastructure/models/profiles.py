@@ -0,0 +1,63 @@
+from typing import Any, Callable, Dict, Generic, Iterable, List, Optional, TypeVar
+
+from pydantic import BaseModel
+
+Settings = TypeVar("Settings", bound=BaseModel)
+Profile = TypeVar("Profile")
+
+
+class UnknownProfileError(ValueError):
+    """Raised when a request selects a profile the adapter doesn't define."""
+
+
+def check_profile_overrides(
+    profiles: Dict[str, Dict[str, Any]],
+    overridable: Iterable[str],
+) -> Dict[str, Dict[str, Any]]:
+    """Validator helper: profiles may only override `overridable` settings."""
+    allowed = set(overridable)
+    for name, overrides in profiles.items():
+        unknown = set(overrides) - allowed
+        if unknown:
+            raise ValueError(f"Profile {name!r} overrides {sorted(unknown)}, profiles can override {sorted(allowed)}")
+    return profiles
+
+
+class Profiles(Generic[Profile]):
+    """
+    Named variants of an adapter's settings (e.g. "fast", "accurate"), selected per
+    request by `options.profile`.
+
+    Each profile is the base settings with its overrides applied, validated and turned
+    into whatever the adapter needs per call by `prepare` (the settings themselves by
+    default) once here: selecting a profile is a dict lookup. Requests without a profile
+    get `default` (the base settings when None).
+    """
+
+    def __init__(
+        self,
+        base: Settings,
+        overrides: Dict[str, Dict[str, Any]],
+        default: Optional[str] = None,
+        prepare: Callable[[Settings], Profile] = lambda settings: settings,
+    ):
+        if default is not None and default not in overrides:
+            raise ValueError(f"Default profile {default!r} is not defined, expected one of {sorted(overrides)}")
+        self._profiles: Dict[str, Profile] = {
+            name: prepare(type(base).model_validate({**base.model_dump(), **values}))
+            for name, values in overrides.items()
+        }
+        self._default = prepare(base) if default is None else self._profiles[default]
+
+    @property
+    def names(self) -> List[str]:
+        return sorted(self._profiles)
+
+    def get(self, name: Optional[str]) -> Profile:
+        """Profile `name`, the default one when None."""
+        if name is None:
+            return self._default
+        try:
+            return self._profiles[name]
+        except KeyError:
+            raise UnknownProfileError(f"Unknown profile {name!r}, expected one of {self.names}") from None
@@ -0,0 +1,74 @@
+"""
+Tiling of large images for text detection at native resolution.
+
+Images are covered by equally sized, overlapping tiles (so tiles can be batched),
+detection runs on each tile and boxes found in several tiles are merged back.
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+
+def tile_grid(width: int, height: int, tile_size: int, overlap: int) -> Tuple[Tuple[int, int], List[Tuple[int, int]]]:
+    """
+    (tile width, tile height) and the (x, y) origins of tiles covering a `width` x `height` image.
+    Tiles are `tile_size` (or the image side, if smaller) and overlap by at least `overlap`
+    pixels, the last tile of each row/column is aligned on the image border.
+    """
+    if not 0 <= overlap < tile_size:
+        raise ValueError("overlap must be >= 0 and < tile_size")
+
+    def starts(side: int) -> List[int]:
+        tile = min(tile_size, side)
+        if tile == side:
+            return [0]
+        count = -(-(side - overlap) // (tile - overlap))
+        # Spread evenly: first tile at 0, last one ending on the border
+        return [round(i * (side - tile) / (count - 1)) for i in range(count)]
+
+    tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+    return (tile_w, tile_h), [(x, y) for y in starts(height) for x in starts(width)]
+
+
+def merge_tile_boxes(boxes: np.ndarray, tile_ids: np.ndarray, min_overlap: float) -> List[List[int]]:
+    """
+    Group the [N, 4] LTRB boxes detected in different tiles that are the same text.
+
+    Two boxes from different tiles are the same text when they intersect and either their
+    vertical overlap covers at least `min_overlap` of the shorter one (a horizontal line
+    cut by a tile border), or their intersection covers at least `min_overlap` of the
+    smaller one (text seen in both tiles). Boxes of the same tile are never grouped.
+    Returns groups of box indices (connected components), ordered by their first index.
+    """
+    if len(boxes) == 0:
+        return []
+    left, top, right, bottom = (boxes[:, i] for i in range(4))
+    inter_w = np.minimum(right[:, None], right[None, :]) - np.maximum(left[:, None], left[None, :])
+    inter_h = np.minimum(bottom[:, None], bottom[None, :]) - np.maximum(top[:, None], top[None, :])
+    heights = bottom - top
+    areas = (right - left) * heights
+    min_h = np.maximum(np.minimum(heights[:, None], heights[None, :]), 1e-6)
+    min_area = np.maximum(np.minimum(areas[:, None], areas[None, :]), 1e-6)
+
+    same = (inter_w > 0) & (inter_h > 0)
+    same &= (inter_h / min_h >= min_overlap) | (inter_w * inter_h / min_area >= min_overlap)
+    same &= tile_ids[:, None] != tile_ids[None, :]
+
+    # Union-find over the matching pairs
+    parents = list(range(len(boxes)))
+
+    def find(i: int) -> int:
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for i, j in zip(*np.nonzero(np.triu(same, k=1))):
+        root_i, root_j = find(int(i)), find(int(j))
+        if root_i != root_j:
+            parents[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: dict = {}
+    for i in range(len(boxes)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
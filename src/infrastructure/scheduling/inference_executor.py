@@ -0,0 +1,438 @@
+import asyncio
+import multiprocessing
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, nullcontext
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, Optional, Tuple, Type
+
+from src.domain.models import OcrColumnarOutput, OcrImageInput, OcrInput, OcrOutput, OcrStreamEvent
+from src.domain.ports import CachedOutput, OcrCachePort
+from src.domain.use_cases.process_image import ProcessImageUseCase
+from src.infrastructure.scheduling.rate_limiter import InferenceClient, RateLimitExceededError
+
+THREAD_MODE = "thread"
+PROCESS_MODE = "process"
+
+
+class InferenceQueueFullError(RuntimeError):
+    """Raised when the inference queue is full, the request should be retried later."""
+    def __init__(self, retry_after_s: int):
+        super().__init__("Inference queue is full")
+        self.retry_after_s = retry_after_s
+
+
+# Client of inferences submitted without one
+ANONYMOUS_CLIENT = InferenceClient("")
+
+
+class _FairSlots:
+    """
+    Semaphore whose waiters are served round-robin across clients (FIFO within a client),
+    so a client with many queued inferences can't starve the others.
+    """
+
+    def __init__(self, slots: int):
+        self._free = slots
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    async def acquire(self, client_id: str) -> None:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(client_id, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over right before cancellation: pass it on
+                self.release()
+            else:
+                queue = self._waiters.get(client_id)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._waiters[client_id]
+            raise
+
+    def __len__(self) -> int:
+        """Number of clients waiting for a slot."""
+        return len(self._waiters)
+
+    def release(self) -> None:
+        while self._waiters:
+            client_id, queue = next(iter(self._waiters.items()))
+            waiter = queue.popleft()
+            # The client goes back to the end of the rotation
+            if queue:
+                self._waiters.move_to_end(client_id)
+            else:
+                del self._waiters[client_id]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+
+@dataclass
+class _Flight:
+    """An inference shared by the concurrent identical requests awaiting it."""
+    task: asyncio.Task
+    waiters: int = 0
+
+
+# Per-process state of PROCESS_MODE workers (each worker owns its own adapter)
+_worker_use_case: Optional[ProcessImageUseCase] = None
+
+def _init_worker(adapter_name: str) -> None:
+    global _worker_use_case
+    # Importing `src` registers all adapters
+    import src  # noqa: F401
+    from src.infrastructure.caching.ocr_result_cache import create_ocr_result_cache
+    from src.infrastructure.models.registry import get_adapter
+    _worker_use_case = ProcessImageUseCase(
+        get_adapter(adapter_name)(),
+        cache=create_ocr_result_cache(adapter_name),
+    )
+
+def _execute_in_worker(ocr_input: OcrInput | OcrImageInput, use_cache: bool) -> OcrOutput:
+    assert _worker_use_case is not None, "Worker process was not initialized"
+    return _worker_use_case.execute(ocr_input, use_cache)
+
+def _execute_columnar_in_worker(ocr_input: OcrInput | OcrImageInput, use_cache: bool) -> OcrColumnarOutput:
+    assert _worker_use_case is not None, "Worker process was not initialized"
+    return _worker_use_case.execute_columnar(ocr_input, use_cache)
+
+
+class InferenceExecutor:
+    """
+    Async execution layer for ProcessImageUseCase.
+
+    Inferences run on a thread pool (sharing the app's use case) or a process pool
+    (each worker loads its own adapter), so the event loop stays responsive. Use cases
+    of async adapters (waiting on a remote API) are awaited on the event loop instead,
+    without holding a thread: cancelling them cancels the inference (`cancellable`).
+    At most `max_workers` inferences run at once and at most `max_queue_size` wait
+    for a worker, beyond that requests are rejected with InferenceQueueFullError.
+    Waiting inferences are served round-robin across clients, and a client with
+    `max_concurrency` set can't have more inferences running or waiting at once
+    (RateLimitExceededError).
+    With a cached use case, the cache is looked up before taking a worker: hits and
+    requests identical to a running inference (single-flight) never take a worker nor a
+    queue place, but still count towards their own client's `max_concurrency`. Cache
+    keys are computed (and outputs stored) off the event loop.
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        max_workers: int,
+        max_queue_size: int,
+        retry_after_s: int,
+        use_case: Optional[ProcessImageUseCase] = None,
+        adapter_name: Optional[str] = None,
+    ):
+        self._mode = mode
+        self._max_workers = max_workers
+        self._capacity = max_workers + max_queue_size
+        self._retry_after_s = retry_after_s
+
+        self._pool: Executor
+        self._run: Callable[[OcrInput | OcrImageInput, bool], OcrOutput]
+        self._run_columnar: Callable[[OcrInput | OcrImageInput, bool], OcrColumnarOutput]
+        self._run_stream: Optional[Callable[[OcrInput | OcrImageInput, bool], Iterator[OcrStreamEvent]]] = None
+        self._run_async: Optional[Callable[[OcrInput | OcrImageInput, bool], Awaitable[OcrOutput]]] = None
+        self._run_columnar_async: Optional[
+            Callable[[OcrInput | OcrImageInput, bool], Awaitable[OcrColumnarOutput]]
+        ] = None
+        # Process workers have their own caches
+        self._cache: Optional[OcrCachePort] = None
+        if mode == THREAD_MODE:
+            if use_case is None:
+                raise ValueError("Thread mode requires a use case")
+            self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="ocr-inference")
+            self._run = use_case.execute
+            self._run_columnar = use_case.execute_columnar
+            self._run_stream = use_case.execute_stream
+            self._cache = use_case.cache
+            if use_case.is_async:
+                self._run_async = use_case.execute_async
+                self._run_columnar_async = use_case.execute_columnar_async
+        elif mode == PROCESS_MODE:
+            if adapter_name is None:
+                raise ValueError("Process mode requires an adapter name")
+            self._pool = ProcessPoolExecutor(
+                max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(adapter_name,),
+            )
+            self._run = _execute_in_worker
+            self._run_columnar = _execute_columnar_in_worker
+        else:
+            raise ValueError(f"Unknown inference executor mode {mode!r}")
+
+        self._slots = _FairSlots(max_workers)
+        self._admitted_by_client: Dict[str, int] = {}
+        self._in_flight: Dict[str, _Flight] = {}
+
+        # Metrics
+        self._admitted = 0  # running + queued
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._client_limited = 0
+        self._coalesced = 0
+        self._total_wait_s = 0.0
+        self._max_wait_s = 0.0
+
+    async def execute(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool = True,
+        client: InferenceClient = ANONYMOUS_CLIENT,
+    ) -> OcrOutput:
+        """
+        Run the use case on a worker once one is free, unless the output is cached or
+        being computed for an identical request.
+        Raises InferenceQueueFullError (or RateLimitExceededError for the client) right away
+        if the queue is full.
+        """
+        return await self._cached(ocr_input, use_cache, OcrOutput, client, self._execute)
+
+    async def execute_columnar(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool = True,
+        client: InferenceClient = ANONYMOUS_CLIENT,
+    ) -> OcrColumnarOutput:
+        """
+        Same as `execute`, returning the output as columns.
+        """
+        return await self._cached(ocr_input, use_cache, OcrColumnarOutput, client, self._execute_columnar)
+
+    async def stream(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool = True,
+        client: InferenceClient = ANONYMOUS_CLIENT,
+    ) -> AsyncGenerator[OcrStreamEvent, None]:
+        """
+        Run the use case's streaming variant on a worker, yielding events as they come.
+        Raises InferenceQueueFullError (or RateLimitExceededError) on first iteration if the queue is full.
+        In process mode and for async adapters, events are emitted at once after the whole inference.
+        """
+        async with self._slot(client):
+            if self._run_async is not None:
+                output = await self._run_async(ocr_input, use_cache)
+                for event in output.to_stream_events():
+                    yield event
+                return
+
+            loop = asyncio.get_running_loop()
+            if self._run_stream is None:
+                output = await loop.run_in_executor(self._pool, self._run, ocr_input, use_cache)
+                for event in output.to_stream_events():
+                    yield event
+                return
+
+            events = self._run_stream(ocr_input, use_cache)
+            step: Optional[Future] = None
+            try:
+                while True:
+                    # Each step of the generator runs on the worker pool
+                    step = self._pool.submit(next, events, None)
+                    event = await asyncio.wrap_future(step)
+                    if event is None:
+                        break
+                    yield event
+            finally:
+                if step is None:
+                    events.close()
+                else:
+                    # A generator can't be closed while running: wait for the current step
+                    step.add_done_callback(lambda _: events.close())
+
+    @property
+    def cancellable(self) -> bool:
+        """
+        Whether cancelling `execute`/`execute_columnar` stops the inference. Inferences on
+        the worker pools run to completion regardless, only awaited ones are cancelled.
+        """
+        return self._run_async is not None
+
+    async def _execute(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool,
+        client: InferenceClient,
+        client_admitted: bool = False,
+    ) -> OcrOutput:
+        async with self._slot(client, client_admitted):
+            if self._run_async is not None:
+                return await self._run_async(ocr_input, use_cache)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, self._run, ocr_input, use_cache)
+
+    async def _execute_columnar(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool,
+        client: InferenceClient,
+        client_admitted: bool = False,
+    ) -> OcrColumnarOutput:
+        async with self._slot(client, client_admitted):
+            if self._run_columnar_async is not None:
+                return await self._run_columnar_async(ocr_input, use_cache)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, self._run_columnar, ocr_input, use_cache)
+
+    async def _cached(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        use_cache: bool,
+        output_type: Type[CachedOutput],
+        client: InferenceClient,
+        run: Callable[..., Awaitable[CachedOutput]],
+    ) -> CachedOutput:
+        """
+        Serve `output_type` from the cache, else await the inference of an identical request
+        in flight, else `run` the inference and store its output.
+        Each request is admitted as its own client's, only the output is shared: a request
+        whose inference was rejected (full queue) doesn't fail the requests that joined it,
+        they start over. The shared inference is cancelled only once every request awaiting
+        it was.
+        """
+        if self._cache is None or not use_cache:
+            return await run(ocr_input, use_cache, client)
+
+        async with self._client_admission(client):
+            image_input, key = await asyncio.to_thread(self._cache_key, ocr_input, output_type)
+            cached = self._cache.get(image_input, output_type, key=key)
+            if cached is not None:
+                return cached
+
+            while True:
+                flight = self._in_flight.get(key)
+                is_leader = flight is None
+                if flight is None:
+                    task = asyncio.ensure_future(self._compute(image_input, key, client, run))
+                    flight = self._in_flight[key] = _Flight(task)
+                    task.add_done_callback(lambda _, key=key, flight=flight: self._land(key, flight))
+                else:
+                    self._coalesced += 1
+                flight.waiters += 1
+                try:
+                    return await asyncio.shield(flight.task)
+                except InferenceQueueFullError:
+                    if is_leader:
+                        raise
+                    # The leader's rejection: try to run it as this request's
+                finally:
+                    flight.waiters -= 1
+                    if not flight.waiters and not flight.task.done():
+                        # Every request left: later ones start over
+                        flight.task.cancel()
+                        self._land(key, flight)
+
+    def _cache_key(
+        self,
+        ocr_input: OcrInput | OcrImageInput,
+        output_type: Type[CachedOutput],
+    ) -> Tuple[OcrImageInput, str]:
+        """Decoded input and its cache key (runs on a thread: decoding and hashing are CPU bound)."""
+        assert self._cache is not None
+        if isinstance(ocr_input, OcrInput):
+            ocr_input = ocr_input.to_image_input()
+        return ocr_input, self._cache.key(ocr_input, output_type)
+
+    async def _compute(
+        self,
+        ocr_input: OcrImageInput,
+        key: str,
+        client: InferenceClient,
+        run: Callable[..., Awaitable[CachedOutput]],
+    ) -> CachedOutput:
+        assert self._cache is not None
+        # Already looked up: the use case doesn't need to check the cache again. Every
+        # request awaiting the output was admitted as its client's already.
+        output = await run(ocr_input, False, client, True)
+        # Sized by serializing the output: off the event loop
+        await asyncio.to_thread(self._cache.put, ocr_input, output, key)
+        return output
+
+    def _land(self, key: str, flight: _Flight) -> None:
+        if self._in_flight.get(key) is flight:
+            del self._in_flight[key]
+
+    @asynccontextmanager
+    async def _slot(self, client: InferenceClient, client_admitted: bool = False) -> AsyncIterator[None]:
+        """
+        Admit a request (or reject it if the queue is full), then wait for a free worker.
+        With `client_admitted`, the request already counts towards its client's concurrency.
+        """
+        if self._admitted >= self._capacity:
+            self._rejected += 1
+            raise InferenceQueueFullError(self._retry_after_s)
+
+        async with nullcontext() if client_admitted else self._client_admission(client):
+            self._admitted += 1
+            enqueued_at = time.perf_counter()
+            try:
+                await self._slots.acquire(client.id)
+                try:
+                    wait_s = time.perf_counter() - enqueued_at
+                    self._total_wait_s += wait_s
+                    self._max_wait_s = max(self._max_wait_s, wait_s)
+                    self._running += 1
+                    try:
+                        yield
+                    finally:
+                        self._running -= 1
+                        self._completed += 1
+                finally:
+                    self._slots.release()
+            finally:
+                self._admitted -= 1
+
+    @asynccontextmanager
+    async def _client_admission(self, client: InferenceClient) -> AsyncIterator[None]:
+        """Count a request of `client`, RateLimitExceededError beyond its `max_concurrency`."""
+        client_admitted = self._admitted_by_client.get(client.id, 0)
+        if client.max_concurrency > 0 and client_admitted >= client.max_concurrency:
+            self._client_limited += 1
+            raise RateLimitExceededError(
+                "Too many concurrent inferences for this API key",
+                headers={"Retry-After": str(self._retry_after_s)},
+            )
+        self._admitted_by_client[client.id] = client_admitted + 1
+        try:
+            yield
+        finally:
+            remaining = self._admitted_by_client[client.id] - 1
+            if remaining:
+                self._admitted_by_client[client.id] = remaining
+            else:
+                del self._admitted_by_client[client.id]
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, float]:
+        started = self._completed + self._running
+        return {
+            "max_workers": self._max_workers,
+            "capacity": self._capacity,
+            "running": self._running,
+            "queue_depth": self._admitted - self._running,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "client_limited": self._client_limited,
+            "coalesced": self._coalesced,
+            "waiting_clients": len(self._slots),
+            "average_wait_ms": self._total_wait_s / started * 1000 if started else 0.0,
+            "max_wait_ms": self._max_wait_s * 1000,
+        }
@@ -0,0 +1,144 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List
+
+from src.domain.models import OcrColumnarOutput, OcrImageInput, OcrOutput, OcrStreamEvent
+from src.domain.ports import BatchOcrPort, OcrPort
+
+
+@dataclass
+class _PendingRequest:
+    ocr_input: OcrImageInput
+    columnar: bool = False
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatchingOcrPort(OcrPort):
+    """
+    OcrPort decorator collecting concurrent `predict` (and `predict_columnar`) calls into batches.
+
+    A background worker waits for the first pending request, then keeps collecting
+    until `max_batch_size` requests are pending or `max_wait_ms` elapsed, and runs
+    them through the wrapped adapter's `predict_batch` (`predict_batch_columnar` for
+    the columnar requests of the batch).
+    Up to `max_in_flight` batches run at once: the next batch is collected while the
+    previous ones are still running (for adapters overlapping their stages across calls).
+    A failed batch is retried request by request, so each caller gets its own output or error.
+    Each caller blocks on its own future, so this must be called from worker threads
+    (not from the event loop).
+    """
+
+    def __init__(self, adapter: BatchOcrPort, max_batch_size: int, max_wait_ms: float, max_in_flight: int = 1):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be >= 1")
+        self._adapter = adapter
+        self._max_batch_size = max_batch_size
+        self._max_wait_s = max_wait_ms / 1000
+        self._queue: "queue.Queue[_PendingRequest | None]" = queue.Queue()
+        self._max_in_flight = max_in_flight
+        self._in_flight = threading.Semaphore(max_in_flight)
+        self._dispatcher = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="ocr-micro-batch")
+
+        # Metrics
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+
+        self._worker = threading.Thread(target=self._run, name="ocr-micro-batcher", daemon=True)
+        self._worker.start()
+
+    def predict(self, ocrInput: OcrImageInput) -> OcrOutput:
+        pending = _PendingRequest(ocrInput)
+        self._queue.put(pending)
+        return pending.future.result()
+
+    def predict_columnar(self, ocrInput: OcrImageInput) -> OcrColumnarOutput:
+        pending = _PendingRequest(ocrInput, columnar=True)
+        self._queue.put(pending)
+        return pending.future.result()
+
+    def predict_stream(self, ocrInput: OcrImageInput) -> Iterator[OcrStreamEvent]:
+        # Streaming favors time-to-first-result: bypass batching
+        return self._adapter.predict_stream(ocrInput)
+
+    def close(self) -> None:
+        """Stop the worker once the already queued requests are served."""
+        self._queue.put(None)
+        self._worker.join()
+        self._dispatcher.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            batches, requests = self._batches, self._requests
+        average_size = requests / batches if batches else 0.0
+        return {
+            "max_batch_size": self._max_batch_size,
+            "max_wait_ms": self._max_wait_s * 1000,
+            "max_in_flight": self._max_in_flight,
+            "batches": batches,
+            "requests": requests,
+            "average_batch_size": average_size,
+            "fill_rate": average_size / self._max_batch_size,
+        }
+
+    def _run(self) -> None:
+        while True:
+            # Requests keep queuing up while every batch slot is busy
+            self._in_flight.acquire()
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stop = self._collect(batch)
+            self._dispatcher.submit(self._dispatch, batch)
+            if stop:
+                return
+
+    def _collect(self, batch: List[_PendingRequest]) -> bool:
+        """Fill `batch` until full or the wait deadline; return True if a stop was requested."""
+        deadline = time.monotonic() + self._max_wait_s
+        while len(batch) < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if pending is None:
+                return True
+            batch.append(pending)
+        return False
+
+    def _dispatch(self, batch: List[_PendingRequest]) -> None:
+        for columnar in (False, True):
+            group = [pending for pending in batch if pending.columnar == columnar]
+            if group:
+                self._dispatch_group(group, columnar)
+
+        with self._stats_lock:
+            self._batches += 1
+            self._requests += len(batch)
+        self._in_flight.release()
+
+    def _dispatch_group(self, group: List[_PendingRequest], columnar: bool) -> None:
+        predict_batch = self._adapter.predict_batch_columnar if columnar else self._adapter.predict_batch
+        try:
+            outputs = predict_batch([pending.ocr_input for pending in group])
+            if len(outputs) != len(group):
+                raise RuntimeError(
+                    f"{predict_batch.__name__} returned {len(outputs)} outputs for {len(group)} inputs"
+                )
+        except Exception as e:
+            if len(group) == 1:
+                group[0].future.set_exception(e)
+                return
+            # One bad input (e.g. an unsupported language) must not fail the whole batch: retry them one by one
+            for pending in group:
+                self._dispatch_group([pending], columnar)
+        else:
+            for pending, output in zip(group, outputs):
+                pending.future.set_result(output)
@@ -0,0 +1,101 @@
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict
+
+from src.domain.authentication.api_key import ApiKey
+
+
+class RateLimitExceededError(RuntimeError):
+    """Raised when a client exceeds its request rate or concurrency, `headers` tell it when to retry."""
+    def __init__(self, detail: str, headers: Dict[str, str]):
+        super().__init__(detail)
+        self.headers = headers
+
+
+@dataclass(frozen=True)
+class InferenceClient:
+    """Who an inference runs for: the unit of per-client concurrency limits and fair scheduling."""
+    id: str
+    max_concurrency: int = 0  # 0: unlimited
+
+
+@dataclass
+class _TokenBucket:
+    tokens: float
+    updated_at: float
+
+
+class RateLimiter:
+    """
+    Per API key token buckets: each request takes a token, buckets hold at most `burst`
+    tokens and refill at `rate_per_s` tokens per second.
+    Defaults apply to keys without overrides (`rate_limit_per_s`, `rate_limit_burst`,
+    `max_concurrency` set on the key), a rate of 0 means unlimited.
+    At most `max_keys` buckets are kept, least recently used first out (an evicted
+    bucket comes back full).
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, rate_per_s: float, burst: int, max_concurrency: int, max_keys: int = 100_000):
+        self._rate_per_s = rate_per_s
+        self._burst = burst
+        self._max_concurrency = max_concurrency
+        self._max_keys = max_keys
+        self._buckets: "OrderedDict[str, _TokenBucket]" = OrderedDict()
+
+        # Metrics
+        self._allowed = 0
+        self._limited = 0
+
+    def acquire(self, api_key: ApiKey) -> InferenceClient:
+        """
+        Take a token for a request of this key.
+        Raises RateLimitExceededError (with RateLimit-* and Retry-After headers) if none is left.
+        """
+        assert api_key.id is not None
+        rate_per_s = api_key.rate_limit_per_s if api_key.rate_limit_per_s is not None else self._rate_per_s
+        burst = api_key.rate_limit_burst if api_key.rate_limit_burst is not None else self._burst
+        max_concurrency = api_key.max_concurrency if api_key.max_concurrency is not None else self._max_concurrency
+        client = InferenceClient(api_key.id, max_concurrency)
+        if rate_per_s <= 0:
+            self._allowed += 1
+            return client
+
+        now = time.monotonic()
+        bucket = self._buckets.get(api_key.id)
+        if bucket is None:
+            bucket = self._buckets[api_key.id] = _TokenBucket(float(burst), now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(api_key.id)
+            bucket.tokens = min(float(burst), bucket.tokens + (now - bucket.updated_at) * rate_per_s)
+            bucket.updated_at = now
+
+        if bucket.tokens < 1:
+            self._limited += 1
+            retry_after_s = math.ceil((1 - bucket.tokens) / rate_per_s)
+            raise RateLimitExceededError(
+                "Rate limit exceeded",
+                headers={
+                    "RateLimit-Limit": str(burst),
+                    "RateLimit-Remaining": "0",
+                    "RateLimit-Reset": str(retry_after_s),
+                    "Retry-After": str(retry_after_s),
+                },
+            )
+        bucket.tokens -= 1
+        self._allowed += 1
+        return client
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rate_per_s": self._rate_per_s,
+            "burst": self._burst,
+            "max_concurrency": self._max_concurrency,
+            "keys": len(self._buckets),
+            "allowed": self._allowed,
+            "limited": self._limited,
+        }
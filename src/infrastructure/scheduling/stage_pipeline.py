@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+@dataclass
+class Stage:
+    name: str
+    # Takes the output of the previous stage (the submitted item for the first one)
+    fn: Callable[[Any], Any]
+    workers: int = 1
+
+
+@dataclass
+class _Job:
+    value: Any
+    future: Future = field(default_factory=Future)
+
+
+@dataclass
+class _StageState:
+    stage: Stage
+    queue: "queue.Queue[_Job | None]"
+    threads: List[threading.Thread] = field(default_factory=list)
+    # Metrics
+    items: int = 0
+    busy_s: float = 0.0
+
+
+class StagePipeline:
+    """
+    Runs items through a sequence of stages, each served by its own worker threads.
+
+    Stages are connected by bounded queues: while one item is in a later stage, the
+    next ones already go through the earlier stages, and a slow stage holds back the
+    ones before it (and, through the first queue, `submit`) instead of letting queues grow.
+    An exception raised by a stage fails that item's future, the item skips the
+    remaining stages.
+    Stage functions run concurrently on different items (and on several items of a
+    stage with more than one worker), they must not share per-call state.
+    """
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int, name: str = "pipeline"):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        if queue_size < 1:
+            raise ValueError("queue_size must be >= 1")
+        if any(stage.workers < 1 for stage in stages):
+            raise ValueError("Each stage needs at least one worker")
+
+        self._stages = [_StageState(stage, queue.Queue(maxsize=queue_size)) for stage in stages]
+        self._stats_lock = threading.Lock()
+        self._started_at = time.monotonic()
+        for index, state in enumerate(self._stages):
+            next_state = self._stages[index + 1] if index + 1 < len(self._stages) else None
+            for worker in range(state.stage.workers):
+                thread = threading.Thread(
+                    target=self._run,
+                    args=(state, next_state),
+                    name=f"{name}-{state.stage.name}-{worker}",
+                    daemon=True,
+                )
+                thread.start()
+                state.threads.append(thread)
+
+    def submit(self, item: Any) -> Future:
+        """Queue `item` for the first stage (blocks while that queue is full); the future gets the last stage's output."""
+        job = _Job(item)
+        self._stages[0].queue.put(job)
+        return job.future
+
+    def run(self, item: Any) -> Any:
+        """Submit `item` and wait for its output."""
+        return self.submit(item).result()
+
+    def close(self) -> None:
+        """Stop the workers once the already submitted items went through every stage."""
+        # Queues are FIFO: each stage's workers stop after the items queued before them
+        for state in self._stages:
+            for _ in state.threads:
+                state.queue.put(None)
+            for thread in state.threads:
+                thread.join()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Per stage: workers, items processed, mean processing time, queue depth and
+        utilization (share of its workers' time spent processing since start).
+        The busiest stage is the bottleneck.
+        """
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        stats: Dict[str, float] = {}
+        with self._stats_lock:
+            for state in self._stages:
+                name, workers = state.stage.name, state.stage.workers
+                stats[f"{name}.workers"] = workers
+                stats[f"{name}.items"] = state.items
+                stats[f"{name}.mean_ms"] = state.busy_s / state.items * 1000 if state.items else 0.0
+                stats[f"{name}.queue_depth"] = state.queue.qsize()
+                stats[f"{name}.utilization"] = min(1.0, state.busy_s / (elapsed * workers))
+        return stats
+
+    def _run(self, state: _StageState, next_state: Optional[_StageState]) -> None:
+        while True:
+            job = state.queue.get()
+            if job is None:
+                return
+            # Cancelled futures are dropped before their first stage only: once running they can't be cancelled
+            if state is self._stages[0] and not job.future.set_running_or_notify_cancel():
+                continue
+
+            st = time.perf_counter()
+            try:
+                job.value = state.stage.fn(job.value)
+            except Exception as e:
+                job.future.set_exception(e)
+                job = None
+            busy_s = time.perf_counter() - st
+            with self._stats_lock:
+                state.items += 1
+                state.busy_s += busy_s
+
+            if job is None:
+                continue
+            if next_state is None:
+                job.future.set_result(job.value)
+            else:
+                next_state.queue.put(job)
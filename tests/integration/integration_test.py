@@ -0,0 +1,111 @@
+import asyncio
+import json
+import select
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from src.domain.models import OcrImageInput  # noqa: E402
+from src.infrastructure.models.gemma.adapter import GemmaAdapter  # noqa: E402
+from src.infrastructure.models.gemma.client import LmsClient  # noqa: E402
+from src.infrastructure.models.gemma.config import gemma_settings  # noqa: E402
+
+
+class _StubLmsServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the LMS chat endpoint. Answers `statuses` in order (then 200s),
+    or, with `hang`, never answers and records when the client goes away.
+    """
+
+    def __init__(self, statuses=(), hang=False):
+        super().__init__(("127.0.0.1", 0), _StubLmsHandler)
+        self.statuses = list(statuses)
+        self.hang = hang
+        self.connections = []  # client port of each request
+        self.received = threading.Event()
+        self.client_left = threading.Event()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/chat/completions"
+
+
+class _StubLmsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        server: _StubLmsServer = self.server
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server.connections.append(self.client_address[1])
+        server.received.set()
+        if server.hang:
+            # Wait for the client to close the connection
+            while select.select([self.connection], [], [], 5)[0]:
+                if not self.connection.recv(1, socket.MSG_PEEK):
+                    server.client_left.set()
+                    return
+            return
+
+        status = server.statuses.pop(0) if server.statuses else 200
+        content = json.dumps({"texts": [], "description": "A page", "sentence": "Nothing"})
+        body = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _gemma_adapter(server: _StubLmsServer, max_retries: int) -> GemmaAdapter:
+    adapter = GemmaAdapter.__new__(GemmaAdapter)
+    adapter.instruction_text = "Read the text"
+    settings = gemma_settings.model_copy(update={"max_retries": max_retries, "retry_backoff_s": 0.001})
+    adapter._client = LmsClient(server.url, gemma_settings.headers, settings)
+    return adapter
+
+
+def test_gemma_retries_server_errors_over_pooled_connections():
+    server = _StubLmsServer(statuses=[503, 502])
+    adapter = _gemma_adapter(server, max_retries=2)
+    data = OcrImageInput(content=b"image")
+    try:
+        output = adapter.predict(data)
+        assert output.description == {"description": "A page", "sentence": "Nothing"}
+        assert asyncio.run(adapter.predict_async(data)).texts == []
+        # Two failed attempts, then one success per call, all on one kept-alive connection
+        assert len(server.connections) == 4 and len(set(server.connections)) == 1
+
+        server.statuses = [500] * 3
+        with pytest.raises(RuntimeError, match="500"):
+            adapter.predict(data)
+        assert len(server.connections) == 7
+    finally:
+        adapter.close()
+        server.shutdown()
+
+
+def test_cancelling_gemma_prediction_cancels_the_upstream_request():
+    server = _StubLmsServer(hang=True)
+    adapter = _gemma_adapter(server, max_retries=0)
+
+    async def cancel_once_sent():
+        task = asyncio.create_task(adapter.predict_async(OcrImageInput(content=b"image")))
+        assert await asyncio.to_thread(server.received.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    try:
+        asyncio.run(cancel_once_sent())
+        assert server.client_left.wait(5)
+    finally:
+        adapter.close()
+        server.shutdown()
@@ -0,0 +1,1251 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("onnxruntime")
+
+import asyncio  # noqa: E402
+import time  # noqa: E402
+import types  # noqa: E402
+from functools import partial  # noqa: E402
+from concurrent.futures import ThreadPoolExecutor  # noqa: E402
+from datetime import datetime, timedelta, timezone  # noqa: E402
+
+from bson import ObjectId  # noqa: E402
+from pydantic import ValidationError  # noqa: E402
+from pymongo import UpdateOne  # noqa: E402
+
+from fastapi import HTTPException  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+
+from src.api.camera_session import CameraSession  # noqa: E402
+from src.api.dependencies.image_input import read_image_input  # noqa: E402
+from src.api.schemas import FrameResult  # noqa: E402
+from src.core.config import AppConfig  # noqa: E402
+from src.domain.authentication.api_key import ApiKey, ApiKeyUsage  # noqa: E402
+from src.domain.authentication.api_key_repository import ApiKeyRepository  # noqa: E402
+from src.domain.models import OcrImageInput, OcrOptions, OcrOutput  # noqa: E402
+from src.domain.ports import BatchOcrPort, OcrPort  # noqa: E402
+from src.domain.use_cases.process_image import ProcessImageUseCase  # noqa: E402
+from src.infrastructure.authentication.api_key_repositories import caching  # noqa: E402
+from src.infrastructure.authentication.api_key_repositories.caching import CachingApiKeyRepository  # noqa: E402
+from src.infrastructure.authentication.api_key_repositories.mongo_db.repository import (  # noqa: E402
+    MongoDbApiKeyRepository,
+)
+from src.infrastructure.authentication.api_key_repositories import signed as signed_keys  # noqa: E402
+from src.infrastructure.authentication.api_key_repositories.signed import SignedApiKeyRepository  # noqa: E402
+from src.infrastructure.authentication.usage_aggregator import ApiKeyUsageAggregator  # noqa: E402
+from src.infrastructure.caching.ocr_result_cache import OcrResultCache  # noqa: E402
+from src.infrastructure.models.easyocr.config import easy_ocr_settings  # noqa: E402
+from src.infrastructure.models.model_pool import ModelPool, UnsupportedLanguageError  # noqa: E402
+from src.infrastructure.models.paddleocr.adapter import PaddleOCRAdapter, Recognizer  # noqa: E402
+from src.infrastructure.models.paddleocr.config import (  # noqa: E402
+    PaddleOCRSettings,
+    RecLanguageSettings,
+    paddle_ocr_settings,
+)
+from src.infrastructure.models.paddleocr.decoding import (  # noqa: E402
+    ctc_beam_search_decode,
+    ctc_greedy_decode,
+)
+from src.infrastructure.models.paddleocr.postprocessing import (  # noqa: E402
+    polygon_areas_and_perimeters,
+    post_process,
+    rect_points,
+)
+from src.infrastructure.models.paddleocr.quantization import (  # noqa: E402
+    quantization_targets,
+    quantize_dynamic_model,
+    quantize_static_model,
+)
+from src.infrastructure.models.paddleocr.session import (  # noqa: E402
+    OnnxModel,
+    check_model_variants,
+    model_path_for_precision,
+    select_providers,
+    variant_model_path,
+)
+from src.infrastructure.models.paddleocr.preprocessing import (  # noqa: E402
+    TensorPool,
+    det_canvas_shape,
+    det_resize_size,
+    normalize_for_det,
+    preprocess_recognize,
+)
+from src.infrastructure.models.profiles import Profiles, UnknownProfileError  # noqa: E402
+from src.infrastructure.models.tiling import merge_tile_boxes, tile_grid  # noqa: E402
+from src.infrastructure.scheduling import rate_limiter  # noqa: E402
+from src.infrastructure.scheduling.inference_executor import (  # noqa: E402
+    THREAD_MODE,
+    InferenceExecutor,
+    InferenceQueueFullError,
+    _FairSlots,
+)
+from src.infrastructure.scheduling.micro_batcher import MicroBatchingOcrPort  # noqa: E402
+from src.infrastructure.scheduling.rate_limiter import (  # noqa: E402
+    InferenceClient,
+    RateLimiter,
+    RateLimitExceededError,
+)
+from src.infrastructure.scheduling.stage_pipeline import Stage, StagePipeline  # noqa: E402
+
+
+class _FakeRecModel:
+    """
+    Stands in for the recognition model: one time step per 4 columns, the class of a
+    step depends on its columns only. Like a real model may, it reads characters in
+    zero (padded) columns.
+    """
+
+    def __init__(self, num_classes: int):
+        self.num_classes = num_classes
+        self.calls = []
+
+    def run(self, batch):
+        self.calls.append(batch.shape)
+        n, _, _, w = batch.shape
+        steps = batch[..., :w // 4 * 4].reshape(n, -1, w // 4, 4).mean(axis=(1, 3))  # [N, T]
+        classes = (np.abs(steps) * 1000).astype(np.int64) % (self.num_classes - 1)
+        classes[steps == 0] = 0
+        logits = np.eye(self.num_classes, dtype=np.float32)[classes] * 10
+        return logits
+
+
+def _adapter(monkeypatch, max_batch_size: int) -> PaddleOCRAdapter:
+    monkeypatch.setattr(paddle_ocr_settings, "rec_max_batch_size", max_batch_size)
+    adapter = PaddleOCRAdapter.__new__(PaddleOCRAdapter)
+    chars = [chr(ord("a") + i) for i in range(26)] + [" ", "<blank>"]
+    adapter.recognizer = Recognizer(_FakeRecModel(len(chars)), chars)
+    adapter._recognizers = ModelPool(lambda lang: (adapter.recognizer, 0), memory_budget_bytes=0)
+    adapter._profiles = Profiles(paddle_ocr_settings, {})
+    adapter._tensors = TensorPool()
+    return adapter
+
+
+def test_batched_recognition_matches_per_crop(monkeypatch):
+    adapter = _adapter(monkeypatch, max_batch_size=3)
+    rng = np.random.default_rng(0)
+    height = paddle_ocr_settings.rec_height
+    crops = [
+        rng.integers(1, 255, size=(height, width, 3), dtype=np.uint8)
+        for width in (200, 36, 128, 64, 40, 300, 96, 32)
+    ]
+
+    recognizer = adapter.recognizer
+    for settings in (paddle_ocr_settings, paddle_ocr_settings.model_copy(update={"rec_decoder": "beam_search"})):
+        expected = [adapter._recognize_crop(crop, recognizer, settings) for crop in crops]
+        recognizer.model.calls.clear()
+        runs = adapter._run_recognition(crops, recognizer.model)
+        decoded = adapter._decode_runs(len(crops), runs, recognizer.chars, settings)
+
+        # Width padding (read as characters by the model) changes nothing
+        assert [text for text, _ in decoded] == [text for text, _ in expected]
+        assert [confidence for _, confidence in decoded] == pytest.approx(
+            [confidence for _, confidence in expected]
+        )
+        calls = recognizer.model.calls
+        assert len(calls) < len(crops)
+        assert all(shape[0] <= 3 for shape in calls)
+        assert all(shape[3] % paddle_ocr_settings.rec_width_bucket == 0 for shape in calls)
+        # Some crops were padded
+        assert sum(shape[0] * shape[3] for shape in calls) > sum(crop.shape[1] for crop in crops)
+
+
+def test_batched_recognition_of_no_crops(monkeypatch):
+    adapter = _adapter(monkeypatch, max_batch_size=3)
+    runs = adapter._run_recognition([], adapter.recognizer.model)
+    assert adapter._decode_runs(0, runs, adapter.recognizer.chars) == []
+    assert adapter.recognizer.model.calls == []
+
+
+def test_table_normalization_matches_float_arithmetic():
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, size=(20, 30, 3), dtype=np.uint8)
+
+    out = np.zeros((3, 24, 32), dtype=np.float32)
+    normalize_for_det(image, out)
+    expected = (image / np.float32(255.0) - paddle_ocr_settings.det_norm_mean) / paddle_ocr_settings.det_norm_std
+    np.testing.assert_allclose(out[:, :20, :30], expected.transpose(2, 0, 1), rtol=1e-5, atol=1e-6)
+    assert not out[:, 20:, :].any() and not out[:, :, 30:].any()
+
+    # Recognition models get BGR channels
+    rec = preprocess_recognize(image)
+    expected = (image[:, :, ::-1] / np.float32(255.0) - paddle_ocr_settings.rec_norm_mean) / paddle_ocr_settings.rec_norm_std
+    np.testing.assert_allclose(rec[0], expected.transpose(2, 0, 1), rtol=1e-5, atol=1e-6)
+
+
+def test_detection_size_preserves_aspect_and_pads_to_buckets(monkeypatch):
+    monkeypatch.setattr(paddle_ocr_settings, "det_limit_type", "max")
+    monkeypatch.setattr(paddle_ocr_settings, "det_limit_side_len", 960)
+    monkeypatch.setattr(paddle_ocr_settings, "det_size_buckets", [320, 480, 640, 960])
+
+    # Small images are not upscaled
+    assert det_resize_size(400, 300) == (400, 300)
+    assert det_canvas_shape(np.empty((300, 400, 3))) == (320, 480)
+    # Tall receipts are scaled down, not squashed
+    assert det_resize_size(1000, 4000) == (240, 960)
+    assert det_canvas_shape(np.empty((960, 240, 3))) == (960, 320)
+
+    monkeypatch.setattr(paddle_ocr_settings, "det_limit_type", "min")
+    monkeypatch.setattr(paddle_ocr_settings, "det_limit_side_len", 480)
+    # Upscaled, within the largest bucket
+    assert det_resize_size(400, 300) == (640, 480)
+    assert det_resize_size(300, 1200) == (240, 960)
+
+
+def _reference_ctc_decode(logits, chars, blank):
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs = exp / exp.sum(axis=1, keepdims=True)
+    text, prev = [], None
+    for i in logits.argmax(axis=1):
+        if i != prev and i != blank:
+            text.append(chars[i])
+        prev = i
+    return "".join(text), float(probs.max(axis=1).mean())
+
+
+def test_greedy_ctc_decode_matches_per_line_reference():
+    rng = np.random.default_rng(0)
+    chars = [chr(ord("a") + i) for i in range(26)] + ["<blank>"]
+    logits = rng.normal(size=(6, 40, len(chars))).astype(np.float32) * 4
+
+    results = ctc_greedy_decode(logits, chars, blank=len(chars) - 1, char_confidences=True)
+    for result, line in zip(results, logits):
+        text, confidence = _reference_ctc_decode(line, chars, len(chars) - 1)
+        assert result.text == text
+        assert result.confidence == pytest.approx(confidence, rel=1e-5)
+        assert len(result.char_confidences) == len(text)
+    assert ctc_greedy_decode(logits[:0], chars, blank=len(chars) - 1) == []
+
+
+def test_beam_search_ctc_decode():
+    chars = ["a", "b", "<blank>"]
+    blank = 2
+    # a a <blank> a b b: "aab"
+    steps = [0, 0, 2, 0, 1, 1]
+    logits = np.full((1, len(steps), 3), -5.0, dtype=np.float32)
+    logits[0, np.arange(len(steps)), steps] = 5.0
+
+    [greedy] = ctc_greedy_decode(logits, chars, blank)
+    [beam] = ctc_beam_search_decode(logits, chars, blank, beam_width=3, char_confidences=True)
+    assert greedy.text == beam.text == "aab"
+    assert len(beam.char_confidences) == 3
+    assert 0 < beam.confidence <= 1
+
+
+class _FakeDetModel:
+    """Stands in for the detection model: bright pixels are text."""
+
+    def run(self, batch):
+        return np.where(batch.mean(axis=1, keepdims=True) > 0, 0.9, 0.0).astype(np.float32)
+
+
+def _page(seed: int) -> OcrImageInput:
+    rng = np.random.default_rng(seed)
+    image = np.zeros((300, 400, 3), dtype=np.uint8)
+    for top in (40, 120, 200):
+        width = int(rng.integers(150, 350))
+        image[top:top + 30, 20:20 + width] = rng.integers(128, 255, size=(30, width, 3))
+    return OcrImageInput(content=cv2.imencode(".png", image)[1].tobytes())
+
+
+def test_pipelined_adapter_matches_sequential(monkeypatch):
+    adapter = _adapter(monkeypatch, max_batch_size=4)
+    adapter.det_model = _FakeDetModel()
+    adapter._pipeline = None
+    batches = [[_page(seed), _page(seed + 1)] for seed in range(0, 12, 2)]
+    expected = [adapter.predict_batch_columnar(batch) for batch in batches]
+    assert all(len(output.texts) == 3 for outputs in expected for output in outputs)
+
+    adapter._pipeline = StagePipeline(adapter._stages(), queue_size=2)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            outputs = list(pool.map(adapter.predict_batch_columnar, batches))
+        stats = adapter.pipeline_stats()
+    finally:
+        adapter.close()
+
+    assert [[o.texts for o in batch] for batch in outputs] == [[o.texts for o in batch] for batch in expected]
+    assert [[o.boxes for o in batch] for batch in outputs] == [[o.boxes for o in batch] for batch in expected]
+    for stage in ("decode", "det", "post_process", "rec", "ctc_decode"):
+        assert stats[f"{stage}.items"] == len(batches)
+        assert 0 < stats[f"{stage}.utilization"] <= 1
+
+
+def test_stage_pipeline_fails_only_the_item_raising():
+    def check(value):
+        if value == 3:
+            raise ValueError("bad item")
+        return value
+
+    pipeline = StagePipeline(
+        [Stage("double", lambda v: v * 2, workers=2), Stage("check", check), Stage("inc", lambda v: v + 1)],
+        queue_size=1,
+    )
+    try:
+        futures = [pipeline.submit(value) for value in range(4)]
+        with pytest.raises(ValueError, match="bad item"):
+            pipeline.run(1.5)
+        assert [future.result() for future in futures] == [1, 3, 5, 7]
+        stats = pipeline.stats()
+    finally:
+        pipeline.close()
+    assert stats["double.items"] == 5 and stats["inc.items"] == 4 and stats["double.workers"] == 2
+
+
+def test_profiles_override_settings_per_request(monkeypatch):
+    adapter = _adapter(monkeypatch, max_batch_size=4)
+    adapter.det_model = _FakeDetModel()
+    adapter._pipeline = None
+    adapter._profiles = Profiles(paddle_ocr_settings, {
+        "fast": {"det_limit_side_len": 200},
+        "strict": {"box_score_threshold": 1.0},
+    })
+    page = _page(0)
+    [default, fast, strict] = adapter.predict_batch_columnar([
+        page,
+        page.model_copy(update={"options": OcrOptions(profile="fast")}),
+        page.model_copy(update={"options": OcrOptions(profile="strict")}),
+    ])
+
+    assert len(default.texts) == len(fast.texts) == 3
+    # Boxes are back at original scale, detected on a smaller image
+    assert np.allclose(fast.boxes, default.boxes, atol=10) and fast.boxes != default.boxes
+    assert strict.texts == []
+    with pytest.raises(UnknownProfileError):
+        adapter.predict_batch_columnar([page.model_copy(update={"options": OcrOptions(profile="slow")})])
+    with pytest.raises(ValidationError):
+        PaddleOCRSettings(**{**paddle_ocr_settings.model_dump(), "profiles": {"fast": {"det_model_path": "x"}}})
+
+
+def test_tile_grid_covers_image_with_overlap():
+    (tile_w, tile_h), origins = tile_grid(2400, 500, tile_size=960, overlap=128)
+    assert (tile_w, tile_h) == (960, 500)
+    xs = sorted({x for x, _ in origins})
+    assert xs[0] == 0 and xs[-1] + tile_w == 2400
+    assert all(b - a <= tile_w - 128 for a, b in zip(xs, xs[1:]))
+    assert tile_grid(800, 600, tile_size=960, overlap=128) == ((800, 600), [(0, 0)])
+
+
+def test_merge_tile_boxes_groups_cut_and_duplicate_lines_only():
+    boxes = np.array([
+        [700, 100, 960, 130],    # line cut by the border of tile 0...
+        [720, 100, 1500, 130],   # ...and seen by tile 1
+        [800, 300, 900, 330],    # seen whole by tile 0...
+        [800, 301, 900, 330],    # ...and tile 1
+        [800, 310, 900, 340],    # another line of tile 0
+        [100, 100, 200, 130],    # alone
+    ], dtype=np.float64)
+    groups = merge_tile_boxes(boxes, np.array([0, 1, 0, 1, 0, 0]), min_overlap=0.7)
+    assert sorted(groups) == [[0, 1], [2, 3], [4], [5]]
+
+
+def test_tiled_detection_finds_each_line_once(monkeypatch):
+    adapter = _adapter(monkeypatch, max_batch_size=4)
+    adapter.det_model = _FakeDetModel()
+    adapter._pipeline = None
+    monkeypatch.setattr(paddle_ocr_settings, "tiling", True)
+    monkeypatch.setattr(paddle_ocr_settings, "tile_threshold_side", 2000)
+    image = np.zeros((500, 2400, 3), dtype=np.uint8)
+    lines = [(700, 1500, 100), (100, 400, 250), (1800, 2300, 400)]
+    for left, right, top in lines:
+        image[top:top + 30, left:right] = 200
+    data = OcrImageInput(content=cv2.imencode(".png", image)[1].tobytes())
+
+    [output] = adapter.predict_batch_columnar([data])
+    assert len(output.boxes) == len(lines)
+    for left, right, top in lines:
+        # Native resolution: boxes are the (expanded) lines
+        assert any(l <= left and r >= right - 1 and t <= top and b >= top + 29 for l, t, r, b in output.boxes)
+
+
+def test_model_pool_loads_once_and_evicts_least_recently_used_unpinned():
+    loads = []
+
+    def load(lang):
+        if lang == "xx":
+            raise UnsupportedLanguageError(lang)
+        loads.append(lang)
+        return f"model-{lang}", 100
+
+    pool = ModelPool(load, memory_budget_bytes=250, pinned=["en"])
+    assert pool.get("en") == "model-en"
+    pool.get("ar")
+    pool.get("en")
+    pool.get("fr")  # over budget: "ar" is the least recently used unpinned model
+    pool.get("de")  # then "fr"
+    with pytest.raises(UnsupportedLanguageError):
+        pool.get("xx")
+    assert pool.get("ar") == "model-ar"
+
+    assert loads == ["en", "ar", "fr", "de", "ar"]
+    stats = pool.stats()
+    assert stats["resident"] == 2 and stats["memory_bytes"] == 200
+    assert stats["en.hits"] == 1 and stats["en.pinned"] == 1 and stats["en.resident"] == 1
+    assert stats["ar.loads"] == 2 and stats["ar.evictions"] == 1
+    assert "xx.loads" not in stats
+
+
+def test_every_language_model_is_quantized_and_checked_at_startup(tmp_path):
+    settings = paddle_ocr_settings.model_copy(update={
+        "det_model_path": str(tmp_path / "det.onnx"),
+        "rec_model_path": str(tmp_path / "en_rec.onnx"),
+        "rec_languages": {
+            "ar": RecLanguageSettings(rec_model_path=str(tmp_path / "ar_rec.onnx"), char_dict_path="ar.txt"),
+        },
+    })
+    assert quantization_targets(["det", "rec"], settings) == [
+        ("det", str(tmp_path / "det.onnx")),
+        ("rec[en]", str(tmp_path / "en_rec.onnx")),
+        ("rec[ar]", str(tmp_path / "ar_rec.onnx")),
+    ]
+    assert [name for name, _ in quantization_targets(["rec"], settings)] == ["rec[en]", "rec[ar]"]
+
+    with pytest.raises(FileNotFoundError, match="Missing fp32 model"):
+        check_model_variants(settings.rec_model_paths().values(), "fp32")
+    for name in ("en_rec.onnx", "ar_rec.onnx", "en_rec.int8_dynamic.onnx"):
+        (tmp_path / name).touch()
+    check_model_variants(settings.rec_model_paths().values(), "fp32")
+    with pytest.raises(FileNotFoundError, match="ar_rec.int8_dynamic.onnx") as missing:
+        check_model_variants(settings.rec_model_paths().values(), "int8_dynamic")
+    assert "en_rec" not in str(missing.value)
+    (tmp_path / "ar_rec.int8_dynamic.onnx").touch()
+    check_model_variants(settings.rec_model_paths().values(), "int8_dynamic")
+
+
+def test_vectorized_geometry_matches_opencv():
+    rng = np.random.default_rng(0)
+    contours = [rng.integers(0, 100, size=(n, 1, 2)).astype(np.int32) for n in (3, 5, 8, 20)]
+    areas, perimeters = polygon_areas_and_perimeters(contours)
+    np.testing.assert_allclose(areas, [cv2.contourArea(c) for c in contours])
+    np.testing.assert_allclose(perimeters, [cv2.arcLength(c, True) for c in contours], rtol=1e-6)
+
+    rects = np.array([(50, 40, 30, 10, 0), (20, 80, 12.5, 40, 33.3), (60, 60, 5, 70, -80)])
+    expected = [cv2.boxPoints(((cx, cy), (w, h), angle)) for cx, cy, w, h, angle in rects]
+    np.testing.assert_allclose(rect_points(rects), expected, atol=1e-3)
+
+
+def test_post_process_keeps_confident_boxes_only():
+    det_map = np.zeros((320, 480), dtype=np.float32)
+    det_map[100:140, 50:300] = 0.9   # text line
+    det_map[200:240, 50:300] = 0.45  # above binarization threshold, below box score threshold
+    det_map[10:13, 10:13] = 0.9      # too small
+    image = np.full((320, 480, 3), 255, dtype=np.uint8)
+
+    boxes, crops = post_process(det_map, image)
+    assert len(boxes) == len(crops) == 1
+    xs, ys = boxes[0][:, 0], boxes[0][:, 1]
+    # Expanded around the line
+    assert xs.min() < 50 and xs.max() > 299 and ys.min() < 100 and ys.max() > 139
+    assert crops[0].shape[0] == paddle_ocr_settings.rec_height
+
+
+def _relu_model(path):
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper
+
+    graph = helper.make_graph(
+        [helper.make_node("Relu", ["x"], ["y"])],
+        "relu",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["n", 3, "h", "w"])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, ["n", 3, "h", "w"])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def _conv_model(path):
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = np.random.default_rng(0).normal(size=(4, 3, 3, 3)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("Conv", ["x", "w"], ["c"], pads=[1, 1, 1, 1]), helper.make_node("Relu", ["c"], ["y"])],
+        "conv",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["n", 3, "h", "w"])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, ["n", 4, "h", "w"])],
+        [numpy_helper.from_array(weights, "w")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def test_quantized_variants_stay_close_to_fp32(tmp_path):
+    onnx = pytest.importorskip("onnx")
+    model_path = _conv_model(tmp_path / "conv.onnx")
+    settings = paddle_ocr_settings.model_copy(update={
+        "providers": ["CPUExecutionProvider"],
+        "optimized_model_dir": None,
+        "io_binding": False,
+    })
+    batch = np.random.default_rng(1).normal(size=(4, 3, 8, 10)).astype(np.float32)
+    with pytest.raises(FileNotFoundError, match="int8_dynamic"):
+        model_path_for_precision(model_path, "int8_dynamic")
+
+    quantize_dynamic_model(model_path, variant_model_path(model_path, "int8_dynamic"))
+    quantize_static_model(model_path, variant_model_path(model_path, "int8_static"), (tensor[None] for tensor in batch))
+
+    expected = OnnxModel(model_path, settings).run(batch)
+    for precision, quantized_op in (("int8_dynamic", "ConvInteger"), ("int8_static", "QuantizeLinear")):
+        variant = model_path_for_precision(model_path, precision)
+        assert variant == str(tmp_path / f"conv.{precision}.onnx")
+        assert quantized_op in {node.op_type for node in onnx.load(variant).graph.node}
+        output = OnnxModel(variant, settings).run(batch)
+        assert np.abs(output - expected).max() < 0.02 * expected.max()
+
+
+def test_providers_fall_back_to_cpu():
+    assert select_providers(["NoSuchExecutionProvider"]) == ["CPUExecutionProvider"]
+
+
+def test_onnx_model_saves_optimized_graph_and_binds_outputs(tmp_path):
+    model_path = _relu_model(tmp_path / "relu.onnx")
+    settings = paddle_ocr_settings.model_copy(update={
+        "providers": ["CPUExecutionProvider"],
+        "optimized_model_dir": "optimized",  # next to the model
+        "io_binding": True,
+    })
+    batch = np.random.default_rng(0).normal(size=(2, 3, 4, 5)).astype(np.float32)
+
+    model = OnnxModel(model_path, settings)
+    [optimized] = list((tmp_path / "optimized").iterdir())
+    assert optimized.name.startswith("relu.") and ".all.CPUExecutionProvider." in optimized.name
+    first = model.run(batch).copy()  # learns the output shape
+    bound = model.run(batch)         # written into a preallocated buffer
+    np.testing.assert_array_equal(first, np.maximum(batch, 0))
+    np.testing.assert_array_equal(bound, first)
+    assert model.run(batch) is bound
+
+    # Later boots load the saved graph
+    reloaded = OnnxModel(model_path, settings)
+    np.testing.assert_array_equal(reloaded.run(batch), first)
+    assert len(list((tmp_path / "optimized").iterdir())) == 1
+
+    # A model replaced under the same name doesn't reuse the stale graph
+    _conv_model(model_path)
+    replaced = OnnxModel(model_path, settings)
+    assert replaced.run(batch).shape == (2, 4, 4, 5)
+    assert len(list((tmp_path / "optimized").iterdir())) == 2
+
+
+class _CountingOcrPort(OcrPort):
+    """Records the content of each call, each one taking `delay_s`."""
+
+    def __init__(self, delay_s: float = 0.05):
+        self.delay_s = delay_s
+        self.calls = []
+
+    def predict(self, ocrInput):
+        self.calls.append(ocrInput.content)
+        time.sleep(self.delay_s)
+        return OcrOutput(texts=[])
+
+
+def test_identical_requests_share_one_inference_slot():
+    port = _CountingOcrPort()
+    cache = OcrResultCache("test", max_bytes=1 << 20, ttl_s=60)
+    executor = InferenceExecutor(
+        THREAD_MODE,
+        max_workers=1,
+        max_queue_size=0,
+        retry_after_s=1,
+        use_case=ProcessImageUseCase(port, cache=cache),
+    )
+    data = OcrImageInput(content=b"image")
+
+    async def requests():
+        # A single slot, no queue: only the first request is admitted, the others join it
+        outputs = await asyncio.gather(*(executor.execute(data) for _ in range(8)))
+        assert all(output is outputs[0] for output in outputs)
+
+        # Cache hits are served even while the only slot is busy
+        other = asyncio.ensure_future(executor.execute(OcrImageInput(content=b"other")))
+        while not executor.stats()["running"]:
+            await asyncio.sleep(0.001)
+        assert await executor.execute(data) is outputs[0]
+        await other
+
+    try:
+        asyncio.run(requests())
+    finally:
+        executor.shutdown()
+    assert port.calls == [b"image", b"other"]
+    stats = executor.stats()
+    assert stats["completed"] == 2 and stats["rejected"] == 0 and stats["coalesced"] == 7
+    assert cache.stats()["hits"] == 1
+
+
+def test_identical_requests_are_admitted_per_client():
+    port = _CountingOcrPort(delay_s=0.1)
+    executor = InferenceExecutor(
+        THREAD_MODE,
+        max_workers=1,
+        max_queue_size=1,
+        retry_after_s=1,
+        use_case=ProcessImageUseCase(port, cache=OcrResultCache("test", max_bytes=1 << 20, ttl_s=60)),
+    )
+    first, second = InferenceClient("first", max_concurrency=1), InferenceClient("second", max_concurrency=1)
+    data, other = OcrImageInput(content=b"image"), OcrImageInput(content=b"other")
+
+    async def requests():
+        leader = asyncio.ensure_future(executor.execute(data, client=first))
+        while not executor.stats()["running"]:
+            await asyncio.sleep(0.001)
+        joined = asyncio.ensure_future(executor.execute(data, client=second))
+        while not executor.stats()["coalesced"]:
+            await asyncio.sleep(0.001)
+
+        # Joining counts towards the joining client's limit, the leader's client isn't charged twice
+        for client in (first, second):
+            with pytest.raises(RateLimitExceededError):
+                await executor.execute(other, client=client)
+        # ...and a client at its limit can't join
+        with pytest.raises(RateLimitExceededError):
+            await executor.execute(data, client=second)
+        assert await joined is await leader
+
+    try:
+        asyncio.run(requests())
+    finally:
+        executor.shutdown()
+    assert port.calls == [b"image"]
+    assert executor.stats()["client_limited"] == 3 and not executor._admitted_by_client
+
+
+class _EchoBatchPort(BatchOcrPort):
+    """Describes each input by its content, a batch containing b"bad" fails as a whole."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, ocrInput):
+        return self.predict_batch([ocrInput])[0]
+
+    def predict_batch(self, ocrInputs):
+        self.batches.append([data.content for data in ocrInputs])
+        if any(data.content == b"bad" for data in ocrInputs):
+            raise ValueError("bad input")
+        return [OcrOutput(texts=[], description={"content": data.content.decode()}) for data in ocrInputs]
+
+
+def test_micro_batcher_answers_each_caller_and_flushes_at_max_wait():
+    port = _EchoBatchPort()
+    batcher = MicroBatchingOcrPort(port, max_batch_size=4, max_wait_ms=200)
+    contents = [f"image-{i}".encode() for i in range(6)]
+    try:
+        with ThreadPoolExecutor(len(contents)) as callers:
+            outputs = list(callers.map(lambda content: batcher.predict(OcrImageInput(content=content)), contents))
+        # A lone request waits for max_wait only
+        st = time.perf_counter()
+        batcher.predict(OcrImageInput(content=b"alone"))
+        elapsed_s = time.perf_counter() - st
+    finally:
+        batcher.close()
+
+    assert [output.description["content"].encode() for output in outputs] == contents
+    assert [len(batch) for batch in port.batches] == [4, 2, 1]
+    assert 0.2 <= elapsed_s < 1
+    stats = batcher.stats()
+    assert stats["batches"] == 3 and stats["requests"] == 7
+    assert stats["average_batch_size"] == pytest.approx(7 / 3)
+    assert stats["fill_rate"] == pytest.approx(7 / 12)
+
+
+def test_micro_batcher_fails_only_the_caller_of_a_bad_input():
+    port = _EchoBatchPort()
+    batcher = MicroBatchingOcrPort(port, max_batch_size=3, max_wait_ms=200)
+
+    def predict(content):
+        try:
+            return batcher.predict(OcrImageInput(content=content)).description["content"]
+        except ValueError as e:
+            return str(e)
+
+    try:
+        with ThreadPoolExecutor(3) as callers:
+            answers = list(callers.map(predict, [b"first", b"bad", b"last"]))
+    finally:
+        batcher.close()
+
+    assert answers == ["first", "bad input", "last"]
+    # The failed batch is retried request by request
+    assert len(port.batches[0]) == 3
+    assert sorted(port.batches[1:]) == [[b"bad"], [b"first"], [b"last"]]
+
+
+def test_inference_executor_sheds_load_and_limits_clients():
+    executor = InferenceExecutor(
+        THREAD_MODE,
+        max_workers=1,
+        max_queue_size=2,
+        retry_after_s=3,
+        use_case=ProcessImageUseCase(_CountingOcrPort(delay_s=0.1)),
+    )
+    limited = InferenceClient("limited", max_concurrency=1)
+
+    async def admitted(count):
+        while executor.stats()["running"] + executor.stats()["queue_depth"] < count:
+            await asyncio.sleep(0.001)
+
+    async def requests():
+        running = asyncio.ensure_future(executor.execute(OcrImageInput(content=b"running")))
+        waiting = asyncio.ensure_future(executor.execute(OcrImageInput(content=b"waiting"), client=limited))
+        await admitted(2)
+
+        # The client already has an inference waiting
+        with pytest.raises(RateLimitExceededError) as limit:
+            await executor.execute(OcrImageInput(content=b"second"), client=limited)
+        assert limit.value.headers["Retry-After"] == "3"
+
+        # A cancelled waiter gives its queue place and its client's share back
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert executor.stats()["queue_depth"] == 0 and executor.stats()["waiting_clients"] == 0
+        queued = [
+            asyncio.ensure_future(executor.execute(OcrImageInput(content=b"queued"), client=limited)),
+            asyncio.ensure_future(executor.execute(OcrImageInput(content=b"other"))),
+        ]
+        await admitted(3)
+
+        # One worker, two queued: full
+        with pytest.raises(InferenceQueueFullError) as full:
+            await executor.execute(OcrImageInput(content=b"rejected"))
+        assert full.value.retry_after_s == 3
+        await asyncio.gather(running, *queued)
+
+    try:
+        asyncio.run(requests())
+    finally:
+        executor.shutdown()
+    stats = executor.stats()
+    assert stats["completed"] == 3 and stats["rejected"] == 1 and stats["client_limited"] == 1
+    assert stats["running"] == 0 and stats["queue_depth"] == 0
+    assert executor._slots._free == 1
+
+
+def test_fair_slots_serve_clients_round_robin():
+    async def scenario():
+        slots = _FairSlots(1)
+        await slots.acquire("busy")
+        served = []
+
+        async def acquire(client_id, name):
+            await slots.acquire(client_id)
+            served.append(name)
+
+        # "a" queues three inferences before "b" queues one
+        waiters = [
+            asyncio.ensure_future(acquire(client_id, name))
+            for client_id, name in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1")]
+        ]
+        await asyncio.sleep(0)
+        assert len(slots) == 2
+        for _ in waiters:
+            slots.release()
+            await asyncio.sleep(0)
+        assert served == ["a1", "b1", "a2", "a3"]
+
+        # A slot handed to a waiter cancelled before resuming goes to the next one
+        late = asyncio.ensure_future(slots.acquire("late"))
+        next_ = asyncio.ensure_future(slots.acquire("next"))
+        await asyncio.sleep(0)
+        slots.release()
+        late.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert late.cancelled() and next_.done()
+        slots.release()
+        assert slots._free == 1 and len(slots) == 0
+
+    asyncio.run(scenario())
+
+
+class _FakeCameraWebSocket:
+    """Camera WebSocket: frames pushed with `send_frame`, FrameResults read from `results`."""
+
+    def __init__(self):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.results: asyncio.Queue = asyncio.Queue()
+
+    def send_frame(self, content: bytes) -> None:
+        self.incoming.put_nowait({"type": "websocket.receive", "bytes": content})
+
+    def disconnect(self) -> None:
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text: str) -> None:
+        await self.results.put(FrameResult.model_validate_json(text))
+
+
+def _camera_frame(seed: int) -> bytes:
+    image = np.random.default_rng(seed).integers(0, 256, size=(64, 64), dtype=np.uint8)
+    return cv2.imencode(".png", cv2.resize(image, (256, 256), interpolation=cv2.INTER_NEAREST))[1].tobytes()
+
+
+def test_camera_frames_each_take_a_rate_limit_token():
+    executor = InferenceExecutor(
+        THREAD_MODE,
+        max_workers=1,
+        max_queue_size=0,
+        retry_after_s=1,
+        use_case=ProcessImageUseCase(_CountingOcrPort(delay_s=0)),
+    )
+    limiter = RateLimiter(rate_per_s=0.001, burst=2, max_concurrency=0)
+    key = ApiKey(id="camera", hashed_key="hash", key_prefix="prefix")
+
+    async def session():
+        websocket = _FakeCameraWebSocket()
+        camera = CameraSession(websocket, executor, OcrOptions(), partial(limiter.acquire, key), change_threshold=0)
+        running = asyncio.ensure_future(camera.run())
+        statuses = []
+        for seed in range(3):
+            websocket.send_frame(_camera_frame(seed))
+            statuses.append((await websocket.results.get()).status)
+        websocket.disconnect()
+        await running
+        return statuses
+
+    try:
+        assert asyncio.run(session()) == ["processed", "processed", "busy"]
+    finally:
+        executor.shutdown()
+    assert limiter.stats()["limited"] == 1
+
+
+def test_rate_limiter_refills_buckets_and_tells_when_to_retry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limiter, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    limiter = RateLimiter(rate_per_s=2, burst=3, max_concurrency=4)
+    key = ApiKey(id="key", hashed_key="hash", key_prefix="prefix")
+
+    for _ in range(3):
+        assert limiter.acquire(key) == InferenceClient("key", max_concurrency=4)
+    with pytest.raises(RateLimitExceededError) as limit:
+        limiter.acquire(key)
+    assert limit.value.headers["Retry-After"] == "1"
+    assert limit.value.headers["RateLimit-Limit"] == "3"
+
+    now[0] += 0.5  # one token back
+    limiter.acquire(key)
+    with pytest.raises(RateLimitExceededError):
+        limiter.acquire(key)
+    now[0] += 60  # refilled up to the burst only
+    for _ in range(3):
+        limiter.acquire(key)
+    with pytest.raises(RateLimitExceededError):
+        limiter.acquire(key)
+
+    # Per-key overrides: slower refill, or no limit at all
+    slow = ApiKey(id="slow", hashed_key="hash", key_prefix="prefix", rate_limit_per_s=0.1, rate_limit_burst=1)
+    limiter.acquire(slow)
+    with pytest.raises(RateLimitExceededError) as limit:
+        limiter.acquire(slow)
+    assert limit.value.headers["Retry-After"] == "10"
+    unlimited = ApiKey(id="unlimited", hashed_key="hash", key_prefix="prefix", rate_limit_per_s=0, max_concurrency=1)
+    for _ in range(10):
+        assert limiter.acquire(unlimited).max_concurrency == 1
+
+    stats = limiter.stats()
+    assert stats["allowed"] == 3 + 1 + 3 + 1 + 10 and stats["limited"] == 4
+
+
+class _MemoryApiKeyRepository(ApiKeyRepository):
+    """In-memory repository recording its calls, plain-text keys are looked up as is."""
+
+    def __init__(self):
+        self.keys = {}
+        self.records = 0
+        self.revoked = {}
+        self.lookups = []
+        self.usages = []
+        self.revoked_since = []
+
+    async def get_by_key(self, key):
+        self.lookups.append(key)
+        entity = self.keys.get(key)
+        return None if entity is None or entity.id in self.revoked else entity
+
+    async def create(self, key=None):
+        self.records += 1
+        key = key or f"key-{self.records}"
+        entity = self.keys[key] = ApiKey(id=f"id-{self.records}", hashed_key=key, key_prefix=key[:3])
+        return entity
+
+    async def register(self, entity):
+        self.records += 1
+        return entity.model_copy(update={"id": f"id-{self.records}"})
+
+    async def update_usage(self, entity, last_use_in=None, increment=1):
+        return entity.update_usage(last_use_in, increment)
+
+    async def add_usage(self, usages):
+        self.usages.append(usages)
+
+    async def get_revoked_ids(self, since=None):
+        self.revoked_since.append(since)
+        return {key_id: at for key_id, at in self.revoked.items() if since is None or at >= since}
+
+    async def revoke(self, key_id):
+        self.revoked[key_id] = datetime.now(timezone.utc)
+        return True
+
+
+def test_revocation_refresh_overlaps_by_the_clock_skew():
+    repository = _MemoryApiKeyRepository()
+    signed = SignedApiKeyRepository(repository, [("k1", b"secret")], revocation_refresh_s=60, revocation_skew_s=30)
+    now = datetime.now(timezone.utc)
+
+    async def scenario():
+        late = await signed.create_signed()
+        repository.revoked["early"] = now
+        await signed.refresh_revocations()
+        # Revoked by an instance whose clock lags 10 s, written after the previous refresh
+        repository.revoked[late.id] = now - timedelta(seconds=10)
+        assert await signed.get_by_key(late.key) is not None
+        await signed.refresh_revocations()
+        assert await signed.get_by_key(late.key) is None
+
+    asyncio.run(scenario())
+    assert repository.revoked_since == [None, now - timedelta(seconds=30)]
+
+
+def test_api_key_cache_verifies_each_key_once_until_revoked(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(caching, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    repository = _MemoryApiKeyRepository()
+    cache = CachingApiKeyRepository(repository, ttl_s=60, negative_ttl_s=5, max_entries=10)
+
+    async def scenario():
+        first = await cache.create("first-key")
+        second = await cache.create("second-key")
+        for _ in range(3):
+            assert await cache.get_by_key("first-key") == first
+            assert await cache.get_by_key("second-key") == second
+            assert await cache.get_by_key("unknown-key") is None
+        # Only cold lookups reach the repository (and bcrypt)
+        assert repository.lookups == ["first-key", "second-key", "unknown-key"]
+
+        now[0] += 10  # unknown keys are rejected from the cache for 5 s only
+        assert await cache.get_by_key("unknown-key") is None
+        assert repository.lookups[-1] == "unknown-key" and len(repository.lookups) == 4
+
+        # Invalidated (e.g. revoked by another instance): looked up again
+        cache.invalidate(first.id)
+        assert await cache.get_by_key("first-key") == first
+        assert repository.lookups[-1] == "first-key" and len(repository.lookups) == 5
+
+        # Revoked through the cache: rejected right away
+        assert await cache.revoke(second.id)
+        assert await cache.get_by_key("second-key") is None
+        assert repository.lookups[-1] == "second-key" and len(repository.lookups) == 6
+
+        now[0] += 60  # verified keys expire
+        assert await cache.get_by_key("first-key") == first
+        assert len(repository.lookups) == 7
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["misses"] == 7 and stats["hits"] == 4 and stats["negative_hits"] == 2
+
+
+def test_usage_aggregator_flushes_merged_usage_by_size_interval_and_on_close():
+    repository = _MemoryApiKeyRepository()
+    first = ApiKey(id="first", hashed_key="hash", key_prefix="prefix")
+    second = ApiKey(id="second", hashed_key="hash", key_prefix="prefix")
+
+    async def scenario():
+        by_size = ApiKeyUsageAggregator(repository, flush_interval_s=60, max_pending_keys=2)
+        by_size.start()
+        by_size.record(first)
+        by_size.record(first)
+        assert repository.usages == []
+        by_size.record(second)  # second pending key
+        while not repository.usages:
+            await asyncio.sleep(0.001)
+        [usages] = repository.usages
+        assert {key_id: usage.increment for key_id, usage in usages.items()} == {"first": 2, "second": 1}
+        assert usages["first"].last_use_in == first.last_use_in and first.number_of_requests == 2
+        by_size.record(second)
+        await by_size.close()
+        assert repository.usages[-1]["second"].increment == 1
+
+        by_interval = ApiKeyUsageAggregator(repository, flush_interval_s=0.05, max_pending_keys=100)
+        by_interval.start()
+        by_interval.record(first)
+        while len(repository.usages) < 3:
+            await asyncio.sleep(0.01)
+        await by_interval.close()
+        assert repository.usages[-1]["first"].increment == 1 and len(repository.usages) == 3
+        return by_size.stats(), by_interval.stats()
+
+    by_size_stats, by_interval_stats = asyncio.run(scenario())
+    assert by_size_stats["flushes"] == 2 and by_size_stats["flushed_requests"] == 4
+    assert by_interval_stats["flushes"] == 1 and by_interval_stats["pending_keys"] == 0
+
+
+def test_usage_aggregator_keeps_usage_of_failed_flushes():
+    repository = _MemoryApiKeyRepository()
+    failures = [ConnectionError("unreachable")]
+
+    async def add_usage(usages):
+        if failures:
+            raise failures.pop()
+        repository.usages.append(usages)
+
+    repository.add_usage = add_usage
+    key = ApiKey(id="key", hashed_key="hash", key_prefix="prefix")
+
+    async def scenario():
+        aggregator = ApiKeyUsageAggregator(repository, flush_interval_s=60, max_pending_keys=100)
+        aggregator.record(key)
+        await aggregator.flush()
+        aggregator.record(key)
+        await aggregator.flush()
+        return aggregator.stats()
+
+    stats = asyncio.run(scenario())
+    [usages] = repository.usages
+    assert usages["key"].increment == 2 and usages["key"].last_use_in == key.last_use_in
+    assert stats["failed_flushes"] == 1 and stats["flushes"] == 1
+
+
+def test_mongo_usage_writes_increment_and_move_last_use_forward():
+    writes = []
+
+    class _Collection:
+        async def bulk_write(self, requests, ordered):
+            writes.append((requests, ordered))
+
+    repository = MongoDbApiKeyRepository.__new__(MongoDbApiKeyRepository)
+    repository._collection = _Collection()
+    key_id = str(ObjectId())
+    last_use_in = datetime.now(timezone.utc)
+    usage = ApiKeyUsage(increment=3, last_use_in=last_use_in)
+
+    asyncio.run(repository.add_usage({key_id: usage}))
+    asyncio.run(repository.add_usage({}))
+    assert writes == [(
+        [UpdateOne(
+            {"_id": ObjectId(key_id)},
+            {"$inc": {"number_of_requests": 3}, "$max": {"last_use_in": last_use_in}},
+        )],
+        False,
+    )]
+
+
+def test_signed_keys_verify_only_untampered_unrevoked_and_fresh(monkeypatch):
+    repository = _MemoryApiKeyRepository()
+    before_rotation = SignedApiKeyRepository(repository, [("k1", b"old secret")], revocation_refresh_s=60)
+    # Rotated: k2 signs new keys, k1 keys still verify
+    rotated = SignedApiKeyRepository(
+        repository,
+        [("k2", b"new secret"), ("k1", b"old secret")],
+        revocation_refresh_s=60,
+        max_age_s=3600,
+    )
+
+    async def scenario():
+        old = await before_rotation.create_signed()
+        new = await rotated.create_signed()
+        revoked = await rotated.create_signed()
+        await repository.create("plain-key")
+        assert old.key.split(".")[3] == "k1" and new.key.split(".")[3] == "k2"
+        assert (await rotated.get_by_key(old.key)).id == old.id
+        assert (await rotated.get_by_key(new.key)).id == new.id
+        assert await rotated.get_by_key("plain-key") is not None
+
+        signature = new.key.rsplit(".", 1)[1]
+        tampered_signature = new.key[:-1] + ("A" if signature[-1] != "A" else "B")
+        other_id = new.key.replace(f".{new.id}.", ".id-99.")
+        unknown_kid = new.key.replace(".k2.", ".k3.")
+        for key in (tampered_signature, other_id, unknown_kid, "sks.garbage", new.key + ".extra"):
+            assert await rotated.get_by_key(key) is None
+        # Signed under a retired (no longer listed) signing key
+        assert await SignedApiKeyRepository(repository, [("k2", b"new secret")], 60).get_by_key(old.key) is None
+
+        assert await rotated.revoke(revoked.id)
+        assert await rotated.get_by_key(revoked.key) is None
+        assert await rotated.get_by_key(new.key) is not None
+        # Revoked by another instance: rejected once the revocations are refreshed
+        repository.revoked[new.id] = datetime.now(timezone.utc)
+        await rotated.refresh_revocations()
+        assert await rotated.get_by_key(new.key) is None
+
+        issued_at = int(old.key.split(".")[2])
+        monkeypatch.setattr(signed_keys, "time", types.SimpleNamespace(time=lambda: issued_at + 3601))
+        assert await rotated.get_by_key(old.key) is None
+        assert await before_rotation.get_by_key(old.key) is not None  # no max age
+
+    asyncio.run(scenario())
+    stats = rotated.stats()
+    assert stats["signed_verified"] == 3 and stats["signed_rejected"] == 8
+
+
+class _FakeEasyOCRDetector:
+    """`Reader.detect` stand-in: one horizontal box per image, around its non-black pixels."""
+
+    def __init__(self):
+        self.calls = []
+
+    def detect(self, images, **params):
+        batch = images if images.ndim == 4 else images[None]
+        self.calls.append((batch.shape, params))
+        horizontal_lists = []
+        for image in batch:
+            ys, xs = np.nonzero(image.any(axis=2))
+            horizontal_lists.append([[int(xs.min()), int(xs.max()) + 1, int(ys.min()), int(ys.max()) + 1]])
+        return horizontal_lists, [[] for _ in batch]
+
+
+class _FakeEasyOCRReader:
+    """`Reader.recognize` stand-in: reads the gray level of each box, with the profile's contrast_ths as confidence."""
+
+    def recognize(self, image, horizontal_list, free_list, batch_size, **params):
+        return [
+            ([[x_min, y_min], [x_max, y_min], [x_max, y_max], [x_min, y_max]],
+             str(int(image[y_min:y_max, x_min:x_max].max())),
+             params["contrast_ths"])
+            for x_min, x_max, y_min, y_max in horizontal_list
+        ]
+
+
+def _easyocr_adapter(monkeypatch, **settings):
+    pytest.importorskip("easyocr")
+    from src.infrastructure.models.easyocr.adapter import EasyOCRAdapter, _Profile
+
+    for name, value in settings.items():
+        monkeypatch.setattr(easy_ocr_settings, name, value)
+    adapter = EasyOCRAdapter.__new__(EasyOCRAdapter)
+    adapter.detector = _FakeEasyOCRDetector()
+    adapter._readers = ModelPool(lambda key: (_FakeEasyOCRReader(), 0), memory_budget_bytes=0)
+    adapter._profiles = Profiles(
+        easy_ocr_settings, {"fast": {"contrast_ths": 0.5}}, prepare=_Profile.build
+    )
+    return adapter, _Profile
+
+
+def _uniform_image(height, width, level, profile=None):
+    image = np.full((height, width, 3), level, dtype=np.uint8)
+    return OcrImageInput(content=cv2.imencode(".png", image)[1].tobytes(), options=OcrOptions(profile=profile))
+
+
+def test_easyocr_batch_keeps_input_order_across_buckets_profiles_and_tiles(monkeypatch):
+    adapter, _ = _easyocr_adapter(
+        monkeypatch,
+        batch_shape_buckets=[64, 128],
+        canvas_size=2560,
+        mag_ratio=1.0,
+        detect_max_batch_size=2,
+        contrast_ths=0.1,
+        tiling=True,
+        tile_threshold_side=200,
+        tile_size=128,
+        tile_overlap=16,
+    )
+    inputs = [
+        _uniform_image(50, 60, 10),
+        _uniform_image(100, 40, 20),    # 128 x 64 bucket
+        _uniform_image(300, 250, 30),   # tiled
+        _uniform_image(60, 50, 40),
+        _uniform_image(30, 30, 50, profile="fast"),
+        _uniform_image(64, 64, 60),
+        _uniform_image(20, 20, 70),
+    ]
+    outputs = adapter.predict_batch_columnar(inputs)
+
+    for output, level in zip(outputs, (10, 20, 30, 40, 50, 60, 70)):
+        assert output.texts and set(output.texts) == {str(level)}
+    # Boxes in the coordinates of the unpadded images
+    assert [outputs[i].boxes for i in (0, 1, 3, 5, 6)] == [
+        [(0, 0, 60, 50)], [(0, 0, 40, 100)], [(0, 0, 50, 60)], [(0, 0, 64, 64)], [(0, 0, 20, 20)]
+    ]
+    assert outputs[4].confidences == [0.5] and outputs[0].confidences == [0.1]
+
+    calls = [(shape[:3], params["canvas_size"]) for shape, params in adapter.detector.calls]
+    # The 4 base-profile 64 x 64 images are split in batches of 2, the others run alone
+    whole_images = [shape for shape, canvas_size in calls if canvas_size == 2560]
+    assert sorted(whole_images) == [(1, 30, 30), (1, 100, 40), (2, 64, 64), (2, 64, 64)]
+    # The tiled image is detected tile by tile, at native resolution
+    tiles = [shape for shape, canvas_size in calls if canvas_size == 128]
+    assert len(tiles) + len(whole_images) == len(calls)
+    assert sum(count for count, _, _ in tiles) >= 6 and all(shape[1:] == (128, 128) for shape in tiles)
+
+
+def test_easyocr_shape_buckets_keep_the_detection_scale(monkeypatch):
+    adapter, Profile = _easyocr_adapter(monkeypatch, batch_shape_buckets=[640, 960, 1280], canvas_size=1000)
+    profile = Profile.build(easy_ocr_settings.model_copy(update={"mag_ratio": 1.0}))
+    assert profile.shape_buckets == [640, 960]
+    assert adapter._shape_bucket(np.zeros((700, 500, 3)), profile) == (960, 640)
+    # No usable bucket fits: detected at its own shape
+    assert adapter._shape_bucket(np.zeros((1100, 500, 3)), profile) == (1100, 500)
+
+    magnified = Profile.build(easy_ocr_settings.model_copy(update={"mag_ratio": 1.5}))
+    assert magnified.shape_buckets == [640]
+    assert adapter._shape_bucket(np.zeros((600, 300, 3)), magnified) == (640, 640)
+    assert adapter._shape_bucket(np.zeros((700, 300, 3)), magnified) == (700, 300)
+
+
+def _upload_request(content_type: str, chunks, content_length=None):
+    """Request streaming `chunks` as its body, `sent` counts the chunks read."""
+    headers = [(b"content-type", content_type.encode())]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    sent = [0]
+
+    async def receive():
+        if sent[0] == len(messages):
+            return {"type": "http.disconnect"}
+        sent[0] += 1
+        return messages[sent[0] - 1]
+
+    scope = {"type": "http", "method": "POST", "path": "/", "query_string": b"", "headers": headers}
+    return Request(scope, receive), sent
+
+
+def test_image_uploads_larger_than_the_limit_get_413_before_being_buffered(monkeypatch):
+    monkeypatch.setattr(AppConfig, "max_upload_bytes", property(lambda self: 16))
+    octet_stream = "application/octet-stream"
+
+    def read(request):
+        return asyncio.run(read_image_input(request, OcrOptions()))
+
+    request, _ = _upload_request(octet_stream, [b"12345678", b"12345678"], content_length=16)
+    assert read(request).content == b"1234567812345678"
+
+    # Announced too large: rejected without reading the body
+    request, sent = _upload_request(octet_stream, [b"x" * 32], content_length=32)
+    with pytest.raises(HTTPException) as error:
+        read(request)
+    assert error.value.status_code == 413 and sent[0] == 0
+
+    # Chunked (no Content-Length): reading stops at the chunk going past the limit
+    request, sent = _upload_request(octet_stream, [b"x" * 10, b"x" * 10, b"x" * 10])
+    with pytest.raises(HTTPException) as error:
+        read(request)
+    assert error.value.status_code == 413 and sent[0] == 2
+
+    boundary = "limit"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n"
+        f"Content-Type: image/png\r\n\r\n{'x' * 64}\r\n--{boundary}--\r\n"
+    ).encode()
+    request, sent = _upload_request(f"multipart/form-data; boundary={boundary}", [body[:8], body[8:]])
+    with pytest.raises(HTTPException) as error:
+        read(request)
+    assert error.value.status_code == 413 and sent[0] == 2
+
+    monkeypatch.setattr(AppConfig, "max_upload_bytes", property(lambda self: 0))
+    request, _ = _upload_request(f"multipart/form-data; boundary={boundary}", [body])
+    assert read(request).content == b"x" * 64